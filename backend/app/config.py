@@ -11,23 +11,97 @@ class Settings(BaseSettings):
     meta_number_id: str = ""
     meta_verify_token: str = ""
     meta_version: str = "v21.0"
+    # Graph sends per second and pooled connections, per phone number
+    meta_rate_limit_per_second: float = 80.0
+    meta_http_max_connections: int = 20
+    # Extra phone numbers (brands) served by this process; a missing file means META_NUMBER_ID only
+    tenants_file_path: str = "./config/tenants.json"
 
     # Grok AI
     xai_api_key: str = ""
+    # Parsed date results kept in memory (keyed by normalized text and local date)
+    date_parse_cache_size: int = 2048
+    # Batch parsing: texts per multi-item Grok prompt, and prompts in flight at once
+    date_parse_batch_size: int = 20
+    date_parse_concurrency: int = 4
 
     # Google Services
     google_sheet_id: str = ""
     google_credentials_path: str = "./google-credentials.json"
     meet_link: str = ""
     karuna_email: str = ""
+    # Threads for blocking Google API calls, and the timeout for each call
+    google_max_workers: int = 4
+    google_request_timeout_ms: int = 15000
+    # Local appointment ledger (source of truth), how often unsynced bookings are retried, and how many times
+    appointments_db_path: str = "./config/appointments.db"
+    appointments_reconcile_interval_ms: int = 30000
+    appointments_max_sync_attempts: int = 10
+    # Appointment rows wait here and are appended to Sheets in batches
+    sheets_queue_path: str = "./config/sheets-queue.db"
+    sheets_batch_size: int = 50
+    sheets_flush_interval_ms: int = 2000
+    # Bookable hours (America/Mexico_City) and days (0 = Monday)
+    business_hours_start: str = "09:00"
+    business_hours_end: str = "18:00"
+    business_days: str = "0,1,2,3,4"
+    # Booked slots are mirrored locally from Calendar over this window and refreshed on this interval
+    availability_sync_days: int = 60
+    availability_sync_interval_ms: int = 300000
+    # WhatsApp reminders: approved template (empty = off, the default), its language, and minutes before each appointment
+    reminders_db_path: str = "./config/reminders.db"
+    reminder_template_name: str = ""
+    reminder_template_language: str = "es"
+    reminder_offsets_minutes: str = "1440,60"
+    reminder_batch_size: int = 50
+
+    # Recent messages kept in memory for the dashboard, and how far a live feed client may lag before it is dropped
+    recent_messages_capacity: int = 1000
+    recent_messages_subscriber_queue: int = 256
+
+    # Message traces kept in memory for /debug/traces, and an optional OTLP/JSON lines file for finished traces (empty = off)
+    trace_store_size: int = 1000
+    trace_export_path: str = ""
+
+    # Graph API checks for /diagnose, /phone-info and /ready: cached this long, then served stale while refreshing, all run within one deadline
+    diagnostics_cache_ttl_ms: int = 30000
+    diagnostics_stale_ttl_ms: int = 300000
+    diagnostics_deadline_ms: int = 10000
+
+    # Conversation history: messages kept per user and how long an idle one lasts (Redis only)
+    conversation_max_messages: int = 20
+    conversation_ttl_seconds: int = 604800
+    # Shared conversation state for several workers/replicas (empty = process memory), with a local near-cache
+    redis_url: str = ""
+    redis_key_prefix: str = "karuna:"
+    conversation_near_cache_size: int = 10000
+
+    # Webhook processing: "inline" (in the web process) or "queue" (the web process only stores payloads
+    # for `python -m backend.app.worker`), the durable queue between them, and lease/retry limits
+    webhook_mode: str = "inline"
+    inbound_queue_path: str = "./config/inbound-queue.db"
+    inbound_visibility_timeout_ms: int = 120000
+    inbound_max_attempts: int = 5
+    # Messages a worker process handles at once, and how often it polls an empty queue
+    worker_concurrency: int = 8
+    worker_poll_interval_ms: int = 200
+    # On shutdown (redeploy), how long in-flight messages may finish before they are saved for replay on next start
+    shutdown_drain_timeout_ms: int = 20000
 
     # Server
     port: int = 3008
     environment: str = "development"
     frontend_url: str = "http://localhost:5173"
 
-    # Config file path
+    # Config storage: "json" (single file, default) or "sqlite" (indexed tables)
+    config_backend: str = "json"
+    # Config file path (JSON backend, and the file imported on first SQLite start)
     config_file_path: str = "./config/bot-config.json"
+    config_db_path: str = "./config/bot-config.db"
+    # Window for coalescing bursts of config changes into one write (0 = write immediately)
+    config_write_coalesce_ms: int = 200
+    # How often each worker polls the config file for changes made by other workers
+    config_watch_interval_ms: int = 1000
 
     class Config:
         env_file = ".env"
@@ -1,30 +1,67 @@
 """Main FastAPI application."""
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse
 from pathlib import Path
+from typing import Optional
+import asyncio
 import os
 
 from .config import get_settings
+from .responses import FastJSONResponse
+from .static_assets import StaticManifest, html_asset
 from .routers import (
     health_router,
     webhook_router,
     blacklist_router,
     flows_router,
-    messages_router
+    messages_router,
+    dates_router,
+    availability_router,
+    appointments_router,
+    users_router,
+    metrics_router,
+    traces_router,
+    tenants_router
 )
+from .services.config_service import config_service
+from .services.google_service import google_service
+from .services.reminder_scheduler import reminder_scheduler
+from .services.diagnostics import graph_diagnostics
+from .services.tenants import tenant_registry
+from .services.conversation_state import conversation_store
+from .services.inbound_queue import inbound_queue
+from .services.message_dispatcher import message_dispatcher
+from .routers.webhook import process_message
 
 # Get settings
 settings = get_settings()
 
+# Background task polling the config file for changes from other workers
+config_watch_task = None
+# Background task appending queued appointment rows to Google Sheets
+sheets_flush_task = None
+# Background task mirroring booked Calendar slots into the availability index
+availability_sync_task = None
+# Background task retrying appointments not yet in Sheets/Calendar
+reconcile_task = None
+# Background task sending WhatsApp appointment reminders as they come due
+reminder_task = None
+# Background task replaying messages left unfinished by a previous process (inline webhook mode)
+replay_task = None
+
 # Create FastAPI app
 app = FastAPI(
     title="Karuna Bot API",
     description="WhatsApp Chatbot with Meta Business API",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=FastJSONResponse
 )
 
+# Compress larger responses (flow lists, blacklist pages and exports)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -46,6 +83,13 @@ app.include_router(webhook_router)
 app.include_router(blacklist_router)
 app.include_router(flows_router)
 app.include_router(messages_router)
+app.include_router(dates_router)
+app.include_router(availability_router)
+app.include_router(appointments_router)
+app.include_router(users_router)
+app.include_router(metrics_router)
+app.include_router(traces_router)
+app.include_router(tenants_router)
 
 
 # Static files for frontend (when built)
@@ -54,10 +98,8 @@ FRONTEND_BUILD_PATH = Path("/app/frontend/dist")
 if not FRONTEND_BUILD_PATH.exists():
     FRONTEND_BUILD_PATH = Path(__file__).parent.parent.parent / "frontend" / "dist"
 
-if FRONTEND_BUILD_PATH.exists():
-    assets_path = FRONTEND_BUILD_PATH / "assets"
-    if assets_path.exists():
-        app.mount("/assets", StaticFiles(directory=assets_path), name="assets")
+# Scanned once: every request below is served from memory
+frontend_manifest = StaticManifest(FRONTEND_BUILD_PATH if FRONTEND_BUILD_PATH.exists() else None)
 
 
 # Privacy Policy Page
@@ -196,33 +238,39 @@ TERMS_OF_SERVICE_HTML = """
 """
 
 
+PRIVACY_POLICY_PAGE = html_asset("privacy.html", PRIVACY_POLICY_HTML, "public, max-age=3600")
+TERMS_OF_SERVICE_PAGE = html_asset("terms.html", TERMS_OF_SERVICE_HTML, "public, max-age=3600")
+
+
 # Add privacy and terms routes to app
 @app.get("/privacy", response_class=HTMLResponse)
-async def privacy_policy():
+async def privacy_policy(request: Request):
     """Privacy policy page."""
-    return HTMLResponse(content=PRIVACY_POLICY_HTML)
+    return PRIVACY_POLICY_PAGE.respond(request)
 
 
 @app.get("/terms", response_class=HTMLResponse)
-async def terms_of_service():
+async def terms_of_service(request: Request):
     """Terms of service page."""
-    return HTMLResponse(content=TERMS_OF_SERVICE_HTML)
+    return TERMS_OF_SERVICE_PAGE.respond(request)
 
 
 # Serve frontend for all other routes (SPA support)
 @app.get("/{full_path:path}")
-async def serve_frontend(full_path: str):
+async def serve_frontend(full_path: str, request: Request):
     """Serve frontend application."""
     # Check if requesting a specific file
-    if FRONTEND_BUILD_PATH.exists():
-        file_path = FRONTEND_BUILD_PATH / full_path
-        if file_path.exists() and file_path.is_file():
-            return FileResponse(file_path)
+    asset = frontend_manifest.get(full_path)
+    if asset is not None:
+        return asset.respond(request)
+
+    # Missing build outputs are a 404, not the SPA shell
+    if full_path.startswith("assets/"):
+        raise HTTPException(status_code=404, detail="Not Found")
 
-        # Return index.html for SPA routing
-        index_path = FRONTEND_BUILD_PATH / "index.html"
-        if index_path.exists():
-            return FileResponse(index_path)
+    # Return index.html for SPA routing
+    if frontend_manifest.index is not None:
+        return frontend_manifest.index.respond(request)
 
     # Fallback message if frontend not built
     return HTMLResponse(
@@ -243,6 +291,28 @@ async def serve_frontend(full_path: str):
 @app.on_event("startup")
 async def startup_event():
     """Application startup with configuration validation."""
+    global config_watch_task, sheets_flush_task, availability_sync_task, reconcile_task, reminder_task, replay_task
+    config_watch_task = asyncio.create_task(
+        config_service.watch_changes(settings.config_watch_interval_ms / 1000)
+    )
+    sheets_flush_task = asyncio.create_task(google_service.sheets_queue.run())
+    availability_sync_task = asyncio.create_task(
+        google_service.watch_availability(settings.availability_sync_interval_ms / 1000)
+    )
+    reconcile_task = asyncio.create_task(
+        google_service.run_reconciler(settings.appointments_reconcile_interval_ms / 1000)
+    )
+    reminder_task = asyncio.create_task(reminder_scheduler.run())
+    # Messages are answered here unless a separate worker consumes the queue
+    if settings.webhook_mode != "queue":
+        message_dispatcher.start(process_message)
+        replay_task = asyncio.create_task(message_dispatcher.consume(
+            max(1, settings.worker_concurrency), settings.worker_poll_interval_ms / 1000
+        ))
+    # First Graph API check in the background, so /ready has state to report
+    if settings.meta_jwt_token and settings.meta_number_id:
+        graph_diagnostics.warm()
+
     ok = "\u2705"
     fail = "\u274c"
 
@@ -288,3 +358,49 @@ async def startup_event():
         print("  See SETUP-META-API.md for setup instructions.")
         print()
     print("=" * 60)
+
+
+async def _finish_task(task: Optional[asyncio.Task], timeout: float) -> None:
+    """Give a stopping task up to timeout to return, then cancel it and wait for it to unwind."""
+    if task is None:
+        return
+    done, _ = await asyncio.wait({task}, timeout=timeout)
+    if not done:
+        task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drain in-flight messages and reminders, stop background tasks and write any pending config changes."""
+    # First, while the services they use are still open; unfinished messages are replayed on next start.
+    # A reminder batch being sent is finished within the same deadline.
+    drain_timeout = settings.shutdown_drain_timeout_ms / 1000
+    reminder_scheduler.stop()
+    await asyncio.gather(
+        message_dispatcher.drain(drain_timeout),
+        _finish_task(reminder_task, drain_timeout)
+    )
+    if replay_task:
+        await replay_task
+
+    if config_watch_task:
+        config_watch_task.cancel()
+    config_service.flush()
+    if availability_sync_task:
+        availability_sync_task.cancel()
+    if reconcile_task:
+        reconcile_task.cancel()
+    reminder_scheduler.close()
+
+    # Last attempt at queued Sheets rows; whatever fails stays queued on disk
+    if sheets_flush_task:
+        sheets_flush_task.cancel()
+    try:
+        await google_service.sheets_queue.flush(force=True)
+    except Exception as e:
+        print(f"Error flushing Sheets queue: {e}")
+    google_service.close()
+    await tenant_registry.close()
+    await conversation_store.close()
+    inbound_queue.close()
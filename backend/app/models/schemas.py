@@ -27,6 +27,15 @@ class HealthResponse(BaseModel):
     status: str = "ok"
     uptime: float
     timestamp: str
+    config_version: int = 0
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    checks: Dict[str, str]
+    graph_checked_at: Optional[float] = None
+    graph_age_seconds: Optional[float] = None
+    timestamp: str
 
 
 # ============= Blacklist =============
@@ -34,6 +43,8 @@ class HealthResponse(BaseModel):
 class BlacklistResponse(BaseModel):
     blacklist: List[str]
     count: int
+    offset: int = 0
+    limit: Optional[int] = None
 
 
 class BlacklistAddRequest(BaseModel):
@@ -47,7 +58,63 @@ class BlacklistRemoveRequest(BaseModel):
 class BlacklistActionResponse(BaseModel):
     status: str
     number: str
-    blacklist: List[str]
+    blacklist: List[str]  # First page only
+    count: int
+
+
+class BlacklistImportResponse(BaseModel):
+    status: str
+    received: int
+    changed: int
+    count: int
+
+
+class BlacklistPrefixRequest(BaseModel):
+    prefix: str
+
+
+class BlacklistPrefixResponse(BaseModel):
+    prefixes: List[str]
+    count: int
+
+
+# ============= User Configs =============
+
+class UserConfig(BaseModel):
+    name: str = ""
+    custom_prompt: str = ""
+    notes: str = ""
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class UserConfigRequest(BaseModel):
+    number: str
+    name: str = ""
+    custom_prompt: str = ""
+    notes: str = ""
+
+
+class UserConfigBulkRequest(BaseModel):
+    configs: List[UserConfigRequest]
+
+
+class UserConfigsResponse(BaseModel):
+    configs: Dict[str, UserConfig]
+    count: int
+
+
+class UserConfigActionResponse(BaseModel):
+    status: str
+    number: str
+
+
+class UserConfigBulkResponse(BaseModel):
+    status: str
+    received: int
+    created: int
+    updated: int
+    count: int
 
 
 # ============= System Prompt =============
@@ -91,6 +158,19 @@ class FlowListResponse(BaseModel):
     current_flow: str
 
 
+class FlowSummary(BaseModel):
+    id: str
+    name: str
+    description: str
+    is_builtin: bool = False
+    flow_type: str = "intelligent"
+
+
+class FlowSummaryListResponse(BaseModel):
+    flows: List[FlowSummary]
+    current_flow: str
+
+
 class FlowActivateRequest(BaseModel):
     flow_id: str
 
@@ -122,11 +202,33 @@ class FlowUpdateRequest(BaseModel):
     menu_options: Optional[List[MenuOption]] = None
 
 
+# ============= Tenants =============
+
+class TenantInfo(BaseModel):
+    id: str
+    name: str
+    phone_number_id: str
+    is_default: bool
+    flow: Optional[str] = None
+    custom_prompt: bool = False
+    blacklist_count: int = 0
+    blacklist_prefixes: int = 0
+    rate_limit_per_second: float
+    rate_limited_sends: int = 0
+
+
+class TenantsResponse(BaseModel):
+    tenants: List[TenantInfo]
+    count: int
+
+
 # ============= Messages =============
 
 class SendMessageRequest(BaseModel):
     number: str
     message: str
+    # Send from this tenant's number instead of META_NUMBER_ID
+    tenant_id: Optional[str] = None
 
 
 class SendMessageResponse(BaseModel):
@@ -135,6 +237,23 @@ class SendMessageResponse(BaseModel):
     message_id: Optional[str] = None
 
 
+class RecentMessage(BaseModel):
+    seq: int
+    id: str
+    direction: str  # in | out
+    from_number: str = Field(alias="from")  # The customer's number, for both directions
+    name: str = ""
+    text: str
+    timestamp: str
+
+
+class RecentMessagesResponse(BaseModel):
+    messages: List[RecentMessage]
+    count: int
+    last_seq: int  # Pass as `after` to /api/messages/stream to continue from here
+    next_before: Optional[int] = None
+
+
 # ============= Meta Webhook =============
 
 class WebhookVerifyParams(BaseModel):
@@ -186,6 +305,86 @@ class AppointmentData(BaseModel):
     phone: str
 
 
+class AppointmentCreateRequest(AppointmentData):
+    # Idempotency key; defaults to a hash of phone, date and time
+    booking_id: Optional[str] = Field(default=None, min_length=1, max_length=200)
+    # Send the reminders from this tenant's number instead of META_NUMBER_ID
+    tenant_id: Optional[str] = None
+
+
+class Appointment(AppointmentData):
+    id: str
+    status: str  # pending, confirmed, cancelled
+    sheets_status: str
+    calendar_status: str
+    event_id: Optional[str] = None
+    html_link: Optional[str] = None
+    attempts: int = 0
+    last_error: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+
+class AppointmentListResponse(BaseModel):
+    appointments: List[Appointment]
+    count: int
+    offset: int
+    limit: int
+
+
+class AppointmentBookingResponse(BaseModel):
+    success: bool
+    booking_id: Optional[str] = None
+    status: Optional[str] = None
+    event_id: Optional[str] = None
+    html_link: Optional[str] = None
+    meet_link: Optional[str] = None
+    start_datetime: Optional[str] = None
+    error: Optional[str] = None
+    slot_taken: bool = False
+
+
+class Reminder(BaseModel):
+    id: str
+    booking_id: str
+    tenant_id: str
+    offset_minutes: int
+    due_at: float  # Epoch seconds
+    status: str  # pending | sent | failed | skipped
+    attempts: int = 0
+    last_error: Optional[str] = None
+    message_id: Optional[str] = None
+    sent_at: Optional[float] = None
+
+
+class ReminderStatsResponse(BaseModel):
+    scheduled: int
+    sent: int
+    failed: int
+    skipped: int
+    batches: int
+    counts: Dict[str, int]
+    next_due: Optional[str] = None
+
+
+class AvailabilityResponse(BaseModel):
+    date: str  # YYYY-MM-DD
+    time: str  # HH:MM
+    free: bool
+    in_business_hours: bool
+
+
+class FreeSlot(BaseModel):
+    date: str  # YYYY-MM-DD
+    time: str  # HH:MM
+    end_time: str  # HH:MM
+
+
+class FreeSlotsResponse(BaseModel):
+    slots: List[FreeSlot]
+    synced_at: Optional[str] = None  # Last Calendar sync, null if never synced
+
+
 class DateParseRequest(BaseModel):
     text: str
 
@@ -193,4 +392,28 @@ class DateParseRequest(BaseModel):
 class DateParseResponse(BaseModel):
     date: str  # YYYY-MM-DD
     time: str  # HH:MM
-    interpretation: str
+    interpretation: Optional[str] = None  # Grok may leave it out
+
+
+class DateParseBatchRequest(BaseModel):
+    texts: List[str]
+
+
+class DateParseBatchItem(BaseModel):
+    index: int
+    text: str
+    date: Optional[str] = None  # YYYY-MM-DD, null when no date was found
+    time: Optional[str] = None  # HH:MM
+    interpretation: Optional[str] = None
+
+
+class DateParserStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    local: int  # Resolved by the rule-based parser
+    llm: int  # Sent to Grok
+    llm_errors: int
+    unparsed: int
+    size: int
+    max_size: int
+    hit_rate: float
@@ -0,0 +1,79 @@
+"""Response helpers: fast JSON rendering and config-versioned conditional GET."""
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from .services.config_service import config_service
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder
+    orjson = None
+
+# Rendered bodies kept per URL variant; entries are replaced when the config changes
+RENDER_CACHE_SIZE = 128
+_render_cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+
+
+def dump_json(content: Any) -> bytes:
+    """Serialize to compact JSON bytes, using orjson when available."""
+    content = jsonable_encoder(content)
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+
+def config_etag(key: str) -> str:
+    """ETag for a config-derived resource, e.g. key='flows:summary'.
+
+    The key is hashed: it carries raw query values (prefix, flow id)
+    that must not end up in a header.
+    """
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return f'"cfg-{config_service.get_config_etag()}-{digest}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def config_json_response(request: Request, key: str, build: Callable[[], Any]) -> Response:
+    """Serve a config-derived JSON payload with ETag / 304 support.
+
+    build() only runs when the config changed since the body for this key
+    was last rendered; unchanged polls get a 304 without touching it.
+    """
+    etag = config_etag(key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    cached = _render_cache.get(key)
+    if cached and cached[0] == etag:
+        body = cached[1]
+        _render_cache.move_to_end(key)
+    else:
+        body = dump_json(build())
+        _render_cache[key] = (etag, body)
+        _render_cache.move_to_end(key)
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+
+    return Response(content=body, media_type="application/json", headers=headers)
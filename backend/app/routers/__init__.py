@@ -3,3 +3,10 @@ from .webhook import router as webhook_router
 from .blacklist import router as blacklist_router
 from .flows import router as flows_router
 from .messages import router as messages_router
+from .dates import router as dates_router
+from .availability import router as availability_router
+from .appointments import router as appointments_router
+from .users import router as users_router
+from .metrics import router as metrics_router
+from .traces import router as traces_router
+from .tenants import router as tenants_router
@@ -0,0 +1,151 @@
+"""Appointment ledger endpoints."""
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from ..models.schemas import (
+    Appointment,
+    AppointmentCreateRequest,
+    AppointmentListResponse,
+    AppointmentBookingResponse,
+    Reminder,
+    ReminderStatsResponse
+)
+from ..services.google_service import google_service
+from ..services.ics import CALENDAR_FOOTER, calendar_header, render_event
+from ..services.local_date_parser import local_now
+from ..services.reminder_scheduler import reminder_scheduler
+from ..services.tenants import DEFAULT_TENANT_ID, tenant_registry
+
+router = APIRouter(prefix="/api/appointments", tags=["appointments"])
+
+# Default feed window around today, and rows read from the ledger per chunk
+FEED_DAYS_BEFORE = 30
+FEED_DAYS_AFTER = 180
+FEED_PAGE_SIZE = 500
+
+
+@router.get("", response_model=AppointmentListResponse)
+async def list_appointments(
+    phone: Optional[str] = None,
+    date_from: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    date_to: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    status: Optional[str] = Query(None, pattern="^(pending|confirmed|cancelled)$"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """List appointments from the local ledger, ordered by date and time."""
+    appointments, total = await asyncio.to_thread(
+        google_service.ledger.find, phone, date_from, date_to, status, limit, offset
+    )
+    return AppointmentListResponse(
+        appointments=[Appointment(**a) for a in appointments],
+        count=total,
+        offset=offset,
+        limit=limit
+    )
+
+
+@router.post("", response_model=AppointmentBookingResponse)
+async def book_appointment(request: AppointmentCreateRequest):
+    """Book an appointment (idempotent per booking_id)."""
+    tenant_id = request.tenant_id or DEFAULT_TENANT_ID
+    if tenant_registry.get(tenant_id) is None:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    datos = request.model_dump(exclude={"booking_id", "tenant_id"})
+    result = await google_service.registrar_cita(datos, request.booking_id, tenant_id)
+    if not result.get("success") and result.get("slot_taken"):
+        raise HTTPException(status_code=409, detail="Slot already booked")
+    return AppointmentBookingResponse(**result)
+
+
+async def _feed_chunks(date_from: str, date_to: str) -> AsyncIterator[str]:
+    """The feed body, one page of VEVENTs per chunk (keyset-paged, never all in memory)."""
+    ledger = google_service.ledger
+    yield calendar_header("PUBLISH", "Citas Karuna")
+    after = None
+    while True:
+        page = await asyncio.to_thread(ledger.page_between, date_from, date_to, after, FEED_PAGE_SIZE)
+        if not page:
+            break
+        yield "".join(
+            render_event(appointment, google_service.meet_link, google_service.karuna_email)
+            for appointment in page
+        )
+        last = page[-1]
+        after = (last["date"], last["time"], last["id"])
+    yield CALENDAR_FOOTER
+
+
+@router.get("/feed.ics")
+async def appointments_feed(
+    request: Request,
+    date_from: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    date_to: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$")
+):
+    """iCalendar feed of all appointments in a date range, for calendar subscriptions.
+
+    Defaults to 30 days back through 180 days ahead. Supports
+    If-None-Match / If-Modified-Since, so polling clients get a 304
+    until an appointment in the range changes.
+    """
+    today = local_now().date()
+    date_from = date_from or (today - timedelta(days=FEED_DAYS_BEFORE)).isoformat()
+    date_to = date_to or (today + timedelta(days=FEED_DAYS_AFTER)).isoformat()
+
+    count, latest = await asyncio.to_thread(google_service.ledger.fingerprint, date_from, date_to)
+    digest = hashlib.sha1(f"{date_from}|{date_to}|{count}|{latest}".encode()).hexdigest()[:20]
+    headers = {
+        "ETag": f'"{digest}"',
+        "Cache-Control": "private, max-age=0, must-revalidate"
+    }
+    modified = None
+    if latest:
+        # Second precision, as HTTP dates have no fractions
+        modified = datetime.fromisoformat(latest).astimezone().replace(microsecond=0)
+        headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*" or headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+    elif modified and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            if modified <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    return StreamingResponse(
+        _feed_chunks(date_from, date_to),
+        media_type="text/calendar",
+        headers={**headers, "Content-Disposition": 'inline; filename="citas.ics"'}
+    )
+
+
+@router.get("/reminders/stats", response_model=ReminderStatsResponse)
+async def reminder_stats():
+    """WhatsApp reminder counts and the next one due."""
+    return ReminderStatsResponse(**await asyncio.to_thread(reminder_scheduler.get_stats))
+
+
+@router.get("/{booking_id}", response_model=Appointment)
+async def get_appointment(booking_id: str):
+    """Get one appointment with its Sheets/Calendar sync state."""
+    appointment = await asyncio.to_thread(google_service.ledger.get, booking_id)
+    if not appointment:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    return Appointment(**appointment)
+
+
+@router.get("/{booking_id}/reminders", response_model=List[Reminder])
+async def get_appointment_reminders(booking_id: str):
+    """WhatsApp reminders scheduled for one appointment."""
+    if not await asyncio.to_thread(google_service.ledger.get, booking_id):
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    reminders = await asyncio.to_thread(reminder_scheduler.for_booking, booking_id)
+    return [Reminder(**r) for r in reminders]
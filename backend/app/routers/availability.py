@@ -0,0 +1,50 @@
+"""Appointment availability endpoints."""
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from ..models.schemas import AvailabilityResponse, FreeSlot, FreeSlotsResponse
+from ..services.appointment_ledger import APPOINTMENT_DURATION
+from ..services.google_service import google_service
+
+router = APIRouter(prefix="/api/availability", tags=["availability"])
+
+
+@router.get("", response_model=AvailabilityResponse)
+async def check_availability(
+    date: str = Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    time: str = Query(..., pattern=r"^\d{2}:\d{2}$")
+):
+    """Check whether a 1-hour appointment slot is free."""
+    try:
+        start = datetime.fromisoformat(f"{date}T{time}")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date or time")
+
+    end = start + APPOINTMENT_DURATION
+    return AvailabilityResponse(
+        date=date,
+        time=time,
+        free=google_service.availability.is_free(start, end),
+        in_business_hours=google_service.availability.in_business_hours(start, end)
+    )
+
+
+@router.get("/slots", response_model=FreeSlotsResponse)
+async def get_free_slots(
+    count: int = Query(5, ge=1, le=50),
+    after: Optional[datetime] = None
+):
+    """Get the next free appointment slots in business hours."""
+    slots = google_service.get_free_slots(count, after)
+    synced_at = google_service.availability.synced_at
+    return FreeSlotsResponse(
+        slots=[
+            FreeSlot(
+                date=start.strftime("%Y-%m-%d"),
+                time=start.strftime("%H:%M"),
+                end_time=end.strftime("%H:%M")
+            )
+            for start, end in slots
+        ],
+        synced_at=synced_at.isoformat() if synced_at else None
+    )
@@ -1,47 +1,184 @@
 """Blacklist management endpoints."""
-from fastapi import APIRouter
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Iterator, List
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from ..models.schemas import (
     BlacklistResponse,
     BlacklistAddRequest,
     BlacklistRemoveRequest,
-    BlacklistActionResponse
+    BlacklistActionResponse,
+    BlacklistImportResponse,
+    BlacklistPrefixRequest,
+    BlacklistPrefixResponse
 )
+from ..responses import config_json_response
 from ..services.config_service import config_service
 
 router = APIRouter(prefix="/api/blacklist", tags=["blacklist"])
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
 
-@router.get("", response_model=BlacklistResponse)
-async def get_blacklist():
-    """Get all blacklisted numbers."""
-    blacklist = config_service.get_blacklist()
-    return BlacklistResponse(
-        blacklist=blacklist,
-        count=len(blacklist)
+
+def _action_response(status: str, number: str) -> BlacklistActionResponse:
+    """Build an add/remove response carrying only the first page."""
+    page, total = config_service.get_blacklist_page(0, DEFAULT_PAGE_SIZE)
+    return BlacklistActionResponse(
+        status=status,
+        number=number,
+        blacklist=page,
+        count=total
     )
 
 
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    """Yield decoded lines from the request body as it streams in."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.strip()
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def _parse_line(line: str, fmt: str) -> str:
+    """Extract the phone number from one CSV or NDJSON line."""
+    if fmt == "ndjson":
+        item = json.loads(line)
+        return str(item.get("number", "")) if isinstance(item, dict) else str(item)
+    row = next(csv.reader([line]), [])
+    return row[0] if row else ""
+
+
+def _export_lines(numbers: List[str], fmt: str) -> Iterator[str]:
+    """Render the blacklist in chunks so large exports stream out."""
+    if fmt == "csv":
+        yield "number\n"
+    for start in range(0, len(numbers), EXPORT_CHUNK_SIZE):
+        chunk = numbers[start:start + EXPORT_CHUNK_SIZE]
+        if fmt == "ndjson":
+            yield "".join(json.dumps({"number": n}) + "\n" for n in chunk)
+        else:
+            yield "".join(n + "\n" for n in chunk)
+
+
+@router.get("", response_model=BlacklistResponse)
+async def get_blacklist(
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    prefix: str = ""
+):
+    """Get a page of blacklisted numbers, optionally filtered by prefix."""
+    def build():
+        page, total = config_service.get_blacklist_page(offset, limit, prefix)
+        return BlacklistResponse(
+            blacklist=page,
+            count=total,
+            offset=offset,
+            limit=limit
+        )
+
+    return config_json_response(request, f"blacklist:{offset}:{limit}:{prefix}", build)
+
+
 @router.post("/add", response_model=BlacklistActionResponse)
 async def add_to_blacklist(request: BlacklistAddRequest):
     """Add a number to the blacklist."""
     config_service.add_to_blacklist(request.number)
-    blacklist = config_service.get_blacklist()
-
-    return BlacklistActionResponse(
-        status="added",
-        number=request.number,
-        blacklist=blacklist
-    )
+    return _action_response("added", request.number)
 
 
 @router.post("/remove", response_model=BlacklistActionResponse)
 async def remove_from_blacklist(request: BlacklistRemoveRequest):
     """Remove a number from the blacklist."""
     config_service.remove_from_blacklist(request.number)
-    blacklist = config_service.get_blacklist()
+    return _action_response("removed", request.number)
 
-    return BlacklistActionResponse(
-        status="removed",
-        number=request.number,
-        blacklist=blacklist
+
+@router.post("/import", response_model=BlacklistImportResponse)
+async def import_blacklist(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    mode: str = Query("add", pattern="^(add|remove)$")
+):
+    """Bulk add or remove numbers from a streamed CSV or NDJSON body.
+
+    CSV: the first column of each row is the number; header rows are ignored.
+    NDJSON: each line is {"number": "..."} or a bare JSON string.
+    """
+    numbers = []
+    async for line in _iter_lines(request):
+        if not line:
+            continue
+        try:
+            number = _parse_line(line, format)
+        except (ValueError, AttributeError):
+            raise HTTPException(status_code=400, detail=f"Invalid {format} line: {line[:100]}")
+        if any(c.isdigit() for c in number):
+            numbers.append(number)
+
+    if mode == "add":
+        changed = config_service.add_many_to_blacklist(numbers)
+    else:
+        changed = config_service.remove_many_from_blacklist(numbers)
+
+    return BlacklistImportResponse(
+        status="imported" if mode == "add" else "removed",
+        received=len(numbers),
+        changed=changed,
+        count=config_service.get_blacklist_count()
     )
+
+
+@router.get("/export")
+async def export_blacklist(format: str = Query("csv", pattern="^(csv|ndjson)$")):
+    """Stream the full blacklist as CSV or NDJSON."""
+    numbers = config_service.get_blacklist()
+    return StreamingResponse(
+        _export_lines(numbers, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=blacklist.{format}"}
+    )
+
+
+# ============= Prefix Rules =============
+
+@router.get("/prefixes", response_model=BlacklistPrefixResponse)
+async def get_blacklist_prefixes(request: Request):
+    """Get prefix block rules (e.g. country or carrier prefixes)."""
+    def build():
+        prefixes = config_service.get_blacklist_prefixes()
+        return BlacklistPrefixResponse(prefixes=prefixes, count=len(prefixes))
+
+    return config_json_response(request, "blacklist:prefixes", build)
+
+
+@router.post("/prefixes/add", response_model=BlacklistPrefixResponse)
+async def add_blacklist_prefix(request: BlacklistPrefixRequest):
+    """Block every number starting with a prefix."""
+    if not any(c.isdigit() for c in request.prefix):
+        raise HTTPException(status_code=400, detail="Prefix must contain digits")
+
+    config_service.add_blacklist_prefix(request.prefix)
+    prefixes = config_service.get_blacklist_prefixes()
+    return BlacklistPrefixResponse(prefixes=prefixes, count=len(prefixes))
+
+
+@router.post("/prefixes/remove", response_model=BlacklistPrefixResponse)
+async def remove_blacklist_prefix(request: BlacklistPrefixRequest):
+    """Remove a prefix block rule."""
+    config_service.remove_blacklist_prefix(request.prefix)
+    prefixes = config_service.get_blacklist_prefixes()
+    return BlacklistPrefixResponse(prefixes=prefixes, count=len(prefixes))
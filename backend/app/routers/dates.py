@@ -0,0 +1,58 @@
+"""Date parsing endpoints."""
+from typing import AsyncIterator, List
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from ..models.schemas import (
+    DateParseRequest,
+    DateParseResponse,
+    DateParseBatchRequest,
+    DateParseBatchItem,
+    DateParserStatsResponse
+)
+from ..services.date_parser_service import date_parser_service
+
+router = APIRouter(prefix="/api/parse-date", tags=["dates"])
+
+MAX_BATCH_SIZE = 10000
+
+
+async def _batch_lines(texts: List[str]) -> AsyncIterator[str]:
+    """Render batch results as NDJSON, one line per input text."""
+    async for index, result in date_parser_service.parse_many(texts):
+        item = DateParseBatchItem(index=index, text=texts[index], **(result or {}))
+        yield item.model_dump_json() + "\n"
+
+
+@router.post("", response_model=DateParseResponse)
+async def parse_date(request: DateParseRequest):
+    """Parse a Spanish date/time expression like "manana a las 3"."""
+    result = await date_parser_service.parsear_fecha_hora(request.text)
+    if not result or not result.get("date") or not result.get("time"):
+        raise HTTPException(status_code=422, detail="Could not find a date and time in text")
+    return DateParseResponse(
+        date=result["date"],
+        time=result["time"],
+        interpretation=result.get("interpretation")
+    )
+
+
+@router.post("/batch")
+async def parse_dates(request: DateParseBatchRequest):
+    """Parse many texts, streamed back as NDJSON in input order.
+
+    Duplicates are parsed once, simple expressions locally, and the rest
+    in grouped Grok prompts. Unparseable texts get null date/time.
+    """
+    if len(request.texts) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} texts per batch")
+
+    return StreamingResponse(
+        _batch_lines(request.texts),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get("/stats", response_model=DateParserStatsResponse)
+async def get_date_parser_stats():
+    """Get date parser cache hit rate and how many parses went to the LLM."""
+    return DateParserStatsResponse(**date_parser_service.get_stats())
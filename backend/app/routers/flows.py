@@ -1,9 +1,11 @@
 """Flow management endpoints."""
-from typing import List
-from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, Union
+from fastapi import APIRouter, HTTPException, Request
 from ..models.schemas import (
     FlowData,
     FlowListResponse,
+    FlowSummary,
+    FlowSummaryListResponse,
     FlowActivateRequest,
     FlowActivateResponse,
     FlowCreateRequest,
@@ -12,21 +14,49 @@ from ..models.schemas import (
     PromptUpdateRequest,
     PromptUpdateResponse
 )
+from ..responses import config_json_response
 from ..services.config_service import config_service
 from ..services.grok_service import grok_service
 
 router = APIRouter(tags=["flows"])
 
 
+def _build_flow_data(flow_id: str, flow_data: Dict[str, Any]) -> FlowData:
+    """Convert a stored flow into the API model."""
+    menu_config = flow_data.get("menu_config") or {}
+    return FlowData(
+        id=flow_id,
+        name=flow_data.get("name", flow_id),
+        description=flow_data.get("description", ""),
+        system_prompt=flow_data.get("prompt", ""),
+        is_builtin=flow_data.get("is_builtin", False),
+        flow_type="menu" if flow_data.get("has_menu") else "intelligent",
+        welcome_message=menu_config.get("welcome_message"),
+        footer_message=menu_config.get("footer_message"),
+        menu_options=menu_config.get("options")
+    )
+
+
+def _build_flow_summary(flow_id: str, flow_data: Dict[str, Any]) -> FlowSummary:
+    """Convert a stored flow into the compact list model (no prompt bodies)."""
+    return FlowSummary(
+        id=flow_id,
+        name=flow_data.get("name", flow_id),
+        description=flow_data.get("description", ""),
+        is_builtin=flow_data.get("is_builtin", False),
+        flow_type="menu" if flow_data.get("has_menu") else "intelligent"
+    )
+
+
 # ============= Prompt Endpoints =============
 
 @router.get("/api/prompt", response_model=PromptResponse)
-async def get_prompt():
+async def get_prompt(request: Request):
     """Get current system prompt."""
-    return PromptResponse(
+    return config_json_response(request, "prompt", lambda: PromptResponse(
         prompt=config_service.get_system_prompt(),
         current_flow=config_service.get_current_flow()
-    )
+    ))
 
 
 @router.post("/api/prompt", response_model=PromptUpdateResponse)
@@ -43,51 +73,40 @@ async def update_prompt(request: PromptUpdateRequest):
 
 # ============= Flow Endpoints =============
 
-@router.get("/api/flows", response_model=FlowListResponse)
-async def get_flows():
-    """Get all available flows."""
-    all_flows = config_service.get_all_flows()
-    current_flow = config_service.get_current_flow()
-
-    flows = []
-    for flow_id, flow_data in all_flows.items():
-        flows.append(FlowData(
-            id=flow_id,
-            name=flow_data.get("name", flow_id),
-            description=flow_data.get("description", ""),
-            system_prompt=flow_data.get("prompt", ""),
-            is_builtin=flow_data.get("is_builtin", False),
-            flow_type="menu" if flow_data.get("has_menu") else "intelligent",
-            welcome_message=flow_data.get("menu_config", {}).get("welcome_message") if flow_data.get("menu_config") else None,
-            footer_message=flow_data.get("menu_config", {}).get("footer_message") if flow_data.get("menu_config") else None,
-            menu_options=flow_data.get("menu_config", {}).get("options") if flow_data.get("menu_config") else None
-        ))
-
-    return FlowListResponse(
-        flows=flows,
-        current_flow=current_flow
-    )
+@router.get("/api/flows", response_model=Union[FlowListResponse, FlowSummaryListResponse])
+async def get_flows(request: Request, summary: bool = False):
+    """Get all available flows.
+
+    With ?summary=true prompt bodies and menu contents are omitted; fetch
+    a single flow for the full data.
+    """
+    def build():
+        all_flows = config_service.get_all_flows()
+        current_flow = config_service.get_current_flow()
+
+        if summary:
+            return FlowSummaryListResponse(
+                flows=[_build_flow_summary(flow_id, data) for flow_id, data in all_flows.items()],
+                current_flow=current_flow
+            )
+
+        return FlowListResponse(
+            flows=[_build_flow_data(flow_id, data) for flow_id, data in all_flows.items()],
+            current_flow=current_flow
+        )
+
+    return config_json_response(request, "flows:summary" if summary else "flows", build)
 
 
 @router.get("/api/flows/{flow_id}", response_model=FlowData)
-async def get_flow(flow_id: str):
+async def get_flow(request: Request, flow_id: str):
     """Get a specific flow."""
     flow_data = config_service.get_flow_data(flow_id)
 
     if not flow_data:
         raise HTTPException(status_code=404, detail="Flow not found")
 
-    return FlowData(
-        id=flow_id,
-        name=flow_data.get("name", flow_id),
-        description=flow_data.get("description", ""),
-        system_prompt=flow_data.get("prompt", ""),
-        is_builtin=flow_data.get("is_builtin", False),
-        flow_type="menu" if flow_data.get("has_menu") else "intelligent",
-        welcome_message=flow_data.get("menu_config", {}).get("welcome_message") if flow_data.get("menu_config") else None,
-        footer_message=flow_data.get("menu_config", {}).get("footer_message") if flow_data.get("menu_config") else None,
-        menu_options=flow_data.get("menu_config", {}).get("options") if flow_data.get("menu_config") else None
-    )
+    return config_json_response(request, f"flow:{flow_id}", lambda: _build_flow_data(flow_id, flow_data))
 
 
 @router.post("/api/flow/activate", response_model=FlowActivateResponse)
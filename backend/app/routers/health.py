@@ -2,8 +2,13 @@
 import time
 from datetime import datetime
 from fastapi import APIRouter
-from ..models.schemas import HealthResponse, ConnectionStatusResponse, ConnectionStatus
+from fastapi.responses import JSONResponse
+from ..models.schemas import HealthResponse, ReadinessResponse, ConnectionStatusResponse, ConnectionStatus
 from ..config import get_settings
+from ..services.config_service import config_service
+from ..services.diagnostics import graph_diagnostics
+from ..services.grok_service import grok_service
+from ..services.message_dispatcher import message_dispatcher
 
 router = APIRouter(tags=["health"])
 
@@ -21,8 +26,56 @@ async def health_check():
     return HealthResponse(
         status="ok",
         uptime=time.time() - START_TIME,
+        timestamp=datetime.now().isoformat(),
+        config_version=config_service.get_config_version()
+    )
+
+
+def _configured(value: str) -> bool:
+    return bool(value) and not value.startswith("your_")
+
+
+def _graph_state() -> str:
+    """Last Graph API check: unknown (none yet), ok, unreachable (network) or rejected (HTTP error)."""
+    snapshot = graph_diagnostics.cached()
+    if snapshot is None:
+        return "unknown"
+    status_code = snapshot["phone"]["status_code"]
+    if status_code == 200:
+        return "ok"
+    return "unreachable" if status_code is None else "rejected"
+
+
+@router.get("/ready", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+async def readiness_check():
+    """Readiness probe from cached state only; never calls the Graph API.
+
+    503 when credentials are missing, Meta rejected the last check or
+    the process is shutting down (draining in-flight messages).
+    A network failure on the last check is reported but not fatal.
+    """
+    settings = get_settings()
+    checks = {
+        "credentials": "ok" if _configured(settings.meta_jwt_token) and _configured(settings.meta_number_id) else "missing",
+        "grok": "ok" if grok_service.client is not None else "missing",
+        "graph": _graph_state(),
+        "messages": "draining" if message_dispatcher.draining else "ok"
+    }
+    ready = (
+        checks["credentials"] == "ok" and checks["grok"] == "ok"
+        and checks["graph"] != "rejected" and checks["messages"] == "ok"
+    )
+    cache = graph_diagnostics.cache_info()
+    response = ReadinessResponse(
+        ready=ready,
+        checks=checks,
+        graph_checked_at=cache["checked_at"],
+        graph_age_seconds=cache["age_seconds"],
         timestamp=datetime.now().isoformat()
     )
+    if not ready:
+        return JSONResponse(status_code=503, content=response.model_dump())
+    return response
 
 
 @router.get("/api/connection-status", response_model=ConnectionStatusResponse)
@@ -1,18 +1,110 @@
-"""Message sending endpoints."""
-from fastapi import APIRouter
-from ..models.schemas import SendMessageRequest, SendMessageResponse
-from ..services.whatsapp_service import whatsapp_service
+"""Message sending endpoints and the recent-messages feed."""
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from ..models.schemas import (
+    SendMessageRequest,
+    SendMessageResponse,
+    RecentMessage,
+    RecentMessagesResponse
+)
+from ..services.message_log import message_log, OUTBOUND
+from ..services.tenants import tenant_registry
 
 router = APIRouter(tags=["messages"])
 
+# Comment line sent on idle feeds so proxies keep the connection open
+STREAM_HEARTBEAT_SECONDS = 15.0
+
 
 @router.post("/v1/messages", response_model=SendMessageResponse)
 async def send_message(request: SendMessageRequest):
-    """Send a WhatsApp message."""
-    result = await whatsapp_service.send_message(request.number, request.message)
+    """Send a WhatsApp message (from a tenant's number if tenant_id is given)."""
+    tenant = tenant_registry.get(request.tenant_id) if request.tenant_id else tenant_registry.default
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    result = await tenant.whatsapp.send_message(request.number, request.message)
+    if result.get("success"):
+        message_log.record(OUTBOUND, request.number, request.message, message_id=result.get("message_id"))
 
     return SendMessageResponse(
         status="sent" if result.get("success") else "error",
         number=request.number,
         message_id=result.get("message_id")
     )
+
+
+@router.get("/api/messages/recent", response_model=RecentMessagesResponse)
+async def recent_messages(
+    limit: int = Query(50, ge=1, le=1000),
+    before: Optional[int] = Query(None, ge=1)
+):
+    """Recent inbound and outbound messages, newest first.
+
+    Pass ``next_before`` from a response as ``before`` for the next page.
+    """
+    messages, next_before = message_log.page(limit, before)
+    return RecentMessagesResponse(
+        messages=[RecentMessage(**m) for m in messages],
+        count=len(messages),
+        last_seq=message_log.last_seq,
+        next_before=next_before
+    )
+
+
+def _sse(entry: dict) -> str:
+    return f"id: {entry['seq']}\nevent: message\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+
+
+@router.get("/api/messages/stream")
+async def stream_messages(request: Request, after: Optional[int] = Query(None, ge=0)):
+    """Server-sent events: every new message as it is recorded.
+
+    Reconnecting clients (Last-Event-ID, or ``after``) first get what
+    they missed while it is still in the buffer. A client that falls
+    too far behind gets a ``dropped`` event and should reconnect.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if after is None and last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
+
+    # Subscribe before replaying so nothing recorded in between is missed
+    subscriber = message_log.subscribe()
+    backlog = message_log.since(after) if after is not None else []
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            last_sent = after or 0
+            for entry in backlog:
+                last_sent = entry["seq"]
+                yield _sse(entry)
+            while True:
+                if subscriber.dropped and subscriber.queue.empty():
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+                try:
+                    entry = await asyncio.wait_for(subscriber.queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if entry["seq"] > last_sent:
+                    last_sent = entry["seq"]
+                    yield _sse(entry)
+        finally:
+            message_log.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # identity: keeps GZipMiddleware from buffering the stream
+        headers={"Cache-Control": "no-cache", "Content-Encoding": "identity", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/api/messages/stats")
+async def message_log_stats():
+    """Ring buffer size and live subscriber counts."""
+    return message_log.get_stats()
@@ -0,0 +1,100 @@
+"""Prometheus scrape endpoint."""
+from fastapi import APIRouter
+from fastapi.responses import Response
+from ..services.date_parser_service import date_parser_service
+from ..services.google_service import google_service
+from ..services.grok_service import grok_service
+from ..services.inbound_queue import inbound_queue
+from ..services.message_log import message_log
+from ..services.metrics import metrics
+from ..services.reminder_scheduler import reminder_scheduler
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+# ============= Scrape-time readings =============
+# Queue depths and cache counters already tracked by each service
+
+metrics.counter_callback(
+    "date_parse_cache_lookups_total", "Date parser cache lookups by result",
+    lambda: {
+        ("hit",): date_parser_service.stats["hits"],
+        ("miss",): date_parser_service.stats["misses"]
+    },
+    ("result",)
+)
+metrics.counter_callback(
+    "date_parse_resolved_total", "Date texts resolved, by resolver",
+    lambda: {
+        (source,): date_parser_service.stats[source]
+        for source in ("local", "llm", "llm_errors", "unparsed")
+    },
+    ("resolver",)
+)
+metrics.gauge_callback(
+    "date_parse_cache_hit_ratio", "Date parser cache hit rate since startup",
+    lambda: {(): date_parser_service.get_stats()["hit_rate"]}
+)
+metrics.gauge_callback(
+    "date_parse_cache_entries", "Entries in the date parser cache",
+    lambda: {(): date_parser_service.get_stats()["size"]}
+)
+metrics.gauge_callback(
+    "sheets_queue_pending", "Appointment rows waiting to be appended to Sheets",
+    lambda: {(): google_service.sheets_queue.pending()}
+)
+metrics.gauge_callback(
+    "sheets_queue_oldest_age_seconds", "Age of the oldest row waiting for Sheets",
+    lambda: {(): google_service.sheets_queue.get_stats()["oldest_age"]}
+)
+metrics.counter_callback(
+    "sheets_queue_errors_total", "Failed Sheets batch appends",
+    lambda: {(): google_service.sheets_queue.stats["errors"]}
+)
+metrics.gauge_callback(
+    "appointments", "Appointments in the local ledger by status (unsynced = not yet in Sheets/Calendar, sync_failed = gave up)",
+    lambda: {(status,): count for status, count in google_service.ledger.counts().items()},
+    ("status",)
+)
+metrics.gauge_callback(
+    "google_pool_queued", "Google API calls waiting for a pool thread",
+    lambda: {(): google_service._executor._work_queue.qsize()}
+)
+metrics.gauge_callback(
+    "availability_events", "Booked intervals in the availability index",
+    lambda: {(): len(google_service.availability)}
+)
+metrics.gauge_callback(
+    "reminders_pending", "WhatsApp reminders waiting to be sent",
+    lambda: {(): reminder_scheduler.pending()}
+)
+metrics.counter_callback(
+    "reminders_total", "Reminder outcomes since startup",
+    lambda: {(outcome,): reminder_scheduler.stats[outcome] for outcome in ("sent", "failed", "skipped")},
+    ("outcome",)
+)
+metrics.gauge_callback(
+    "message_feed_subscribers", "Dashboard clients on the live message feed",
+    lambda: {(): message_log.get_stats()["subscribers"]}
+)
+metrics.gauge_callback(
+    "inbound_queue_messages", "Webhook payloads in the durable queue by state (dead = out of attempts)",
+    lambda: {(state,): inbound_queue.get_stats()[state] for state in ("waiting", "in_flight", "dead")},
+    ("state",)
+)
+metrics.gauge_callback(
+    "inbound_queue_oldest_age_seconds", "Age of the oldest webhook payload not yet processed",
+    lambda: {(): inbound_queue.get_stats()["oldest_age"]}
+)
+metrics.gauge_callback(
+    "conversations", "Conversations held in memory",
+    lambda: {(): grok_service.conversation_count()}
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,22 @@
+"""Tenant (phone number) listing."""
+from fastapi import APIRouter, HTTPException
+from ..models.schemas import TenantInfo, TenantsResponse
+from ..services.tenants import tenant_registry
+
+router = APIRouter(prefix="/api/tenants", tags=["tenants"])
+
+
+@router.get("", response_model=TenantsResponse)
+async def list_tenants():
+    """Phone numbers served by this process, with their flow and send pacing (no credentials)."""
+    tenants = [TenantInfo(**tenant.to_dict()) for tenant in tenant_registry.all()]
+    return TenantsResponse(tenants=tenants, count=len(tenants))
+
+
+@router.get("/{tenant_id}", response_model=TenantInfo)
+async def get_tenant(tenant_id: str):
+    """One tenant by id."""
+    tenant = tenant_registry.get(tenant_id)
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    return TenantInfo(**tenant.to_dict())
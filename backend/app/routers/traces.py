@@ -0,0 +1,36 @@
+"""Per-message traces for debugging slow or failed replies."""
+from fastapi import APIRouter, HTTPException, Query
+from ..services.tracing import tracer
+
+router = APIRouter(prefix="/debug/traces", tags=["debug"])
+
+
+@router.get("")
+async def recent_traces(limit: int = Query(50, ge=1, le=1000)):
+    """Most recent message traces, newest first, without their spans."""
+    traces = tracer.recent(limit)
+    return {
+        "traces": [
+            {
+                "message_id": trace.message_id,
+                "trace_id": trace.trace_id,
+                "duration_ms": trace.root.to_dict()["duration_ms"],
+                "finished": trace.root.end_ns is not None,
+                "outcome": trace.root.attributes.get("outcome"),
+                "error": trace.root.error,
+                "spans": len(trace.spans)
+            }
+            for trace in traces
+        ],
+        "count": len(traces),
+        "capacity": tracer.capacity
+    }
+
+
+@router.get("/{message_id}")
+async def get_trace(message_id: str):
+    """All spans of one inbound message (its WhatsApp wamid), in start order."""
+    trace = tracer.get(message_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_dict()
@@ -0,0 +1,74 @@
+"""Per-user configuration endpoints (name, custom prompt and notes per number)."""
+from fastapi import APIRouter, HTTPException, Request
+from ..models.schemas import (
+    UserConfig,
+    UserConfigRequest,
+    UserConfigBulkRequest,
+    UserConfigsResponse,
+    UserConfigActionResponse,
+    UserConfigBulkResponse
+)
+from ..responses import config_json_response
+from ..services.config_service import config_service
+from ..services.blacklist_index import normalize_number
+
+router = APIRouter(prefix="/api/users", tags=["users"])
+
+MAX_BULK_SIZE = 50000
+
+
+@router.get("/config", response_model=UserConfigsResponse)
+async def get_user_configs(request: Request):
+    """Get every per-user override, keyed by number."""
+    def build():
+        configs = config_service.get_user_configs()
+        return UserConfigsResponse(
+            configs={number: UserConfig(**config) for number, config in configs.items()},
+            count=len(configs)
+        )
+
+    return config_json_response(request, "users:config", build)
+
+
+@router.post("/config", response_model=UserConfigActionResponse)
+async def save_user_config(request: UserConfigRequest):
+    """Create or update the overrides for one number."""
+    number = normalize_number(request.number)
+    if not number:
+        raise HTTPException(status_code=400, detail="Number must contain digits")
+
+    config_service.save_user_config(number, request.name, request.custom_prompt, request.notes)
+    return UserConfigActionResponse(status="saved", number=number)
+
+
+@router.post("/config/bulk", response_model=UserConfigBulkResponse)
+async def bulk_save_user_configs(request: UserConfigBulkRequest):
+    """Create or update many overrides (e.g. a CRM import) in a single config write."""
+    if len(request.configs) > MAX_BULK_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_SIZE} configs per request")
+
+    created, updated = config_service.save_user_configs(c.model_dump() for c in request.configs)
+    return UserConfigBulkResponse(
+        status="imported",
+        received=len(request.configs),
+        created=created,
+        updated=updated,
+        count=len(config_service.get_user_configs())
+    )
+
+
+@router.get("/{number}/config", response_model=UserConfig)
+async def get_user_config(number: str):
+    """Get the overrides for one number."""
+    config = config_service.get_user_config(number)
+    if config is None:
+        raise HTTPException(status_code=404, detail="User config not found")
+    return UserConfig(**config)
+
+
+@router.delete("/{number}/config", response_model=UserConfigActionResponse)
+async def delete_user_config(number: str):
+    """Remove the overrides for one number."""
+    if not config_service.delete_user_config(number):
+        raise HTTPException(status_code=404, detail="User config not found")
+    return UserConfigActionResponse(status="deleted", number=normalize_number(number))
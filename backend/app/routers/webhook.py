@@ -1,11 +1,22 @@
 """Meta WhatsApp webhook endpoints."""
 import asyncio
+import time
 import traceback
+from contextlib import contextmanager
+from typing import Iterator, Optional
 from fastapi import APIRouter, Request, Response, HTTPException, BackgroundTasks
+from fastapi.responses import JSONResponse
 from ..config import get_settings
 from ..services.whatsapp_service import whatsapp_service
 from ..services.grok_service import grok_service
 from ..services.config_service import config_service
+from ..services.diagnostics import graph_diagnostics
+from ..services.message_log import message_log, INBOUND, OUTBOUND
+from ..services.metrics import messages_total, pipeline_stage_seconds, reply_seconds
+from ..services.tenants import tenant_registry
+from ..services.inbound_queue import inbound_queue, payload_message_id
+from ..services.message_dispatcher import message_dispatcher
+from ..services.tracing import Trace, tracer
 
 router = APIRouter(tags=["webhook"])
 
@@ -32,57 +43,107 @@ async def verify_webhook(request: Request):
     raise HTTPException(status_code=403, detail="Verification failed")
 
 
-async def process_message(body: dict):
-    """Process incoming WhatsApp message in background."""
+@contextmanager
+def _stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage for /metrics and as a span of the message trace."""
+    with pipeline_stage_seconds.time(name), tracer.span(name):
+        yield
+
+
+def _outcome(trace: Trace, outcome: str) -> None:
+    messages_total.inc(outcome)
+    trace.root.set_attribute("outcome", outcome)
+
+
+async def process_message(body: dict, received_at: Optional[float] = None):
+    """Process incoming WhatsApp message in background.
+
+    received_at is the perf_counter() value when the webhook arrived,
+    for the end-to-end reply latency metric. The trace starts there
+    too, so time spent queued behind the 200 response is visible.
+    """
+    received_at = received_at or time.perf_counter()
+    start_ns = time.time_ns() - int((time.perf_counter() - received_at) * 1e9)
+    with tracer.start_trace("whatsapp.message", start_ns=start_ns) as trace:
+        await _process_message(body, received_at, trace)
+
+
+async def _process_message(body: dict, received_at: float, trace: Trace):
     try:
         # Extract message data
-        message_data = whatsapp_service.extract_message_data(body)
+        with _stage("extract"):
+            message_data = whatsapp_service.extract_message_data(body)
         print(f"STEP 1 - Extracted message data: {message_data}")
 
         if not message_data:
             print("STEP 1 - No message data (status update), skipping")
+            _outcome(trace, "status_update")
             return
 
         from_number = message_data.get("from")
         message_text = message_data.get("text")
         message_id = message_data.get("message_id")
         message_type = message_data.get("type")
+        if message_id:
+            tracer.bind(trace, message_id)
+        trace.root.set_attribute("type", message_type or "")
+
+        # Route to the brand that owns the receiving number
+        tenant = tenant_registry.resolve(message_data.get("phone_number_id"))
+        if tenant is None:
+            print(f"STEP 1 SKIP - No tenant for phone_number_id {message_data.get('phone_number_id')}")
+            _outcome(trace, "unknown_tenant")
+            return
+        trace.root.set_attribute("tenant", tenant.id)
+        whatsapp = tenant.whatsapp
 
         print(f"STEP 2 - Message from {from_number}: {message_text} (type: {message_type})")
 
         # Skip non-text messages
         if message_type != "text" or not message_text:
             print(f"STEP 2 SKIP - Non-text message type: {message_type}")
+            _outcome(trace, "non_text")
             return
 
         # Check if number is blacklisted
-        if config_service.is_blacklisted(from_number):
+        with _stage("blacklist"):
+            blocked = config_service.is_blacklisted(from_number) or tenant.is_blacklisted(from_number)
+        if blocked:
             print(f"STEP 2 SKIP - Number {from_number} is blacklisted")
+            _outcome(trace, "blacklisted")
             return
 
         # Skip group messages
         if "@g.us" in from_number:
             print("STEP 2 SKIP - Group message")
+            _outcome(trace, "group")
             return
 
+        message_log.record(INBOUND, from_number, message_text, message_data.get("name"), message_id)
+
         # Mark message as read
         print("STEP 3 - Marking message as read...")
-        read_result = await whatsapp_service.mark_as_read(message_id)
+        with _stage("mark_read"):
+            read_result = await whatsapp.mark_as_read(message_id)
         print(f"STEP 3 - Mark as read result: {read_result}")
 
         # Handle reset command
         if message_text.lower().strip() in ["reset", "reiniciar", "limpiar"]:
-            grok_service.clear_conversation(from_number)
-            result = await whatsapp_service.send_message(
-                from_number,
-                "Conversacion reiniciada. Como puedo ayudarte?"
-            )
+            await grok_service.clear_conversation(tenant.conversation_key(from_number))
+            reply = "Conversacion reiniciada. Como puedo ayudarte?"
+            with _stage("send"):
+                result = await whatsapp.send_message(from_number, reply)
             print(f"STEP 3 - Reset sent: {result}")
+            if result.get("success"):
+                message_log.record(OUTBOUND, from_number, reply, message_id=result.get("message_id"))
+                reply_seconds.observe(time.perf_counter() - received_at)
+            _outcome(trace, "reset" if result.get("success") else "send_failed")
             return
 
         # Get AI response
         print("STEP 4 - Getting AI response from Grok...")
-        response = await grok_service.get_response(from_number, message_text)
+        with _stage("grok"):
+            response = await grok_service.get_response(from_number, message_text, tenant)
         print(f"STEP 4 - Grok response: {response[:200] if response else 'EMPTY'}")
 
         # Check for schedule trigger
@@ -91,28 +152,35 @@ async def process_message(body: dict):
 
         # Send response via WhatsApp
         print(f"STEP 5 - Sending response to {from_number}...")
-        print(f"STEP 5 - Token present: {bool(whatsapp_service.jwt_token)}, Number ID: ...{whatsapp_service.number_id[-4:]}")
-        print(f"STEP 5 - Full URL: {whatsapp_service.base_url}/messages")
-        result = await whatsapp_service.send_message(from_number, response)
+        print(f"STEP 5 - Tenant: {tenant.id}, Token present: {bool(whatsapp.jwt_token)}, Number ID: ...{whatsapp.number_id[-4:]}")
+        print(f"STEP 5 - Full URL: {whatsapp.base_url}/messages")
+        with _stage("send"):
+            result = await whatsapp.send_message(from_number, response)
         print(f"STEP 5 - Send result: {result}")
-        if not result.get("success"):
+        if result.get("success"):
+            message_log.record(OUTBOUND, from_number, response, message_id=result.get("message_id"))
+            reply_seconds.observe(time.perf_counter() - received_at)
+            _outcome(trace, "replied")
+        else:
             print(f"STEP 5 - SEND FAILED! Error: {result.get('error', 'unknown')}")
+            _outcome(trace, "send_failed")
         print(f"{'='*50}\n")
 
     except Exception as e:
+        _outcome(trace, "error")
+        trace.root.set_error(str(e))
         print(f"\nPROCESS MESSAGE ERROR: {str(e)}")
         print(f"TRACEBACK:\n{traceback.format_exc()}")
 
 
 @router.get("/diagnose")
-async def diagnose():
+async def diagnose(refresh: bool = False):
     """Full diagnostic check of all services and configuration.
 
     Checks: credentials, Meta API connectivity, phone number info,
     WhatsApp Business Account status, Grok AI, and webhook app info.
+    Meta API results are cached briefly; ?refresh=true runs them again.
     """
-    import httpx
-
     settings = get_settings()
     results = {
         "overall_status": "CHECKING",
@@ -149,76 +217,66 @@ async def diagnose():
             "META_NUMBER_ID not configured. Get it from: Meta Developer Portal > App > WhatsApp > API Setup > Phone Number ID"
         )
 
-    # 2. Test Meta API - verify token and get phone number info
+    # 2. Meta API checks - phone number, business profile and app, run concurrently and cached
     if token_ok and number_ok:
-        try:
-            async with httpx.AsyncClient() as client:
-                headers = {"Authorization": f"Bearer {settings.meta_jwt_token}"}
-
-                # Test 1: Get phone number info
-                url = f"https://graph.facebook.com/{settings.meta_version}/{settings.meta_number_id}"
-                params = {"fields": "display_phone_number,verified_name,quality_rating,platform_type,status,name_status,is_official_business_account"}
-                response = await client.get(url, headers=headers, params=params, timeout=15.0)
-
-                if response.status_code == 200:
-                    phone_data = response.json()
-                    results["meta_api_check"]["token_valid"] = True
-                    results["meta_api_check"]["number_id_valid"] = True
-                    results["meta_api_check"]["phone_info"] = phone_data
-
-                    # Check if it's a test number
-                    display = phone_data.get("display_phone_number", "")
-                    if "+1 555" in display:
-                        results["meta_api_check"]["is_test_number"] = True
-                        results["recommendations"].append(
-                            "Using Meta TEST number. You can only send messages to numbers added as testers in Meta Developer Portal > App Roles > Roles."
-                        )
-                else:
-                    error_data = response.json() if "application/json" in response.headers.get("content-type", "") else response.text
-                    results["meta_api_check"]["token_valid"] = False
-                    results["meta_api_check"]["status_code"] = response.status_code
-                    results["meta_api_check"]["error"] = error_data
-
-                    if response.status_code == 190 or "expired" in str(error_data).lower():
-                        results["recommendations"].append(
-                            "TOKEN EXPIRED! Temporary tokens expire every 24h. Generate a new one in Meta Developer Portal > WhatsApp > API Setup, or create a System User token for permanent access."
-                        )
-                    elif response.status_code == 401 or response.status_code == 403:
-                        results["recommendations"].append(
-                            "TOKEN INVALID or INSUFFICIENT PERMISSIONS. Re-generate in Meta Developer Portal."
-                        )
-                    else:
-                        results["recommendations"].append(
-                            f"Meta API error {response.status_code}. Check token and number_id."
-                        )
-
-                # Test 2: Get WhatsApp Business Account info
-                if results["meta_api_check"].get("token_valid"):
-                    waba_url = f"https://graph.facebook.com/{settings.meta_version}/{settings.meta_number_id}/whatsapp_business_profile"
-                    params2 = {"fields": "about,address,description,email,profile_picture_url,websites,vertical"}
-                    waba_response = await client.get(waba_url, headers=headers, params=params2, timeout=15.0)
-                    if waba_response.status_code == 200:
-                        results["whatsapp_account"]["business_profile"] = waba_response.json().get("data", [{}])[0] if waba_response.json().get("data") else {}
-                    else:
-                        results["whatsapp_account"]["error"] = f"Could not fetch business profile: {waba_response.status_code}"
-
-                # Test 3: Check registered webhook (app subscription)
-                if results["meta_api_check"].get("token_valid"):
-                    try:
-                        app_url = f"https://graph.facebook.com/{settings.meta_version}/{settings.meta_number_id}"
-                        app_params = {"fields": "messaging_product"}
-                        app_response = await client.get(app_url, headers=headers, params=app_params, timeout=15.0)
-                        if app_response.status_code == 200:
-                            results["webhook_check"]["messaging_product"] = app_response.json().get("messaging_product", "unknown")
-                    except Exception:
-                        pass
-
-        except httpx.ConnectTimeout:
-            results["meta_api_check"]["error"] = "Connection timeout to Meta API"
-            results["recommendations"].append("Network timeout connecting to Meta API. Check internet/firewall.")
-        except Exception as e:
-            results["meta_api_check"]["error"] = str(e)
-            results["recommendations"].append(f"Meta API connection error: {str(e)}")
+        snapshot = await graph_diagnostics.snapshot(force=refresh)
+        results["cache"] = graph_diagnostics.cache_info()
+        phone = snapshot["phone"]
+
+        if phone["status_code"] == 200:
+            phone_data = phone["data"]
+            results["meta_api_check"]["token_valid"] = True
+            results["meta_api_check"]["number_id_valid"] = True
+            results["meta_api_check"]["phone_info"] = phone_data
+
+            # Check if it's a test number
+            display = phone_data.get("display_phone_number", "")
+            if "+1 555" in display:
+                results["meta_api_check"]["is_test_number"] = True
+                results["recommendations"].append(
+                    "Using Meta TEST number. You can only send messages to numbers added as testers in Meta Developer Portal > App Roles > Roles."
+                )
+        elif phone["status_code"] is None:
+            results["meta_api_check"]["error"] = phone["error"]
+            if phone["error"] == "timeout":
+                results["meta_api_check"]["error"] = "Connection timeout to Meta API"
+                results["recommendations"].append("Network timeout connecting to Meta API. Check internet/firewall.")
+            else:
+                results["recommendations"].append(f"Meta API connection error: {phone['error']}")
+        else:
+            error_data = phone["data"]
+            results["meta_api_check"]["token_valid"] = False
+            results["meta_api_check"]["status_code"] = phone["status_code"]
+            results["meta_api_check"]["error"] = error_data
+
+            if phone["status_code"] == 190 or "expired" in str(error_data).lower():
+                results["recommendations"].append(
+                    "TOKEN EXPIRED! Temporary tokens expire every 24h. Generate a new one in Meta Developer Portal > WhatsApp > API Setup, or create a System User token for permanent access."
+                )
+            elif phone["status_code"] == 401 or phone["status_code"] == 403:
+                results["recommendations"].append(
+                    "TOKEN INVALID or INSUFFICIENT PERMISSIONS. Re-generate in Meta Developer Portal."
+                )
+            else:
+                results["recommendations"].append(
+                    f"Meta API error {phone['status_code']}. Check token and number_id."
+                )
+
+        if results["meta_api_check"].get("token_valid"):
+            # WhatsApp Business Account profile
+            profile = snapshot["profile"]
+            if profile["status_code"] == 200 and isinstance(profile["data"], dict):
+                data = profile["data"].get("data")
+                results["whatsapp_account"]["business_profile"] = data[0] if data else {}
+            else:
+                results["whatsapp_account"]["error"] = (
+                    f"Could not fetch business profile: {profile['status_code'] or profile['error']}"
+                )
+
+            # Registered webhook (app subscription)
+            app = snapshot["app"]
+            if app["status_code"] == 200 and isinstance(app["data"], dict):
+                results["webhook_check"]["messaging_product"] = app["data"].get("messaging_product", "unknown")
     else:
         results["meta_api_check"]["error"] = "Token or Number ID not configured"
 
@@ -242,7 +300,7 @@ async def diagnose():
         },
         "grok_service": {
             "client_ready": grok_service.client is not None,
-            "active_conversations": len(grok_service.conversations),
+            "active_conversations": grok_service.conversation_count(),
         }
     }
 
@@ -463,62 +521,49 @@ async def check_message_status(message_id: str):
 
 
 @router.get("/phone-info")
-async def phone_info():
+async def phone_info(refresh: bool = False):
     """Get detailed info about the configured WhatsApp phone number.
 
     Shows: display number, verified name, quality rating, status,
     throughput limits, and whether it's a test or real number.
+    Shares the cached /diagnose lookup; ?refresh=true runs it again.
     """
-    import httpx
-
-    settings = get_settings()
-    headers = {"Authorization": f"Bearer {settings.meta_jwt_token}"}
-
     result = {}
-    try:
-        async with httpx.AsyncClient() as client:
-            # Get phone number details
-            url = f"https://graph.facebook.com/{settings.meta_version}/{settings.meta_number_id}"
-            params = {
-                "fields": "display_phone_number,verified_name,quality_rating,platform_type,"
-                          "status,name_status,is_official_business_account,throughput,"
-                          "code_verification_status,is_pin_enabled,messaging_limit_tier"
-            }
-            response = await client.get(url, headers=headers, params=params, timeout=15.0)
-
-            if response.status_code == 200:
-                data = response.json()
-                result["phone_number"] = data
-                display = data.get("display_phone_number", "")
-
-                # Detect test number
-                if "+1 555" in display or display.startswith("+1 555"):
-                    result["is_test_number"] = True
-                    result["warning"] = (
-                        "This is a META TEST number. Test numbers have restrictions: "
-                        "can only send to numbers added in WhatsApp > API Setup > 'To' field. "
-                        "Messages may show as 'accepted' but not deliver if recipient is not in the test list."
-                    )
-                else:
-                    result["is_test_number"] = False
-
-                # Check quality
-                quality = data.get("quality_rating")
-                if quality and quality != "GREEN":
-                    result["quality_warning"] = f"Quality rating is {quality}. RED or YELLOW may limit message delivery."
-
-                # Check messaging limits
-                tier = data.get("messaging_limit_tier")
-                if tier:
-                    result["messaging_limit_tier"] = tier
-
-            else:
-                result["error"] = response.json() if "application/json" in response.headers.get("content-type", "") else response.text
-                result["status_code"] = response.status_code
-
-    except Exception as e:
-        result["error"] = str(e)
+    phone = (await graph_diagnostics.snapshot(force=refresh))["phone"]
+
+    if phone["status_code"] == 200:
+        data = phone["data"]
+        result["phone_number"] = data
+        display = data.get("display_phone_number", "")
+
+        # Detect test number
+        if "+1 555" in display or display.startswith("+1 555"):
+            result["is_test_number"] = True
+            result["warning"] = (
+                "This is a META TEST number. Test numbers have restrictions: "
+                "can only send to numbers added in WhatsApp > API Setup > 'To' field. "
+                "Messages may show as 'accepted' but not deliver if recipient is not in the test list."
+            )
+        else:
+            result["is_test_number"] = False
+
+        # Check quality
+        quality = data.get("quality_rating")
+        if quality and quality != "GREEN":
+            result["quality_warning"] = f"Quality rating is {quality}. RED or YELLOW may limit message delivery."
+
+        # Check messaging limits
+        tier = data.get("messaging_limit_tier")
+        if tier:
+            result["messaging_limit_tier"] = tier
+
+    elif phone["status_code"] is not None:
+        result["error"] = phone["data"]
+        result["status_code"] = phone["status_code"]
+    else:
+        result["error"] = phone["error"]
 
+    result["cache"] = graph_diagnostics.cache_info()
     return result
 
 
@@ -597,6 +642,7 @@ async def test_send_raw(phone_number: str):
 @router.post("/webhook")
 async def handle_webhook(request: Request, background_tasks: BackgroundTasks):
     """Handle incoming WhatsApp webhook - return 200 immediately, process in background."""
+    received_at = time.perf_counter()
     try:
         body = await request.json()
         print(f"\n{'='*50}")
@@ -606,10 +652,36 @@ async def handle_webhook(request: Request, background_tasks: BackgroundTasks):
             print("IGNORED: Not a whatsapp_business_account object")
             return {"status": "ignored"}
 
+        # Queue mode: store the payload for a worker process and answer at once
+        if get_settings().webhook_mode == "queue":
+            try:
+                await asyncio.to_thread(inbound_queue.enqueue, body)
+            except Exception as e:
+                # Nothing here will process it: a 5xx makes Meta deliver it again
+                print(f"Could not store message for the worker: {e}")
+                return JSONResponse(status_code=503, content={"status": "error", "message": "queue unavailable"})
+            print("Message stored for the worker")
+            return {"status": "received"}
+
         # Process message in background - return 200 to Meta immediately
         # Meta requires quick 200 response, otherwise it retries
-        background_tasks.add_task(process_message, body)
-        print("Message queued for background processing")
+        if payload_message_id(body) is None:
+            # Status updates: nothing to answer, so nothing to save for replay
+            background_tasks.add_task(process_message, body, received_at)
+            return {"status": "received"}
+
+        try:
+            submitted = await message_dispatcher.submit(body, received_at)
+        except Exception as e:
+            # Journal unavailable (locked database, full disk): answer anyway, just without replay
+            print(f"Could not journal message, processing it without replay: {e}")
+            background_tasks.add_task(process_message, body, received_at)
+        else:
+            if submitted:
+                # Saved to the inbound queue first, so a redeploy mid-reply replays it on next start
+                print("Message queued for background processing")
+            else:
+                print("Message already queued, or saved for replay while shutting down")
 
         return {"status": "received"}
 
@@ -0,0 +1,288 @@
+"""Local SQLite ledger of appointments (the source of truth for bookings)."""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+# Appointment status
+PENDING = "pending"  # Recorded locally, Calendar event not created yet
+CONFIRMED = "confirmed"  # Calendar event exists
+CANCELLED = "cancelled"  # Kept for the record; no longer synced or blocking its slot
+
+# Sync status of each external copy
+SYNC_PENDING = "pending"
+SYNC_DONE = "done"
+SYNC_FAILED = "failed"  # Rejected by Google or out of attempts; no longer retried
+
+APPOINTMENT_DURATION = timedelta(hours=1)
+
+FIELDS = ("name", "company", "email", "phone", "service", "date", "time")
+
+
+def booking_id_for(phone: str, fecha: str, hora: str) -> str:
+    """Deterministic booking id: the same person booking the same slot gets the same id.
+
+    Lowercase hex, so it is also a valid client-supplied Calendar event id.
+    """
+    key = f"{phone}|{fecha}|{hora}".encode("utf-8")
+    return hashlib.sha256(key).hexdigest()[:32]
+
+
+# Calendar accepts client-supplied event ids in base32hex only
+_EVENT_ID = re.compile(r"^[a-v0-9]{5,1024}$")
+
+
+def calendar_event_id(booking_id: str) -> str:
+    """Calendar event id for a booking: the id itself if Calendar accepts it, else its hash."""
+    if _EVENT_ID.match(booking_id):
+        return booking_id
+    return hashlib.sha256(booking_id.encode("utf-8")).hexdigest()[:32]
+
+
+class AppointmentLedger:
+    """Appointments written locally first, then pushed to Sheets and Calendar.
+
+    Each row tracks the sync state of its Sheets row and Calendar event
+    separately, with a retry schedule for the reconciler. Indexed by
+    phone, date and status so admin queries never read the spreadsheet.
+    Commits are fsynced, so callers on the event loop run these methods
+    in a thread (asyncio.to_thread); the connection is shared under a lock.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS appointments (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL DEFAULT '',
+            company TEXT NOT NULL DEFAULT '',
+            email TEXT NOT NULL DEFAULT '',
+            phone TEXT NOT NULL DEFAULT '',
+            service TEXT NOT NULL DEFAULT '',
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            status TEXT NOT NULL,
+            sheets_status TEXT NOT NULL,
+            calendar_status TEXT NOT NULL,
+            event_id TEXT,
+            html_link TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS appointments_phone ON appointments (phone, date);
+        CREATE INDEX IF NOT EXISTS appointments_date ON appointments (date, time);
+        CREATE INDEX IF NOT EXISTS appointments_status ON appointments (status, date);
+        DROP INDEX IF EXISTS appointments_unsynced;
+        CREATE INDEX IF NOT EXISTS appointments_due ON appointments (next_attempt_at)
+            WHERE status != 'cancelled' AND (sheets_status = 'pending' OR calendar_status = 'pending');
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        # Opened on first use, so importing the module touches no database
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """The ledger database, opened on first use. Call with self._lock held."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # The ledger is the only record until synced: fsync every commit
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        return dict(row) if row is not None else None
+
+    # ============= Writes =============
+
+    def create(self, datos: Dict[str, str], booking_id: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """Record a booking. Returns (appointment, created).
+
+        Booking again with the same id (by default: same phone, date and
+        time) returns the existing appointment instead of a duplicate.
+        """
+        values = {field: datos.get(field, "") or "" for field in FIELDS}
+        booking_id = booking_id or booking_id_for(values["phone"], values["date"], values["time"])
+
+        now = datetime.now().isoformat()
+        try:
+            with self._lock:
+                self._connection().execute(
+                    "INSERT INTO appointments (id, name, company, email, phone, service, date, time, "
+                    "status, sheets_status, calendar_status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (booking_id, *(values[f] for f in FIELDS), PENDING, SYNC_PENDING, SYNC_PENDING, now, now)
+                )
+        except sqlite3.IntegrityError:
+            return self.get(booking_id), False
+        return self.get(booking_id), True
+
+    def mark_sheets_done(self, booking_id: str) -> None:
+        """Record that the Sheets row was handed to the write-behind queue."""
+        with self._lock:
+            self._connection().execute(
+                "UPDATE appointments SET sheets_status = ?, updated_at = ? WHERE id = ?",
+                (SYNC_DONE, datetime.now().isoformat(), booking_id)
+            )
+
+    def mark_calendar_done(self, booking_id: str, event_id: str, html_link: Optional[str]) -> None:
+        """Record the Calendar event; the appointment is now confirmed."""
+        with self._lock:
+            self._connection().execute(
+                "UPDATE appointments SET calendar_status = ?, status = ?, event_id = ?, html_link = ?, "
+                "last_error = NULL, updated_at = ? WHERE id = ? AND status != ?",
+                (SYNC_DONE, CONFIRMED, event_id, html_link, datetime.now().isoformat(), booking_id, CANCELLED)
+            )
+
+    def mark_failed(self, booking_id: str, error: str, retry_in: float) -> None:
+        """Record a failed sync attempt and when to try again."""
+        with self._lock:
+            self._connection().execute(
+                "UPDATE appointments SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?, "
+                "updated_at = ? WHERE id = ?",
+                (error[:500], time.time() + retry_in, datetime.now().isoformat(), booking_id)
+            )
+
+    def mark_abandoned(self, booking_id: str, error: str) -> None:
+        """Stop retrying: whatever is still pending is marked failed for an admin to look at."""
+        with self._lock:
+            self._connection().execute(
+                "UPDATE appointments SET "
+                "sheets_status = CASE sheets_status WHEN ? THEN ? ELSE sheets_status END, "
+                "calendar_status = CASE calendar_status WHEN ? THEN ? ELSE calendar_status END, "
+                "attempts = attempts + 1, last_error = ?, updated_at = ? WHERE id = ?",
+                (SYNC_PENDING, SYNC_FAILED, SYNC_PENDING, SYNC_FAILED, error[:500],
+                 datetime.now().isoformat(), booking_id)
+            )
+
+    # ============= Queries =============
+
+    def get(self, booking_id: str) -> Optional[Dict[str, Any]]:
+        """Get one appointment by booking id."""
+        with self._lock:
+            return self._row(self._connection().execute(
+                "SELECT * FROM appointments WHERE id = ?", (booking_id,)
+            ).fetchone())
+
+    def find(
+        self,
+        phone: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Appointments matching the filters, ordered by date and time, plus the total count."""
+        clauses, params = [], []
+        if phone:
+            clauses.append("phone = ?")
+            params.append(phone)
+        if date_from:
+            clauses.append("date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("date <= ?")
+            params.append(date_to)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute(f"SELECT COUNT(*) FROM appointments {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM appointments {where} ORDER BY date, time, created_at LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows], total
+
+    def active_between(self, date_from: str, date_to: str) -> List[Dict[str, Any]]:
+        """Non-cancelled appointments in a date range (inclusive)."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM appointments WHERE date >= ? AND date <= ? AND status != ? ORDER BY date, time",
+                (date_from, date_to, CANCELLED)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def page_between(
+        self,
+        date_from: str,
+        date_to: str,
+        after: Optional[Tuple[str, str, str]] = None,
+        limit: int = 500
+    ) -> List[Dict[str, Any]]:
+        """All appointments in a date range, in (date, time, id) order, one page at a time.
+
+        Pass the (date, time, id) of the last row as ``after`` to get the
+        next page; nothing is held open between pages.
+        """
+        if after is None:
+            after = ("", "", "")
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM appointments WHERE date >= ? AND date <= ? AND (date, time, id) > (?, ?, ?) "
+                "ORDER BY date, time, id LIMIT ?",
+                (date_from, date_to, *after, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def fingerprint(self, date_from: str, date_to: str) -> Tuple[int, Optional[str]]:
+        """(count, latest updated_at) for a date range: changes whenever its contents do."""
+        with self._lock:
+            count, latest = self._connection().execute(
+                "SELECT COUNT(*), MAX(updated_at) FROM appointments WHERE date >= ? AND date <= ?",
+                (date_from, date_to)
+            ).fetchone()
+        return count, latest
+
+    def due_for_sync(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Appointments with a Sheets row or Calendar event still to push, oldest first."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM appointments WHERE status != 'cancelled' "
+                "AND (sheets_status = 'pending' OR calendar_status = 'pending') "
+                "AND next_attempt_at <= ? ORDER BY created_at LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of appointments per status, plus how many still need syncing or gave up."""
+        counts = {status: 0 for status in (PENDING, CONFIRMED, CANCELLED)}
+        with self._lock:
+            conn = self._connection()
+            for status, count in conn.execute("SELECT status, COUNT(*) FROM appointments GROUP BY status"):
+                counts[status] = count
+            counts["unsynced"], counts["sync_failed"] = conn.execute(
+                "SELECT "
+                "COALESCE(SUM(sheets_status = 'pending' OR calendar_status = 'pending'), 0), "
+                "COALESCE(SUM(sheets_status = 'failed' OR calendar_status = 'failed'), 0) "
+                "FROM appointments WHERE status != 'cancelled'"
+            ).fetchone()
+        return counts
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,152 @@
+"""In-memory index of booked calendar intervals."""
+import bisect
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+
+class AvailabilityIndex:
+    """Busy intervals for one calendar, in local (naive) time.
+
+    Events may overlap, so queries run against a merged, sorted copy
+    of the intervals. New bookings are merged in place; removals and
+    syncs rebuild it lazily. A free/busy check is one bisect; listing
+    free slots walks the merged list once.
+    """
+
+    def __init__(
+        self,
+        business_start: time = time(9, 0),
+        business_end: time = time(18, 0),
+        business_days: Sequence[int] = (0, 1, 2, 3, 4)
+    ):
+        self.business_start = business_start
+        self.business_end = business_end
+        self.business_days = frozenset(business_days)
+
+        self._events: Dict[str, Interval] = {}
+        self._merged: Optional[List[Interval]] = None
+        self._starts: List[datetime] = []
+        self.synced_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    # ============= Updates =============
+
+    def add(self, event_id: str, start: datetime, end: datetime) -> None:
+        """Mark [start, end) busy; re-adding an id moves that event."""
+        if end <= start:
+            return
+        moved = event_id in self._events
+        self._events[event_id] = (start, end)
+        if moved or self._merged is None:
+            self._merged = None
+        else:
+            self._merge_in(start, end)
+
+    def _merge_in(self, start: datetime, end: datetime) -> None:
+        """Insert one interval into the merged list without a full rebuild."""
+        merged, starts = self._merged, self._starts
+        lo = bisect.bisect_right(starts, start)
+        if lo > 0 and merged[lo - 1][1] >= start:
+            lo -= 1
+            start = merged[lo][0]
+        hi = lo
+        while hi < len(merged) and merged[hi][0] <= end:
+            end = max(end, merged[hi][1])
+            hi += 1
+        merged[lo:hi] = [(start, end)]
+        starts[lo:hi] = [start]
+
+    def remove(self, event_id: str) -> bool:
+        """Free the interval booked under event_id."""
+        if self._events.pop(event_id, None) is None:
+            return False
+        self._merged = None
+        return True
+
+    def replace_all(self, events: Iterable[Tuple[str, datetime, datetime]]) -> None:
+        """Swap in a fresh snapshot from a calendar sync."""
+        self._events = {event_id: (start, end) for event_id, start, end in events if end > start}
+        self._merged = None
+        self.synced_at = datetime.now()
+
+    def _busy(self) -> List[Interval]:
+        """Merged busy intervals sorted by start."""
+        if self._merged is None:
+            merged: List[Interval] = []
+            for start, end in sorted(self._events.values()):
+                if merged and start <= merged[-1][1]:
+                    if end > merged[-1][1]:
+                        merged[-1] = (merged[-1][0], end)
+                else:
+                    merged.append((start, end))
+            self._merged = merged
+            self._starts = [start for start, _ in merged]
+        return self._merged
+
+    # ============= Queries =============
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        """True when [start, end) overlaps no booked interval."""
+        busy = self._busy()
+        # The only merged interval that can overlap is the last one starting before end
+        i = bisect.bisect_left(self._starts, end) - 1
+        return i < 0 or busy[i][1] <= start
+
+    def in_business_hours(self, start: datetime, end: datetime) -> bool:
+        """True when the slot falls on a business day within business hours."""
+        return (
+            start.weekday() in self.business_days
+            and start.date() == end.date()
+            and start.time() >= self.business_start
+            and end.time() <= self.business_end
+        )
+
+    def next_free_slots(
+        self,
+        after: datetime,
+        count: int = 5,
+        duration: timedelta = timedelta(hours=1),
+        max_days: int = 60
+    ) -> List[Interval]:
+        """The first count free slots in business hours starting at or after ``after``.
+
+        Slots start on the hour (or at the business start time) and last
+        ``duration``.
+        """
+        busy = self._busy()
+        slots: List[Interval] = []
+        # First merged interval that could still overlap a candidate
+        i = max(bisect.bisect_right(self._starts, after) - 1, 0)
+
+        day = after.date()
+        last_day = day + timedelta(days=max_days)
+        while len(slots) < count and day <= last_day:
+            if day.weekday() in self.business_days:
+                slot = datetime.combine(day, self.business_start)
+                day_end = datetime.combine(day, self.business_end)
+                if slot < after:
+                    # Round up to the next whole hour
+                    slot = after.replace(minute=0, second=0, microsecond=0)
+                    if slot < after:
+                        slot += timedelta(hours=1)
+
+                while slot + duration <= day_end and len(slots) < count:
+                    slot_end = slot + duration
+                    while i < len(busy) and busy[i][1] <= slot:
+                        i += 1
+                    if i < len(busy) and busy[i][0] < slot_end:
+                        # Jump past the busy interval, back onto the hour grid
+                        next_slot = busy[i][1]
+                        if next_slot.minute or next_slot.second or next_slot.microsecond:
+                            next_slot = next_slot.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+                        slot = next_slot
+                        continue
+                    slots.append((slot, slot_end))
+                    slot += duration
+            day += timedelta(days=1)
+
+        return slots
@@ -0,0 +1,164 @@
+"""In-memory blacklist index: hashed exact numbers plus prefix rules."""
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def normalize_number(number: str) -> str:
+    """Keep only digits so '+52 1 55...' and '52155...' are the same entry."""
+    return ''.join(c for c in str(number) if c.isdigit())
+
+
+class PrefixTrie:
+    """Digit trie answering "does any stored prefix start this number"."""
+
+    _END = "$"
+
+    def __init__(self, prefixes: Iterable[str] = ()):
+        self._root: Dict[str, dict] = {}
+        self._size = 0
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[str]:
+        stack = [(self._root, "")]
+        while stack:
+            node, path = stack.pop()
+            if self._END in node:
+                yield path
+            for digit, child in node.items():
+                if digit != self._END:
+                    stack.append((child, path + digit))
+
+    def add(self, prefix: str) -> bool:
+        """Add a prefix rule. Returns False if empty or already present."""
+        prefix = normalize_number(prefix)
+        if not prefix:
+            return False
+
+        node = self._root
+        for digit in prefix:
+            node = node.setdefault(digit, {})
+
+        if self._END in node:
+            return False
+        node[self._END] = True
+        self._size += 1
+        return True
+
+    def remove(self, prefix: str) -> bool:
+        """Remove a prefix rule, pruning branches left empty."""
+        prefix = normalize_number(prefix)
+        path = [self._root]
+        for digit in prefix:
+            child = path[-1].get(digit)
+            if child is None:
+                return False
+            path.append(child)
+
+        if not prefix or self._END not in path[-1]:
+            return False
+        del path[-1][self._END]
+        self._size -= 1
+
+        for depth in range(len(prefix), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][prefix[depth - 1]]
+        return True
+
+    def match(self, number: str) -> Optional[str]:
+        """Return the shortest stored prefix of number, or None."""
+        node = self._root
+        for i, digit in enumerate(number):
+            node = node.get(digit)
+            if node is None:
+                return None
+            if self._END in node:
+                return number[:i + 1]
+        return None
+
+
+class BlacklistIndex:
+    """Set of blocked numbers with an optional prefix trie.
+
+    Lookups are O(1) for exact numbers and O(len(number)) for prefix
+    rules, regardless of how many entries are stored.
+    """
+
+    def __init__(self, numbers: Iterable[str] = (), prefixes: Iterable[str] = ()):
+        self.numbers = set()
+        self.prefixes = PrefixTrie(prefixes)
+        self._sorted: Optional[List[str]] = None
+        self.add_many(numbers)
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def __contains__(self, number: str) -> bool:
+        return self.is_blocked(number)
+
+    def is_blocked(self, number: str) -> bool:
+        """Check a number against exact entries and prefix rules."""
+        number = normalize_number(number)
+        if not number:
+            return False
+        if number in self.numbers:
+            return True
+        return bool(self.prefixes) and self.prefixes.match(number) is not None
+
+    def add(self, number: str) -> bool:
+        """Add one number. Returns False if empty or already present."""
+        number = normalize_number(number)
+        if not number or number in self.numbers:
+            return False
+        self.numbers.add(number)
+        self._sorted = None
+        return True
+
+    def add_many(self, numbers: Iterable[str]) -> int:
+        """Add many numbers, returning how many were new."""
+        before = len(self.numbers)
+        self.numbers.update(n for n in map(normalize_number, numbers) if n)
+        added = len(self.numbers) - before
+        if added:
+            self._sorted = None
+        return added
+
+    def remove(self, number: str) -> bool:
+        """Remove one number. Returns False if it was not present."""
+        number = normalize_number(number)
+        if number not in self.numbers:
+            return False
+        self.numbers.discard(number)
+        self._sorted = None
+        return True
+
+    def remove_many(self, numbers: Iterable[str]) -> int:
+        """Remove many numbers, returning how many were present."""
+        before = len(self.numbers)
+        self.numbers.difference_update(map(normalize_number, numbers))
+        removed = before - len(self.numbers)
+        if removed:
+            self._sorted = None
+        return removed
+
+    def to_list(self) -> List[str]:
+        """Sorted list of exact numbers (cached until the next mutation)."""
+        if self._sorted is None:
+            self._sorted = sorted(self.numbers)
+        return self._sorted
+
+    def page(self, offset: int = 0, limit: int = 100, prefix: str = "") -> Tuple[List[str], int]:
+        """Return (slice, total) of the sorted list, optionally filtered by prefix."""
+        numbers = self.to_list()
+        start, end = 0, len(numbers)
+        if prefix:
+            prefix = normalize_number(prefix)
+            # ':' sorts right after '9', so this bounds every number starting with prefix
+            start = bisect_left(numbers, prefix)
+            end = bisect_left(numbers, prefix + ":", start)
+        first = min(start + offset, end)
+        return numbers[first:min(first + limit, end)], end - start
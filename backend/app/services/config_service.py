@@ -1,107 +1,243 @@
 """Configuration service for managing bot settings."""
-import json
-import os
+import asyncio
+import atexit
 import re
 from datetime import datetime
-from typing import Dict, List, Optional, Any
-from ..config import get_settings
+from typing import Callable, Dict, Iterable, List, Optional, Any, Tuple
+from ..config import Settings, get_settings
+from .blacklist_index import normalize_number
+from .config_store import ConfigStore, JsonConfigStore, SqliteConfigStore
 from .flow_prompts import FLOW_PROMPTS
 
 
-class ConfigService:
-    """Service for managing bot configuration."""
+Listener = Callable[[int], None]
 
-    def __init__(self):
-        settings = get_settings()
-        self.config_path = settings.config_file_path
-        self._ensure_config_file()
 
-    def _ensure_config_file(self) -> None:
-        """Ensure config file and directory exist."""
-        try:
-            config_dir = os.path.dirname(self.config_path)
-
-            if config_dir and not os.path.exists(config_dir):
-                os.makedirs(config_dir, exist_ok=True)
-
-            if not os.path.exists(self.config_path):
-                default_config = {
-                    "blacklist": [],
-                    "currentFlow": "karuna",
-                    "systemPrompt": FLOW_PROMPTS["karuna"]["prompt"],
-                    "customFlows": {}
-                }
-                self._save_config(default_config)
-                print("Config file created")
-        except Exception as e:
-            print(f"Warning: Could not create config file: {e}")
-            # Continue without persistent config - will use in-memory defaults
-
-    def _get_config(self) -> Dict[str, Any]:
-        """Read configuration from file."""
-        try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error reading config: {e}")
-            return {
-                "blacklist": [],
-                "systemPrompt": "",
-                "currentFlow": "karuna",
-                "customFlows": {}
-            }
+def create_config_store(settings: Settings) -> ConfigStore:
+    """Build the storage backend selected by CONFIG_BACKEND."""
+    default_config = {
+        "blacklist": [],
+        "blacklistPrefixes": [],
+        "currentFlow": "karuna",
+        "systemPrompt": FLOW_PROMPTS["karuna"]["prompt"],
+        "customFlows": {},
+        "userConfigs": {}
+    }
 
-    def _save_config(self, config: Dict[str, Any]) -> bool:
-        """Save configuration to file."""
-        try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-            return True
-        except Exception as e:
-            print(f"Error saving config: {e}")
+    if settings.config_backend == "sqlite":
+        # First start imports the existing JSON config, if any
+        return SqliteConfigStore(
+            settings.config_db_path,
+            default_config,
+            import_path=settings.config_file_path
+        )
+
+    return JsonConfigStore(
+        settings.config_file_path,
+        settings.config_write_coalesce_ms / 1000,
+        default_config
+    )
+
+
+class ConfigService:
+    """Service for managing bot configuration.
+
+    Storage is delegated to a ConfigStore (JSON file by default, SQLite
+    for large blacklists or many flows). Every persisted write bumps the
+    config version; watch_changes() polls for versions written by other
+    workers and notifies listeners so in-memory copies (prompt, flows,
+    blacklist) refresh within one poll interval.
+    """
+
+    def __init__(self, store: Optional[ConfigStore] = None):
+        self.store = store or create_config_store(get_settings())
+        self._listeners: List[Listener] = []
+        self._flows: Optional[Dict[str, Any]] = None
+        self._flows_revision = -1
+        atexit.register(self.flush)
+
+    def flush(self) -> bool:
+        """Write any queued changes to storage now."""
+        return self.store.flush()
+
+    # ============= Change Propagation =============
+
+    def get_config_version(self) -> int:
+        """Get the version of the last config written to storage."""
+        return self.store.version()
+
+    def get_config_revision(self) -> int:
+        """Get a local counter that changes whenever this worker's view of the config changes."""
+        return self.store.revision()
+
+    def get_config_etag(self) -> str:
+        """Token identifying the current config, shared by all workers once persisted."""
+        version = self.store.version()
+        if self.store.has_pending():
+            # Local changes not yet written: only this worker can serve them
+            return f"{version}+{self.store.revision()}"
+        return str(version)
+
+    def add_listener(self, listener: Listener) -> None:
+        """Register a callback run with the new version when another worker changes the config."""
+        self._listeners.append(listener)
+
+    def reload_if_changed(self) -> bool:
+        """Pick up changes from other workers and notify listeners."""
+        version = self.store.reload_if_changed()
+        if version is None:
             return False
 
+        print(f"Config changed in storage (version {version})")
+        for listener in self._listeners:
+            try:
+                listener(version)
+            except Exception as e:
+                print(f"Error in config listener: {e}")
+        return True
+
+    async def watch_changes(self, interval: float) -> None:
+        """Poll storage for changes made by other workers."""
+        self.store.watching = True
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await asyncio.to_thread(self.reload_if_changed)
+                except Exception as e:
+                    print(f"Error watching config: {e}")
+        finally:
+            self.store.watching = False
+
     # ============= Blacklist Methods =============
 
     def get_blacklist(self) -> List[str]:
         """Get list of blacklisted numbers."""
-        config = self._get_config()
-        return config.get("blacklist", [])
+        return self.store.blacklist_all()
+
+    def get_blacklist_count(self) -> int:
+        """Get the number of blacklisted numbers."""
+        return self.store.blacklist_count()
+
+    def get_blacklist_page(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        prefix: str = ""
+    ) -> Tuple[List[str], int]:
+        """Get a page of blacklisted numbers and the total matching count."""
+        return self.store.blacklist_page(offset, limit, prefix)
 
     def add_to_blacklist(self, number: str) -> bool:
         """Add a number to blacklist."""
-        config = self._get_config()
-        if number not in config["blacklist"]:
-            config["blacklist"].append(number)
-            self._save_config(config)
-            print(f"Number {number} added to blacklist")
-            return True
-        return False
+        return self.add_many_to_blacklist([number]) > 0
+
+    def add_many_to_blacklist(self, numbers: Iterable[str]) -> int:
+        """Add several numbers with a single config write. Returns how many were new."""
+        numbers = [n for n in map(normalize_number, numbers) if n]
+        added = self.store.blacklist_add(numbers) if numbers else 0
+        if added:
+            print(f"{added} number(s) added to blacklist")
+        return added
 
     def remove_from_blacklist(self, number: str) -> bool:
         """Remove a number from blacklist."""
-        config = self._get_config()
-        config["blacklist"] = [n for n in config["blacklist"] if n != number]
-        self._save_config(config)
-        print(f"Number {number} removed from blacklist")
-        return True
+        return self.remove_many_from_blacklist([number]) > 0
+
+    def remove_many_from_blacklist(self, numbers: Iterable[str]) -> int:
+        """Remove several numbers with a single config write. Returns how many were removed."""
+        numbers = [n for n in map(normalize_number, numbers) if n]
+        removed = self.store.blacklist_remove(numbers) if numbers else 0
+        if removed:
+            print(f"{removed} number(s) removed from blacklist")
+        return removed
 
     def is_blacklisted(self, number: str) -> bool:
-        """Check if a number is blacklisted."""
-        return number in self.get_blacklist()
+        """Check if a number is blacklisted (exact match or prefix rule)."""
+        return self.store.is_blacklisted(normalize_number(number))
+
+    def get_blacklist_prefixes(self) -> List[str]:
+        """Get prefix block rules (country or carrier prefixes)."""
+        return self.store.blacklist_prefixes()
+
+    def add_blacklist_prefix(self, prefix: str) -> bool:
+        """Block every number starting with prefix."""
+        prefix = normalize_number(prefix)
+        if not prefix or not self.store.add_prefix(prefix):
+            return False
+        print(f"Prefix {prefix} added to blacklist")
+        return True
+
+    def remove_blacklist_prefix(self, prefix: str) -> bool:
+        """Remove a prefix block rule."""
+        prefix = normalize_number(prefix)
+        if not prefix or not self.store.remove_prefix(prefix):
+            return False
+        print(f"Prefix {prefix} removed from blacklist")
+        return True
+
+    # ============= User Config Methods =============
+
+    def get_user_config(self, number: str) -> Optional[Dict[str, Any]]:
+        """Get the overrides for one number (name, custom_prompt, notes), if any."""
+        number = normalize_number(number)
+        return self.store.get_user_config(number) if number else None
+
+    def get_user_configs(self) -> Dict[str, Dict[str, Any]]:
+        """Get all per-user overrides keyed by number."""
+        return self.store.user_configs_all()
+
+    def save_user_configs(self, configs: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """Insert or update several overrides with a single config write.
+
+        Each item has a number plus name, custom_prompt and notes; an
+        existing entry keeps its created_at. Returns (created, updated).
+        """
+        now = datetime.now().isoformat()
+        merged: Dict[str, Dict[str, Any]] = {}
+        for item in configs:
+            number = normalize_number(item.get("number", ""))
+            if not number:
+                continue
+            existing = merged.get(number) or self.store.get_user_config(number) or {}
+            merged[number] = {
+                "name": item.get("name", "") or "",
+                "custom_prompt": item.get("custom_prompt", "") or "",
+                "notes": item.get("notes", "") or "",
+                "created_at": existing.get("created_at", now),
+                "updated_at": now
+            }
+        if not merged:
+            return 0, 0
+
+        created = self.store.user_configs_upsert(merged)
+        print(f"User configs saved: {created} created, {len(merged) - created} updated")
+        return created, len(merged) - created
+
+    def save_user_config(self, number: str, name: str = "", custom_prompt: str = "", notes: str = "") -> bool:
+        """Insert or update the overrides for one number."""
+        created, updated = self.save_user_configs([
+            {"number": number, "name": name, "custom_prompt": custom_prompt, "notes": notes}
+        ])
+        return created + updated > 0
+
+    def delete_user_config(self, number: str) -> bool:
+        """Remove the overrides for one number."""
+        number = normalize_number(number)
+        if not number or not self.store.user_config_delete(number):
+            return False
+        print(f"User config for {number} deleted")
+        return True
 
     # ============= System Prompt Methods =============
 
     def get_system_prompt(self) -> str:
         """Get current system prompt."""
-        config = self._get_config()
-        return config.get("systemPrompt", "")
+        return self.store.get_setting("systemPrompt", "")
 
     def update_system_prompt(self, new_prompt: str) -> bool:
         """Update system prompt."""
-        config = self._get_config()
-        config["systemPrompt"] = new_prompt
-        self._save_config(config)
+        self.store.set_settings({"systemPrompt": new_prompt})
         print("System prompt updated")
         return True
 
@@ -109,13 +245,17 @@ class ConfigService:
 
     def get_current_flow(self) -> str:
         """Get current active flow ID."""
-        config = self._get_config()
-        return config.get("currentFlow", "karuna")
+        return self.store.get_setting("currentFlow", "karuna")
 
     def get_all_flows(self) -> Dict[str, Any]:
-        """Get all flows (builtin + custom)."""
-        config = self._get_config()
-        custom_flows = config.get("customFlows", {})
+        """Get all flows (builtin + custom).
+
+        The merged dict is rebuilt only when the config changes; treat it
+        as read-only.
+        """
+        revision = self.store.revision()
+        if self._flows is not None and revision == self._flows_revision:
+            return self._flows
 
         all_flows = {}
 
@@ -124,15 +264,21 @@ class ConfigService:
             all_flows[key] = {**value, "is_builtin": True}
 
         # Add custom flows
-        for key, value in custom_flows.items():
+        for key, value in self.store.get_custom_flows().items():
             all_flows[key] = {**value, "is_builtin": False}
 
+        self._flows = all_flows
+        self._flows_revision = revision
         return all_flows
 
     def get_flow_data(self, flow_id: str) -> Optional[Dict[str, Any]]:
         """Get data for a specific flow."""
-        all_flows = self.get_all_flows()
-        return all_flows.get(flow_id)
+        custom_flow = self.store.get_custom_flow(flow_id)
+        if custom_flow is not None:
+            return {**custom_flow, "is_builtin": False}
+        if flow_id in FLOW_PROMPTS:
+            return {**FLOW_PROMPTS[flow_id], "is_builtin": True}
+        return None
 
     def set_flow(self, flow_id: str) -> bool:
         """Set the active flow."""
@@ -142,10 +288,10 @@ class ConfigService:
             print(f"Invalid flow: {flow_id}")
             return False
 
-        config = self._get_config()
-        config["currentFlow"] = flow_id
-        config["systemPrompt"] = flow_data.get("prompt", "")
-        self._save_config(config)
+        self.store.set_settings({
+            "currentFlow": flow_id,
+            "systemPrompt": flow_data.get("prompt", "")
+        })
         print(f"Flow changed to: {flow_id}")
         return True
 
@@ -167,23 +313,18 @@ class ConfigService:
         if not re.match(r'^[a-z0-9_]+$', flow_id):
             return {"success": False, "message": "ID can only contain lowercase letters, numbers, and underscores"}
 
-        config = self._get_config()
-        if "customFlows" not in config:
-            config["customFlows"] = {}
-
-        if flow_id in config["customFlows"]:
-            return {"success": False, "message": "Custom flow with this ID already exists"}
-
-        config["customFlows"][flow_id] = {
+        created = self.store.insert_flow(flow_id, {
             "name": name,
             "description": description,
             "prompt": prompt,
             "has_menu": has_menu,
             "menu_config": menu_config,
             "created_at": datetime.now().isoformat()
-        }
+        })
+
+        if not created:
+            return {"success": False, "message": "Custom flow with this ID already exists"}
 
-        self._save_config(config)
         print(f"Custom flow created: {flow_id}")
         return {"success": True, "message": "Flow created successfully"}
 
@@ -200,31 +341,24 @@ class ConfigService:
         if flow_id in FLOW_PROMPTS:
             return {"success": False, "message": "Cannot edit builtin flows"}
 
-        config = self._get_config()
-
-        if "customFlows" not in config or flow_id not in config["customFlows"]:
-            return {"success": False, "message": "Custom flow not found"}
-
-        flow = config["customFlows"][flow_id]
-
+        changes: Dict[str, Any] = {}
         if name is not None:
-            flow["name"] = name
+            changes["name"] = name
         if description is not None:
-            flow["description"] = description
+            changes["description"] = description
         if prompt is not None:
-            flow["prompt"] = prompt
+            changes["prompt"] = prompt
         if has_menu is not None:
-            flow["has_menu"] = has_menu
+            changes["has_menu"] = has_menu
         if menu_config is not None:
-            flow["menu_config"] = menu_config
+            changes["menu_config"] = menu_config
 
-        flow["updated_at"] = datetime.now().isoformat()
+        changes["updated_at"] = datetime.now().isoformat()
 
-        # Update system prompt if this is the current flow
-        if config.get("currentFlow") == flow_id and prompt:
-            config["systemPrompt"] = prompt
+        # Also updates the system prompt if this is the current flow
+        if not self.store.update_flow(flow_id, changes):
+            return {"success": False, "message": "Custom flow not found"}
 
-        self._save_config(config)
         print(f"Custom flow updated: {flow_id}")
         return {"success": True, "message": "Flow updated successfully"}
 
@@ -233,18 +367,14 @@ class ConfigService:
         if flow_id in FLOW_PROMPTS:
             return {"success": False, "message": "Cannot delete builtin flows"}
 
-        config = self._get_config()
-
-        if "customFlows" not in config or flow_id not in config["customFlows"]:
-            return {"success": False, "message": "Custom flow not found"}
-
         # Switch to karuna if deleting current flow
-        if config.get("currentFlow") == flow_id:
-            config["currentFlow"] = "karuna"
-            config["systemPrompt"] = FLOW_PROMPTS["karuna"]["prompt"]
+        deleted = self.store.delete_flow(flow_id, {
+            "currentFlow": "karuna",
+            "systemPrompt": FLOW_PROMPTS["karuna"]["prompt"]
+        })
 
-        del config["customFlows"][flow_id]
-        self._save_config(config)
+        if not deleted:
+            return {"success": False, "message": "Custom flow not found"}
 
         print(f"Custom flow deleted: {flow_id}")
         return {"success": True, "message": "Flow deleted successfully"}
@@ -0,0 +1,908 @@
+"""Storage backends for bot configuration (settings, flows, blacklist, user overrides)."""
+import copy
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from .blacklist_index import BlacklistIndex, PrefixTrie, normalize_number
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no inter-process lock
+    fcntl = None
+
+
+Mutation = Callable[[Dict[str, Any]], None]
+
+# Document keys that are stored in their own tables rather than as settings
+STRUCTURED_KEYS = ("blacklist", "blacklistPrefixes", "customFlows", "userConfigs", "version")
+
+
+class ConfigStore(ABC):
+    """Interface shared by the configuration storage backends.
+
+    ``revision()`` changes whenever this process may see different data
+    (local write or reload); ``version()`` is the persisted, cross-worker
+    change counter.
+    """
+
+    watching = False
+
+    @abstractmethod
+    def revision(self) -> int:
+        ...
+
+    @abstractmethod
+    def version(self) -> int:
+        ...
+
+    @abstractmethod
+    def reload_if_changed(self) -> Optional[int]:
+        """Pick up writes from other workers. Returns the new version, if any."""
+
+    def flush(self) -> bool:
+        return True
+
+    def has_pending(self) -> bool:
+        """Whether local changes are waiting to be persisted."""
+        return False
+
+    # Settings
+    @abstractmethod
+    def get_setting(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set_settings(self, values: Dict[str, Any]) -> None:
+        ...
+
+    # Flows
+    @abstractmethod
+    def get_custom_flows(self) -> Dict[str, Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def get_custom_flow(self, flow_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def insert_flow(self, flow_id: str, flow: Dict[str, Any]) -> bool:
+        ...
+
+    @abstractmethod
+    def update_flow(self, flow_id: str, changes: Dict[str, Any]) -> bool:
+        """Update a flow; if it is the current flow, a new prompt also becomes the system prompt."""
+
+    @abstractmethod
+    def delete_flow(self, flow_id: str, fallback: Dict[str, Any]) -> bool:
+        """Delete a flow; if it is the current flow, apply the fallback settings."""
+
+    # Blacklist (numbers are already normalized by the caller)
+    @abstractmethod
+    def is_blacklisted(self, number: str) -> bool:
+        ...
+
+    @abstractmethod
+    def blacklist_all(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def blacklist_count(self) -> int:
+        ...
+
+    @abstractmethod
+    def blacklist_page(self, offset: int, limit: int, prefix: str = "") -> Tuple[List[str], int]:
+        ...
+
+    @abstractmethod
+    def blacklist_add(self, numbers: List[str]) -> int:
+        ...
+
+    @abstractmethod
+    def blacklist_remove(self, numbers: List[str]) -> int:
+        ...
+
+    @abstractmethod
+    def blacklist_prefixes(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def add_prefix(self, prefix: str) -> bool:
+        ...
+
+    @abstractmethod
+    def remove_prefix(self, prefix: str) -> bool:
+        ...
+
+    # Per-user overrides (numbers are already normalized by the caller)
+    @abstractmethod
+    def get_user_config(self, number: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def user_configs_all(self) -> Dict[str, Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def user_configs_upsert(self, configs: Dict[str, Dict[str, Any]]) -> int:
+        """Insert or replace overrides in one write. Returns how many were new."""
+
+    @abstractmethod
+    def user_config_delete(self, number: str) -> bool:
+        ...
+
+    # Whole document (JSON layout), used to migrate between backends
+    @abstractmethod
+    def export_document(self) -> Dict[str, Any]:
+        ...
+
+
+class JsonConfigStore(ConfigStore):
+    """Single JSON file backend (the default).
+
+    Reads are served from a parsed copy that is re-read only when the
+    file's mtime/size changes. Writes are queued as mutations and flushed
+    together after a short coalescing window: the flush takes an
+    inter-process file lock, re-reads the file, replays the mutations and
+    atomically replaces it (temp file + fsync + rename), so readers never
+    see a truncated file and workers don't overwrite each other.
+    """
+
+    def __init__(self, config_path: str, coalesce_window: float, default_config: Dict[str, Any]):
+        self.config_path = config_path
+        self.lock_path = f"{config_path}.lock"
+        self.coalesce_window = coalesce_window
+
+        self._revision = 0
+        self._cached_config: Optional[Dict[str, Any]] = None
+        self._cached_stamp: Optional[Tuple[int, int]] = None
+
+        self._write_lock = threading.RLock()
+        self._pending_config: Optional[Dict[str, Any]] = None
+        self._pending_mutations: List[Mutation] = []
+        self._flush_timer: Optional[threading.Timer] = None
+
+        self._blacklist_index: Optional[BlacklistIndex] = None
+        self._blacklist_revision = -1
+
+        self._ensure_config_file(default_config)
+
+    def _ensure_config_file(self, default_config: Dict[str, Any]) -> None:
+        """Ensure config file and directory exist."""
+        try:
+            config_dir = os.path.dirname(self.config_path)
+
+            if config_dir and not os.path.exists(config_dir):
+                os.makedirs(config_dir, exist_ok=True)
+
+            with self._file_lock():
+                if not os.path.exists(self.config_path):
+                    self._save_config(default_config)
+                    print("Config file created")
+        except Exception as e:
+            print(f"Warning: Could not create config file: {e}")
+            # Continue without persistent config - will use in-memory defaults
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive inter-process lock guarding read-modify-write of the file."""
+        if fcntl is None:
+            yield
+            return
+
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _config_stamp(self) -> Optional[Tuple[int, int]]:
+        """Cheap change marker for the config file (mtime, size)."""
+        try:
+            stat = os.stat(self.config_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _read_config_file(self) -> Dict[str, Any]:
+        """Parse the config file, raising on missing or invalid content."""
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _set_cached(self, config: Dict[str, Any], stamp: Optional[Tuple[int, int]]) -> None:
+        self._cached_config = config
+        self._cached_stamp = stamp
+        self._revision += 1
+
+    def _get_config(self) -> Dict[str, Any]:
+        """Read configuration, including changes not yet flushed to disk.
+
+        The returned dict is shared; mutate only through _update_config.
+        """
+        with self._write_lock:
+            if self._pending_config is not None:
+                return self._pending_config
+
+        if self.watching and self._cached_config is not None:
+            # The watcher refreshes the cache when the file changes
+            return self._cached_config
+
+        stamp = self._config_stamp()
+        if self._cached_config is not None and stamp == self._cached_stamp:
+            return self._cached_config
+
+        try:
+            config = self._read_config_file()
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            print(f"Error reading config: {e}")
+            if self._cached_config is not None:
+                # Keep serving the last good copy rather than empty defaults
+                return self._cached_config
+            return {
+                "blacklist": [],
+                "blacklistPrefixes": [],
+                "systemPrompt": "",
+                "currentFlow": "karuna",
+                "customFlows": {}
+            }
+
+        self._set_cached(config, stamp)
+        return config
+
+    def _save_config(self, config: Dict[str, Any]) -> bool:
+        """Atomically replace the config file (temp file + fsync + rename)."""
+        config_dir = os.path.dirname(self.config_path) or "."
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=config_dir,
+                prefix=f".{os.path.basename(self.config_path)}.",
+                suffix=".tmp"
+            )
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+
+            try:
+                os.chmod(tmp_path, os.stat(self.config_path).st_mode & 0o777)
+            except OSError:
+                os.chmod(tmp_path, 0o644)
+
+            os.replace(tmp_path, self.config_path)
+            tmp_path = None
+            return True
+        except Exception as e:
+            print(f"Error saving config: {e}")
+            return False
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _update_config(self, mutate: Mutation) -> None:
+        """Apply a change locally now and queue it for the next coalesced write.
+
+        Mutations are replayed against a fresh read of the file at flush
+        time, so they must only touch the keys they own.
+        """
+        with self._write_lock:
+            if self._pending_config is None:
+                self._pending_config = copy.deepcopy(self._get_config())
+            mutate(self._pending_config)
+            self._pending_mutations.append(mutate)
+            self._revision += 1
+
+            if self.coalesce_window <= 0:
+                self.flush()
+            elif self._flush_timer is None:
+                self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """Arm the coalescing timer (caller holds _write_lock)."""
+        self._flush_timer = threading.Timer(self.coalesce_window, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def flush(self) -> bool:
+        """Write all queued changes to disk in one locked, atomic write."""
+        with self._write_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+
+            if not self._pending_mutations:
+                return True
+
+            with self._file_lock():
+                try:
+                    config = self._read_config_file()
+                    for mutate in self._pending_mutations:
+                        mutate(config)
+                except (FileNotFoundError, json.JSONDecodeError) as e:
+                    print(f"Error re-reading config before save: {e}")
+                    config = self._pending_config
+                config["version"] = int(config.get("version", 0)) + 1
+                saved = self._save_config(config)
+
+            if not saved:
+                if self.coalesce_window > 0:
+                    self._schedule_flush()
+                return False
+
+            count = len(self._pending_mutations)
+            self._pending_mutations = []
+            self._pending_config = None
+            self._set_cached(config, self._config_stamp())
+            if count > 1:
+                print(f"Config saved ({count} changes coalesced)")
+            return True
+
+    def revision(self) -> int:
+        return self._revision
+
+    def has_pending(self) -> bool:
+        return self._pending_config is not None
+
+    def version(self) -> int:
+        return int(self._get_config().get("version", 0))
+
+    def reload_if_changed(self) -> Optional[int]:
+        """Re-read the file if its stamp changed; return the version if it was bumped."""
+        with self._write_lock:
+            if self._pending_config is not None:
+                # Our own flush is due shortly and will pick up the file then
+                return None
+
+        stamp = self._config_stamp()
+        if self._cached_config is not None and stamp == self._cached_stamp:
+            return None
+
+        old_version = int(self._cached_config.get("version", 0)) if self._cached_config is not None else None
+        try:
+            config = self._read_config_file()
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            print(f"Error reading config: {e}")
+            return None
+
+        self._set_cached(config, stamp)
+        version = int(config.get("version", 0))
+        return None if version == old_version else version
+
+    # ============= Settings =============
+
+    def get_setting(self, key: str, default: Any = None) -> Any:
+        return self._get_config().get(key, default)
+
+    def set_settings(self, values: Dict[str, Any]) -> None:
+        values = copy.deepcopy(values)
+
+        def mutate(config: Dict[str, Any]) -> None:
+            config.update(values)
+
+        self._update_config(mutate)
+
+    # ============= Flows =============
+
+    def get_custom_flows(self) -> Dict[str, Dict[str, Any]]:
+        return self._get_config().get("customFlows", {})
+
+    def get_custom_flow(self, flow_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_custom_flows().get(flow_id)
+
+    def insert_flow(self, flow_id: str, flow: Dict[str, Any]) -> bool:
+        if flow_id in self.get_custom_flows():
+            return False
+
+        def mutate(config: Dict[str, Any]) -> None:
+            config.setdefault("customFlows", {}).setdefault(flow_id, copy.deepcopy(flow))
+
+        self._update_config(mutate)
+        return True
+
+    def update_flow(self, flow_id: str, changes: Dict[str, Any]) -> bool:
+        if flow_id not in self.get_custom_flows():
+            return False
+
+        def mutate(config: Dict[str, Any]) -> None:
+            flow = config.get("customFlows", {}).get(flow_id)
+            if flow is None:
+                return
+            flow.update(copy.deepcopy(changes))
+
+            # Update system prompt if this is the current flow
+            if config.get("currentFlow") == flow_id and changes.get("prompt"):
+                config["systemPrompt"] = changes["prompt"]
+
+        self._update_config(mutate)
+        return True
+
+    def delete_flow(self, flow_id: str, fallback: Dict[str, Any]) -> bool:
+        if flow_id not in self.get_custom_flows():
+            return False
+
+        def mutate(config: Dict[str, Any]) -> None:
+            if config.get("currentFlow") == flow_id:
+                config.update(fallback)
+            config.get("customFlows", {}).pop(flow_id, None)
+
+        self._update_config(mutate)
+        return True
+
+    # ============= Blacklist =============
+
+    def _get_blacklist_index(self) -> BlacklistIndex:
+        """Get the in-memory blacklist index, rebuilding it when the config changes."""
+        config = self._get_config()
+        if self._blacklist_index is None or self._blacklist_revision != self._revision:
+            self._blacklist_index = BlacklistIndex(
+                config.get("blacklist", []),
+                config.get("blacklistPrefixes", [])
+            )
+            self._blacklist_revision = self._revision
+        return self._blacklist_index
+
+    def _update_blacklist(self, mutate: Mutation) -> None:
+        """Queue a blacklist change; the index was already updated in place."""
+        self._update_config(mutate)
+        if self._pending_config is not None:
+            # Otherwise it was flushed already; rebuild from the merged file
+            self._blacklist_revision = self._revision
+
+    def is_blacklisted(self, number: str) -> bool:
+        return self._get_blacklist_index().is_blocked(number)
+
+    def blacklist_all(self) -> List[str]:
+        return list(self._get_blacklist_index().to_list())
+
+    def blacklist_count(self) -> int:
+        return len(self._get_blacklist_index())
+
+    def blacklist_page(self, offset: int, limit: int, prefix: str = "") -> Tuple[List[str], int]:
+        return self._get_blacklist_index().page(offset, limit, prefix)
+
+    @staticmethod
+    def _normalized(entries: List[str]) -> set:
+        """Entries as the index stores them; legacy files may hold '+52 155...' forms."""
+        return {n for n in map(normalize_number, entries) if n}
+
+    def blacklist_add(self, numbers: List[str]) -> int:
+        added = self._get_blacklist_index().add_many(numbers)
+        if added:
+            added_set = self._normalized(numbers)
+
+            def mutate(config: Dict[str, Any]) -> None:
+                config["blacklist"] = sorted(self._normalized(config.get("blacklist", [])) | added_set)
+
+            self._update_blacklist(mutate)
+        return added
+
+    def blacklist_remove(self, numbers: List[str]) -> int:
+        removed_set = self._normalized(numbers)
+        removed = self._get_blacklist_index().remove_many(removed_set)
+        if removed:
+            def mutate(config: Dict[str, Any]) -> None:
+                config["blacklist"] = sorted(self._normalized(config.get("blacklist", [])) - removed_set)
+
+            self._update_blacklist(mutate)
+        return removed
+
+    def blacklist_prefixes(self) -> List[str]:
+        return sorted(self._get_blacklist_index().prefixes)
+
+    def add_prefix(self, prefix: str) -> bool:
+        if not self._get_blacklist_index().prefixes.add(prefix):
+            return False
+
+        normalized = normalize_number(prefix)
+
+        def mutate(config: Dict[str, Any]) -> None:
+            config["blacklistPrefixes"] = sorted(self._normalized(config.get("blacklistPrefixes", [])) | {normalized})
+
+        self._update_blacklist(mutate)
+        return True
+
+    def remove_prefix(self, prefix: str) -> bool:
+        if not self._get_blacklist_index().prefixes.remove(prefix):
+            return False
+
+        normalized = normalize_number(prefix)
+
+        def mutate(config: Dict[str, Any]) -> None:
+            config["blacklistPrefixes"] = sorted(self._normalized(config.get("blacklistPrefixes", [])) - {normalized})
+
+        self._update_blacklist(mutate)
+        return True
+
+    # ============= User Configs =============
+
+    def get_user_config(self, number: str) -> Optional[Dict[str, Any]]:
+        return self._get_config().get("userConfigs", {}).get(number)
+
+    def user_configs_all(self) -> Dict[str, Dict[str, Any]]:
+        return self._get_config().get("userConfigs", {})
+
+    def user_configs_upsert(self, configs: Dict[str, Dict[str, Any]]) -> int:
+        existing = self.user_configs_all()
+        added = sum(1 for number in configs if number not in existing)
+        configs = copy.deepcopy(configs)
+
+        def mutate(config: Dict[str, Any]) -> None:
+            config.setdefault("userConfigs", {}).update(configs)
+
+        self._update_config(mutate)
+        return added
+
+    def user_config_delete(self, number: str) -> bool:
+        if number not in self.user_configs_all():
+            return False
+
+        def mutate(config: Dict[str, Any]) -> None:
+            config.get("userConfigs", {}).pop(number, None)
+
+        self._update_config(mutate)
+        return True
+
+    def export_document(self) -> Dict[str, Any]:
+        return copy.deepcopy(self._get_config())
+
+
+class SqliteConfigStore(ConfigStore):
+    """SQLite (WAL) backend with indexed tables for flows, blacklist, user overrides and settings.
+
+    Every write is a single transaction that also bumps the "version"
+    setting, so the cost of a change no longer grows with the size of the
+    blacklist or the number of flows. Settings, prefix rules and flows
+    read on the message path are cached in memory and dropped whenever
+    another connection commits (PRAGMA data_version) or the version moves.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS flows (
+            id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS blacklist (
+            number TEXT PRIMARY KEY
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS blacklist_prefixes (
+            prefix TEXT PRIMARY KEY
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS user_configs (
+            number TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, db_path: str, default_config: Dict[str, Any], import_path: Optional[str] = None):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self.SCHEMA)
+
+        self._revision = 0
+        self._data_version: Optional[int] = None
+        self._clear_caches()
+
+        if self._read_version() is None:
+            self._initialize(default_config, import_path)
+
+    def _initialize(self, default_config: Dict[str, Any], import_path: Optional[str]) -> None:
+        """Seed an empty database from the JSON config file, or from defaults."""
+        document = default_config
+        if import_path and os.path.exists(import_path):
+            try:
+                with open(import_path, 'r', encoding='utf-8') as f:
+                    document = json.load(f)
+                print(f"Importing {import_path} into {self.db_path}")
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Could not import {import_path}, using defaults: {e}")
+        self.import_document(document)
+
+    def _clear_caches(self) -> None:
+        self._settings: Optional[Dict[str, Any]] = None
+        self._flows: Optional[Dict[str, Dict[str, Any]]] = None
+        self._flow_cache: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._user_cache: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._prefixes: Optional[PrefixTrie] = None
+        self._count: Optional[int] = None
+        self._revision += 1
+
+    def _sync(self) -> None:
+        """Drop caches if another connection committed since the last check."""
+        if self.watching and self._data_version is not None:
+            return
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                if self._data_version is not None:
+                    self._clear_caches()
+                self._data_version = data_version
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run writes in one IMMEDIATE transaction; bump the version if anything changed."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            before = self._conn.total_changes
+            try:
+                yield self._conn
+                changed = self._conn.total_changes != before
+                if changed:
+                    self._conn.execute(
+                        "INSERT INTO settings (key, value) VALUES ('version', '1') "
+                        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            # No-op writes (duplicate insert, unknown id) keep the caches and the version
+            if changed:
+                self._clear_caches()
+
+    def _read_version(self) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM settings WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else None
+
+    def revision(self) -> int:
+        self._sync()
+        return self._revision
+
+    def version(self) -> int:
+        return int(self._get_settings().get("version", 0))
+
+    def reload_if_changed(self) -> Optional[int]:
+        old_version = self.version()
+        version = self._read_version() or 0
+        if version == old_version:
+            return None
+        self._clear_caches()
+        return version
+
+    # ============= Settings =============
+
+    def _get_settings(self) -> Dict[str, Any]:
+        self._sync()
+        if self._settings is None:
+            with self._lock:
+                rows = self._conn.execute("SELECT key, value FROM settings").fetchall()
+            self._settings = {key: json.loads(value) for key, value in rows}
+        return self._settings
+
+    def get_setting(self, key: str, default: Any = None) -> Any:
+        return self._get_settings().get(key, default)
+
+    def set_settings(self, values: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False)) for key, value in values.items()]
+            )
+
+    # ============= Flows =============
+
+    def get_custom_flows(self) -> Dict[str, Dict[str, Any]]:
+        self._sync()
+        if self._flows is None:
+            with self._lock:
+                rows = self._conn.execute("SELECT id, data FROM flows").fetchall()
+            self._flows = {flow_id: json.loads(data) for flow_id, data in rows}
+        return self._flows
+
+    def get_custom_flow(self, flow_id: str) -> Optional[Dict[str, Any]]:
+        self._sync()
+        if self._flows is not None:
+            return self._flows.get(flow_id)
+        if flow_id not in self._flow_cache:
+            with self._lock:
+                row = self._conn.execute("SELECT data FROM flows WHERE id = ?", (flow_id,)).fetchone()
+            self._flow_cache[flow_id] = json.loads(row[0]) if row else None
+        return self._flow_cache[flow_id]
+
+    def insert_flow(self, flow_id: str, flow: Dict[str, Any]) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO flows (id, data) VALUES (?, ?)",
+                (flow_id, json.dumps(flow, ensure_ascii=False))
+            )
+            return cursor.rowcount > 0
+
+    def update_flow(self, flow_id: str, changes: Dict[str, Any]) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM flows WHERE id = ?", (flow_id,)).fetchone()
+            if not row:
+                return False
+            flow = {**json.loads(row[0]), **changes}
+            conn.execute(
+                "UPDATE flows SET data = ? WHERE id = ?",
+                (json.dumps(flow, ensure_ascii=False), flow_id)
+            )
+            if changes.get("prompt"):
+                conn.execute(
+                    "UPDATE settings SET value = ? WHERE key = 'systemPrompt' "
+                    "AND (SELECT value FROM settings WHERE key = 'currentFlow') = ?",
+                    (json.dumps(changes["prompt"], ensure_ascii=False), json.dumps(flow_id))
+                )
+            return True
+
+    def delete_flow(self, flow_id: str, fallback: Dict[str, Any]) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM flows WHERE id = ?", (flow_id,))
+            if cursor.rowcount == 0:
+                return False
+            current = conn.execute("SELECT value FROM settings WHERE key = 'currentFlow'").fetchone()
+            if current and json.loads(current[0]) == flow_id:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                    [(key, json.dumps(value, ensure_ascii=False)) for key, value in fallback.items()]
+                )
+            return True
+
+    # ============= Blacklist =============
+
+    def _get_prefixes(self) -> PrefixTrie:
+        self._sync()
+        if self._prefixes is None:
+            with self._lock:
+                rows = self._conn.execute("SELECT prefix FROM blacklist_prefixes").fetchall()
+            self._prefixes = PrefixTrie(prefix for (prefix,) in rows)
+        return self._prefixes
+
+    def is_blacklisted(self, number: str) -> bool:
+        number = normalize_number(number)
+        if not number:
+            return False
+        prefixes = self._get_prefixes()
+        if prefixes and prefixes.match(number) is not None:
+            return True
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM blacklist WHERE number = ?", (number,)).fetchone()
+        return row is not None
+
+    def blacklist_all(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT number FROM blacklist ORDER BY number").fetchall()
+        return [number for (number,) in rows]
+
+    def blacklist_count(self) -> int:
+        self._sync()
+        if self._count is None:
+            with self._lock:
+                self._count = self._conn.execute("SELECT COUNT(*) FROM blacklist").fetchone()[0]
+        return self._count
+
+    def blacklist_page(self, offset: int, limit: int, prefix: str = "") -> Tuple[List[str], int]:
+        prefix = normalize_number(prefix)
+        if not prefix:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT number FROM blacklist ORDER BY number LIMIT ? OFFSET ?",
+                    (limit, offset)
+                ).fetchall()
+            return [number for (number,) in rows], self.blacklist_count()
+
+        # ':' sorts right after '9', so this range covers every number starting with prefix
+        bounds = (prefix, prefix + ":")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT number FROM blacklist WHERE number >= ? AND number < ? "
+                "ORDER BY number LIMIT ? OFFSET ?",
+                (*bounds, limit, offset)
+            ).fetchall()
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM blacklist WHERE number >= ? AND number < ?",
+                bounds
+            ).fetchone()[0]
+        return [number for (number,) in rows], total
+
+    def blacklist_add(self, numbers: List[str]) -> int:
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO blacklist (number) VALUES (?)", ((n,) for n in numbers))
+            return conn.total_changes - before
+
+    def blacklist_remove(self, numbers: List[str]) -> int:
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("DELETE FROM blacklist WHERE number = ?", ((n,) for n in numbers))
+            return conn.total_changes - before
+
+    def blacklist_prefixes(self) -> List[str]:
+        return sorted(self._get_prefixes())
+
+    def add_prefix(self, prefix: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute("INSERT OR IGNORE INTO blacklist_prefixes (prefix) VALUES (?)", (prefix,))
+            return cursor.rowcount > 0
+
+    def remove_prefix(self, prefix: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM blacklist_prefixes WHERE prefix = ?", (prefix,))
+            return cursor.rowcount > 0
+
+    # ============= User Configs =============
+
+    def get_user_config(self, number: str) -> Optional[Dict[str, Any]]:
+        self._sync()
+        if number not in self._user_cache:
+            with self._lock:
+                row = self._conn.execute("SELECT data FROM user_configs WHERE number = ?", (number,)).fetchone()
+            self._user_cache[number] = json.loads(row[0]) if row else None
+        return self._user_cache[number]
+
+    def user_configs_all(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT number, data FROM user_configs ORDER BY number").fetchall()
+        return {number: json.loads(data) for number, data in rows}
+
+    def user_configs_upsert(self, configs: Dict[str, Dict[str, Any]]) -> int:
+        with self._transaction() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM user_configs").fetchone()[0]
+            conn.executemany(
+                "INSERT OR REPLACE INTO user_configs (number, data) VALUES (?, ?)",
+                [(number, json.dumps(config, ensure_ascii=False)) for number, config in configs.items()]
+            )
+            return conn.execute("SELECT COUNT(*) FROM user_configs").fetchone()[0] - before
+
+    def user_config_delete(self, number: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM user_configs WHERE number = ?", (number,))
+            return cursor.rowcount > 0
+
+    # ============= Import / Export =============
+
+    def import_document(self, document: Dict[str, Any]) -> None:
+        """Load a JSON-layout config document, merging into existing tables."""
+        settings = {k: v for k, v in document.items() if k not in STRUCTURED_KEYS}
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False)) for key, value in settings.items()]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO flows (id, data) VALUES (?, ?)",
+                [
+                    (flow_id, json.dumps(flow, ensure_ascii=False))
+                    for flow_id, flow in (document.get("customFlows") or {}).items()
+                ]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO blacklist (number) VALUES (?)",
+                ((n,) for n in map(normalize_number, document.get("blacklist", [])) if n)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO blacklist_prefixes (prefix) VALUES (?)",
+                ((p,) for p in map(normalize_number, document.get("blacklistPrefixes", [])) if p)
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO user_configs (number, data) VALUES (?, ?)",
+                [
+                    (number, json.dumps(config, ensure_ascii=False))
+                    for number, config in (document.get("userConfigs") or {}).items()
+                ]
+            )
+
+    def export_document(self) -> Dict[str, Any]:
+        document = dict(self._get_settings())
+        document["customFlows"] = copy.deepcopy(self.get_custom_flows())
+        document["blacklist"] = self.blacklist_all()
+        document["blacklistPrefixes"] = self.blacklist_prefixes()
+        document["userConfigs"] = self.user_configs_all()
+        return document
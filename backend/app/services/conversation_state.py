@@ -0,0 +1,250 @@
+"""Conversation history and menu state, in process memory or shared through Redis."""
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import Settings, get_settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Memory store only
+    aioredis = None
+
+Message = Dict[str, str]
+
+
+class ConversationState:
+    """One user's chat: recent messages and whether the flow menu was shown.
+
+    menu_shown is None until the menu is first shown; a reset sets it
+    to False so the menu is not offered again.
+    """
+
+    __slots__ = ("history", "menu_shown", "version")
+
+    def __init__(self, history: Optional[List[Message]] = None, menu_shown: Optional[bool] = None,
+                 version: int = 0):
+        self.history = history or []
+        self.menu_shown = menu_shown
+        self.version = version
+
+
+class ConversationStore:
+    """Interface shared by the conversation state backends.
+
+    A turn is one load() before the model call and one append() after
+    it, so each backend can serve a turn in two round trips.
+    """
+
+    async def load(self, key: str) -> ConversationState:
+        raise NotImplementedError
+
+    async def append(self, key: str, messages: List[Message]) -> None:
+        """Add messages to the history, keeping the most recent max_messages."""
+        raise NotImplementedError
+
+    async def set_menu_shown(self, key: str, shown: bool) -> None:
+        raise NotImplementedError
+
+    async def clear(self, key: str) -> None:
+        """Drop the history; the menu is marked as already shown."""
+        raise NotImplementedError
+
+    def local_count(self) -> int:
+        """Conversations held in this process."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryConversationStore(ConversationStore):
+    """Per-process dicts: correct only with a single worker."""
+
+    def __init__(self, max_messages: int = 20):
+        self.max_messages = max_messages
+        self.conversations: Dict[str, List[Message]] = {}
+        self.menu_state: Dict[str, bool] = {}
+
+    async def load(self, key: str) -> ConversationState:
+        return ConversationState(list(self.conversations.get(key, ())), self.menu_state.get(key))
+
+    async def append(self, key: str, messages: List[Message]) -> None:
+        history = self.conversations.setdefault(key, [])
+        history.extend(messages)
+        if len(history) > self.max_messages:
+            del history[:-self.max_messages]
+
+    async def set_menu_shown(self, key: str, shown: bool) -> None:
+        self.menu_state[key] = shown
+
+    async def clear(self, key: str) -> None:
+        self.conversations[key] = []
+        self.menu_state[key] = False
+
+    def local_count(self) -> int:
+        return len(self.conversations)
+
+
+class RedisConversationStore(ConversationStore):
+    """State shared by every worker and replica through Redis.
+
+    Per conversation: a list of JSON messages (``conv:<key>``) and a
+    hash (``meta:<key>``) with a version bumped on every write and the
+    menu flag. Both expire after ``ttl`` seconds without activity.
+
+    A near-cache keeps recently used histories with their version. A
+    load sends HMGET meta (plus LRANGE when nothing is cached) in one
+    pipeline; the cached history is reused only while its version
+    still matches, so a turn served by another worker is never
+    missed. Writes are one MULTI/EXEC pipeline.
+
+    If Redis is unreachable the store falls back to process memory
+    for that call and logs the error, as the Node redisService did.
+    """
+
+    def __init__(self, url: str, prefix: str = "karuna:", max_messages: int = 20,
+                 ttl: int = 604800, near_cache_size: int = 10000):
+        self.client = aioredis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self.near_cache_size = near_cache_size
+        self._near: "OrderedDict[str, Tuple[int, List[Message]]]" = OrderedDict()
+        self._fallback = MemoryConversationStore(max_messages)
+        self._last_error_at = 0.0
+        self.stats = {"near_hits": 0, "near_misses": 0, "errors": 0}
+
+    def _keys(self, key: str) -> Tuple[str, str]:
+        return f"{self.prefix}conv:{key}", f"{self.prefix}meta:{key}"
+
+    def _error(self, operation: str, error: Exception) -> None:
+        self.stats["errors"] += 1
+        # At most one log line every 10 s while Redis is down
+        now = time.monotonic()
+        if now - self._last_error_at > 10:
+            self._last_error_at = now
+            print(f"Redis {operation} failed, using process memory: {error}")
+
+    def _remember(self, key: str, version: int, history: List[Message]) -> None:
+        self._near[key] = (version, history)
+        self._near.move_to_end(key)
+        while len(self._near) > self.near_cache_size:
+            self._near.popitem(last=False)
+
+    @staticmethod
+    def _menu(value: Optional[str]) -> Optional[bool]:
+        return None if value is None else value == "1"
+
+    async def load(self, key: str) -> ConversationState:
+        conv_key, meta_key = self._keys(key)
+        cached = self._near.get(key)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.hmget(meta_key, "v", "menu")
+            if cached is None:
+                pipe.lrange(conv_key, -self.max_messages, -1)
+            results = await pipe.execute()
+            version, menu = results[0]
+            version = int(version or 0)
+
+            if cached is not None and cached[0] == version:
+                self.stats["near_hits"] += 1
+                self._near.move_to_end(key)
+                return ConversationState(list(cached[1]), self._menu(menu), version)
+
+            self.stats["near_misses"] += 1
+            if cached is None:
+                raw = results[1]
+            else:
+                raw = await self.client.lrange(conv_key, -self.max_messages, -1)
+            history = [json.loads(item) for item in raw]
+            self._remember(key, version, history)
+            return ConversationState(list(history), self._menu(menu), version)
+        except (aioredis.RedisError, OSError) as e:
+            self._error("load", e)
+            return await self._fallback.load(key)
+
+    async def append(self, key: str, messages: List[Message]) -> None:
+        conv_key, meta_key = self._keys(key)
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.rpush(conv_key, *(json.dumps(m, ensure_ascii=False) for m in messages))
+            pipe.ltrim(conv_key, -self.max_messages, -1)
+            pipe.hincrby(meta_key, "v", 1)
+            pipe.expire(conv_key, self.ttl)
+            pipe.expire(meta_key, self.ttl)
+            results = await pipe.execute()
+        except (aioredis.RedisError, OSError) as e:
+            self._error("append", e)
+            await self._fallback.append(key, messages)
+            return
+
+        version = results[2]
+        cached = self._near.get(key)
+        if cached is not None and cached[0] == version - 1:
+            self._remember(key, version, (cached[1] + messages)[-self.max_messages:])
+        else:
+            # Another worker wrote in between: reload on the next turn
+            self._near.pop(key, None)
+
+    async def set_menu_shown(self, key: str, shown: bool) -> None:
+        _, meta_key = self._keys(key)
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.hset(meta_key, "menu", "1" if shown else "0")
+            pipe.expire(meta_key, self.ttl)
+            await pipe.execute()
+        except (aioredis.RedisError, OSError) as e:
+            self._error("set_menu_shown", e)
+            await self._fallback.set_menu_shown(key, shown)
+
+    async def clear(self, key: str) -> None:
+        conv_key, meta_key = self._keys(key)
+        self._near.pop(key, None)
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.delete(conv_key)
+            pipe.hincrby(meta_key, "v", 1)
+            pipe.hset(meta_key, "menu", "0")
+            pipe.expire(meta_key, self.ttl)
+            await pipe.execute()
+        except (aioredis.RedisError, OSError) as e:
+            self._error("clear", e)
+            await self._fallback.clear(key)
+
+    def local_count(self) -> int:
+        return len(self._near) + self._fallback.local_count()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "near_cache_entries": len(self._near)}
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_conversation_store(settings: Settings) -> ConversationStore:
+    """Redis when REDIS_URL is set (and redis is installed), else process memory."""
+    if settings.redis_url:
+        if aioredis is None:
+            print("WARNING: REDIS_URL is set but the redis package is not installed; "
+                  "conversations stay in process memory")
+        else:
+            print("Conversation state: Redis")
+            return RedisConversationStore(
+                settings.redis_url,
+                settings.redis_key_prefix,
+                settings.conversation_max_messages,
+                settings.conversation_ttl_seconds,
+                settings.conversation_near_cache_size
+            )
+    return MemoryConversationStore(settings.conversation_max_messages)
+
+
+def _create_store() -> ConversationStore:
+    return create_conversation_store(get_settings())
+
+
+# Singleton instance
+conversation_store = _create_store()
@@ -1,34 +1,227 @@
 """Date parsing service using Grok AI."""
+import asyncio
 import json
 import re
-from datetime import datetime
-from typing import Optional, Dict, Any
-from openai import OpenAI
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import AsyncIterator, Optional, Dict, Any, List, Tuple
+from openai import AsyncOpenAI
 from ..config import get_settings
+from .metrics import track_request
+from .local_date_parser import (
+    CONFIDENCE_THRESHOLD,
+    local_now,
+    normalize_text,
+    parse_spanish_datetime
+)
+
+CacheKey = Tuple[str, str]
+
+PROMPT_EXAMPLES = """Ejemplos:
+- "manana a las 3 de la tarde" -> {"fecha": "2025-10-28", "hora": "15:00", "interpretacion": "Manana martes 28 de octubre a las 3 PM"}
+- "el proximo viernes a las 10 am" -> {"fecha": "2025-11-01", "hora": "10:00", "interpretacion": "Viernes 1 de noviembre a las 10 AM"}
+- "dentro de 3 dias a las 2" -> {"fecha": "2025-10-30", "hora": "14:00", "interpretacion": "Jueves 30 de octubre a las 2 PM"}"""
 
 
 class DateParserService:
-    """Service for parsing natural language dates using Grok AI."""
+    """Service for parsing natural language dates.
+
+    Common expressions are resolved locally; only low-confidence input
+    goes to Grok, through the async client so a slow completion never
+    blocks the event loop. Results are cached by normalized text and
+    local date, since "manana a las 10" means the same thing all day.
+    """
 
     def __init__(self):
         settings = get_settings()
-        self.client = OpenAI(
+        self.client = AsyncOpenAI(
             api_key=settings.xai_api_key,
             base_url="https://api.x.ai/v1"
         ) if settings.xai_api_key else None
 
+        self.cache_size = settings.date_parse_cache_size
+        self.batch_size = max(1, settings.date_parse_batch_size)
+        self.concurrency = max(1, settings.date_parse_concurrency)
+        self._cache: "OrderedDict[CacheKey, Dict[str, Any]]" = OrderedDict()
+        self._cache_date: Optional[date] = None
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "local": 0,
+            "llm": 0,
+            "llm_errors": 0,
+            "unparsed": 0
+        }
+
+    # ============= Cache =============
+
+    def _cache_get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+        return result
+
+    def _cache_put(self, key: CacheKey, result: Dict[str, Any]) -> None:
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache and resolver counters since startup."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._cache),
+            "max_size": self.cache_size,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+        }
+
+    def clear_cache(self) -> None:
+        """Drop all cached results."""
+        self._cache.clear()
+
+    def _roll_cache(self, now: datetime) -> str:
+        """Clear the cache when the local date changes; return today's key part."""
+        today = now.date()
+        if today != self._cache_date:
+            # Relative expressions resolve differently on a new day
+            self._cache.clear()
+            self._cache_date = today
+        return today.isoformat()
+
+    # ============= Parsing =============
+
     async def parsear_fecha_hora(self, texto_usuario: str) -> Optional[Dict[str, Any]]:
         """Parse natural language date/time from user input."""
-        if not self.client:
-            return None
+        now = local_now()
+        key = (normalize_text(texto_usuario), self._roll_cache(now))
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return dict(cached)
+        self.stats["misses"] += 1
+
+        # Identical texts arriving together share one resolution
+        pending = self._inflight.get(key)
+        if pending is not None:
+            result = await asyncio.shield(pending)
+            return dict(result) if result else None
 
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        result = None
         try:
-            now = datetime.now()
-            weekday = now.strftime("%A")
+            result = self._parse_local(texto_usuario, now)
+            if result is None:
+                result = await self._ask_llm(texto_usuario, now)
+            if result:
+                self._cache_put(key, result)
+        finally:
+            future.set_result(result)
+            del self._inflight[key]
 
-            prompt = f"""Fecha actual: {now.strftime("%Y-%m-%d")} ({weekday})
+        return dict(result) if result else None
+
+    async def parse_many(self, texts: List[str]) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]]]]:
+        """Parse many texts, yielding (index, result) in input order.
+
+        Duplicates are resolved once. Cached and locally parseable texts
+        are answered right away; the rest go to Grok in groups of
+        date_parse_batch_size per prompt, with at most
+        date_parse_concurrency prompts in flight.
+        """
+        now = local_now()
+        today = self._roll_cache(now)
+        keys = [(normalize_text(text), today) for text in texts]
+
+        results: Dict[CacheKey, Optional[Dict[str, Any]]] = {}
+        unresolved: Dict[CacheKey, str] = {}
+        for key, text in zip(keys, texts):
+            if key in results or key in unresolved:
+                continue
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.stats["hits"] += 1
+                results[key] = cached
+                continue
+            self.stats["misses"] += 1
+            local = self._parse_local(text, now)
+            if local is not None:
+                self._cache_put(key, local)
+                results[key] = local
+            else:
+                unresolved[key] = text
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        items = list(unresolved.items())
+
+        async def run_group(group: List[Tuple[CacheKey, str]]) -> List[Optional[Dict[str, Any]]]:
+            async with semaphore:
+                group_results = await self._ask_llm_group([text for _, text in group], now)
+            for (key, _), result in zip(group, group_results):
+                if result:
+                    self._cache_put(key, result)
+            return group_results
+
+        tasks = []
+        placement: Dict[CacheKey, Tuple[asyncio.Task, int]] = {}
+        for start in range(0, len(items), self.batch_size):
+            group = items[start:start + self.batch_size]
+            task = asyncio.create_task(run_group(group))
+            tasks.append(task)
+            for position, (key, _) in enumerate(group):
+                placement[key] = (task, position)
+
+        try:
+            for index, key in enumerate(keys):
+                if key not in results:
+                    task, position = placement[key]
+                    results[key] = (await task)[position]
+                result = results[key]
+                yield index, dict(result) if result else None
+        finally:
+            # Client went away: stop prompts that have not finished
+            for task in tasks:
+                task.cancel()
+
+    def _parse_local(self, text: str, now: datetime) -> Optional[Dict[str, Any]]:
+        """Rule-based parse, only when it is confident."""
+        local = parse_spanish_datetime(text, now)
+        if not local or local["confidence"] < CONFIDENCE_THRESHOLD:
+            return None
+        self.stats["local"] += 1
+        return {
+            "date": local["date"],
+            "time": local["time"],
+            "interpretation": local["interpretation"]
+        }
+
+    def _prompt_header(self, now: datetime) -> str:
+        weekday = now.strftime("%A")
+        return f"""Fecha actual: {now.strftime("%Y-%m-%d")} ({weekday})
 Hora actual: {now.strftime("%H:%M")}
+"""
+
+    async def _complete(self, prompt: str) -> str:
+        with track_request("xai", "parse_date"):
+            completion = await self.client.chat.completions.create(
+                model="grok-4-fast-reasoning",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.1
+            )
+        return completion.choices[0].message.content
 
+    async def _ask_llm(self, texto_usuario: str, now: datetime) -> Optional[Dict[str, Any]]:
+        """Resolve one text with Grok."""
+        if not self.client:
+            self.stats["unparsed"] += 1
+            return None
+
+        self.stats["llm"] += 1
+        try:
+            prompt = self._prompt_header(now) + f"""
 El usuario dijo: "{texto_usuario}"
 
 Extrae la fecha y hora que el usuario quiere agendar. Si solo menciona dia sin fecha especifica (ej: "manana", "el lunes"), calcula la fecha correcta.
@@ -40,36 +233,82 @@ RESPONDE SOLO CON JSON EN ESTE FORMATO EXACTO:
   "interpretacion": "texto explicando lo que entendiste"
 }}
 
-Ejemplos:
-- "manana a las 3 de la tarde" -> {{"fecha": "2025-10-28", "hora": "15:00", "interpretacion": "Manana martes 28 de octubre a las 3 PM"}}
-- "el proximo viernes a las 10 am" -> {{"fecha": "2025-11-01", "hora": "10:00", "interpretacion": "Viernes 1 de noviembre a las 10 AM"}}
-- "dentro de 3 dias a las 2" -> {{"fecha": "2025-10-30", "hora": "14:00", "interpretacion": "Jueves 30 de octubre a las 2 PM"}}"""
-
-            completion = self.client.chat.completions.create(
-                model="grok-4-fast-reasoning",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
-            )
+""" + PROMPT_EXAMPLES
 
-            response = completion.choices[0].message.content
+            response = await self._complete(prompt)
 
             # Extract JSON from response
             json_match = re.search(r'\{[\s\S]*\}', response)
 
             if json_match:
-                parsed = json.loads(json_match.group())
-                return {
-                    "date": parsed.get("fecha"),
-                    "time": parsed.get("hora"),
-                    "interpretation": parsed.get("interpretacion")
-                }
+                return _llm_result(json.loads(json_match.group()))
 
             raise ValueError("Could not parse response")
 
         except Exception as error:
+            self.stats["llm_errors"] += 1
             print(f"Error parsing date: {str(error)}")
             return None
 
+    async def _ask_llm_group(self, texts: List[str], now: datetime) -> List[Optional[Dict[str, Any]]]:
+        """Resolve several texts with a single Grok prompt."""
+        if len(texts) == 1:
+            return [await self._ask_llm(texts[0], now)]
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        if not self.client:
+            self.stats["unparsed"] += len(texts)
+            return results
+
+        self.stats["llm"] += len(texts)
+        try:
+            numbered = "\n".join(
+                f"{i}. {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(texts, 1)
+            )
+            prompt = self._prompt_header(now) + f"""
+Cada linea es un texto distinto de un usuario:
+{numbered}
+
+Para cada texto, extrae la fecha y hora que el usuario quiere agendar. Si solo menciona dia sin fecha especifica (ej: "manana", "el lunes"), calcula la fecha correcta. Si un texto no contiene fecha y hora, usa null en "fecha" y "hora".
+
+RESPONDE SOLO CON UN ARREGLO JSON, un objeto por texto, EN ESTE FORMATO EXACTO:
+[
+  {{"id": 1, "fecha": "YYYY-MM-DD", "hora": "HH:MM", "interpretacion": "texto explicando lo que entendiste"}}
+]
+
+""" + PROMPT_EXAMPLES
+
+            response = await self._complete(prompt)
+
+            json_match = re.search(r'\[[\s\S]*\]', response)
+            if not json_match:
+                raise ValueError("Could not parse response")
+
+            for parsed in json.loads(json_match.group()):
+                index = int(parsed.get("id", 0)) - 1
+                if 0 <= index < len(texts):
+                    results[index] = _llm_result(parsed)
+
+        except Exception as error:
+            self.stats["llm_errors"] += 1
+            print(f"Error parsing {len(texts)} dates: {str(error)}")
+
+        return results
+
+
+def _llm_result(parsed: Any) -> Optional[Dict[str, Any]]:
+    """Grok's {fecha, hora, interpretacion} as a result; None unless it has a date and a time."""
+    if not isinstance(parsed, dict):
+        return None
+    fecha, hora, interpretacion = parsed.get("fecha"), parsed.get("hora"), parsed.get("interpretacion")
+    if not fecha or not hora or not isinstance(fecha, str) or not isinstance(hora, str):
+        return None
+    return {
+        "date": fecha,
+        "time": hora,
+        "interpretation": interpretacion if isinstance(interpretacion, str) else None
+    }
+
 
 # Singleton instance
 date_parser_service = DateParserService()
@@ -0,0 +1,145 @@
+"""Graph API checks behind /diagnose, /phone-info and /ready, run concurrently and cached."""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ..config import get_settings
+from .metrics import track_request
+
+# Phone number fields for both /diagnose and /phone-info, so one request serves both
+PHONE_FIELDS = (
+    "display_phone_number,verified_name,quality_rating,platform_type,status,name_status,"
+    "is_official_business_account,throughput,code_verification_status,is_pin_enabled,"
+    "messaging_limit_tier"
+)
+PROFILE_FIELDS = "about,address,description,email,profile_picture_url,websites,vertical"
+
+
+class GraphDiagnostics:
+    """Snapshot of the Graph API checks, refreshed at most once per TTL.
+
+    The independent GETs (phone number, business profile, messaging
+    product) run concurrently over one client, bounded by a single
+    deadline; a check that misses it is reported as a timeout rather
+    than holding up the others.
+
+    Within ``ttl`` the cached snapshot is returned as is. For
+    ``stale_ttl`` after that it is still returned immediately while
+    one background refresh runs. Concurrent callers never start more
+    than one refresh.
+    """
+
+    def __init__(self, base_url: str, token: str, ttl: float = 30.0, stale_ttl: float = 300.0,
+                 deadline: float = 10.0):
+        self.base_url = base_url
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.deadline = deadline
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._fetched_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "stale_hits": 0, "refreshes": 0}
+
+    # ============= Checks =============
+
+    async def _get(self, client: httpx.AsyncClient, operation: str, url: str,
+                   params: Dict[str, str]) -> Dict[str, Any]:
+        """One GET as {"status_code", "data"} or {"status_code": None, "error"}."""
+        try:
+            with track_request("graph", operation) as result:
+                response = await client.get(url, headers=self.headers, params=params)
+                result["status"] = str(response.status_code)
+        except httpx.TimeoutException:
+            return {"status_code": None, "error": "timeout"}
+        except Exception as e:
+            return {"status_code": None, "error": str(e) or type(e).__name__}
+        is_json = "application/json" in response.headers.get("content-type", "")
+        return {"status_code": response.status_code, "data": response.json() if is_json else response.text}
+
+    async def _run_checks(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        checks = {
+            "phone": (self.base_url, {"fields": PHONE_FIELDS}),
+            "profile": (f"{self.base_url}/whatsapp_business_profile", {"fields": PROFILE_FIELDS}),
+            "app": (self.base_url, {"fields": "messaging_product"}),
+        }
+        snapshot: Dict[str, Any] = {}
+        async with httpx.AsyncClient(timeout=self.deadline) as client:
+            tasks = {
+                name: asyncio.create_task(self._get(client, f"get_{name}", url, params))
+                for name, (url, params) in checks.items()
+            }
+            done, pending = await asyncio.wait(tasks.values(), timeout=self.deadline)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for name, task in tasks.items():
+                snapshot[name] = task.result() if task in done else {"status_code": None, "error": "timeout"}
+
+        snapshot["checked_at"] = time.time()
+        snapshot["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self._snapshot = snapshot
+        self._fetched_at = time.monotonic()
+        self.stats["refreshes"] += 1
+        return snapshot
+
+    def _refresh(self) -> asyncio.Task:
+        """The refresh in flight, or a new one."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._run_checks())
+        return self._refresh_task
+
+    # ============= Access =============
+
+    async def snapshot(self, force: bool = False) -> Dict[str, Any]:
+        """Check results, from cache when fresh enough; force waits for a new run."""
+        if not force and self._snapshot is not None:
+            age = time.monotonic() - self._fetched_at
+            if age < self.ttl:
+                self.stats["hits"] += 1
+                return self._snapshot
+            if age < self.ttl + self.stale_ttl:
+                self.stats["stale_hits"] += 1
+                self._refresh()
+                return self._snapshot
+        # Shielded so one caller disconnecting does not cancel the run for the others
+        return await asyncio.shield(self._refresh())
+
+    def cached(self) -> Optional[Dict[str, Any]]:
+        """Last snapshot without any network call (None before the first run)."""
+        return self._snapshot
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last snapshot was taken."""
+        return time.monotonic() - self._fetched_at if self._snapshot is not None else None
+
+    def warm(self) -> None:
+        """Start a refresh in the background (at startup, so /ready has state)."""
+        self._refresh()
+
+    def cache_info(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            "checked_at": self._snapshot["checked_at"] if self._snapshot else None,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "stale": age is not None and age >= self.ttl,
+            "duration_ms": self._snapshot["duration_ms"] if self._snapshot else None
+        }
+
+
+def _create_diagnostics() -> GraphDiagnostics:
+    settings = get_settings()
+    return GraphDiagnostics(
+        f"https://graph.facebook.com/{settings.meta_version}/{settings.meta_number_id}",
+        settings.meta_jwt_token,
+        settings.diagnostics_cache_ttl_ms / 1000,
+        settings.diagnostics_stale_ttl_ms / 1000,
+        settings.diagnostics_deadline_ms / 1000
+    )
+
+
+# Singleton instance
+graph_diagnostics = _create_diagnostics()
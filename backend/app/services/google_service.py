@@ -1,14 +1,63 @@
 """Google Sheets and Calendar service."""
+import asyncio
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
 from ..config import get_settings
+from .appointment_ledger import (
+    APPOINTMENT_DURATION,
+    AppointmentLedger,
+    SYNC_PENDING,
+    booking_id_for,
+    calendar_event_id
+)
+from .availability_index import AvailabilityIndex
+from .ics import CALENDAR_FOOTER, calendar_header, render_event
+from .local_date_parser import TIMEZONE, local_now
+from .metrics import track_request
+from .reminder_scheduler import reminder_scheduler
+from .tenants import DEFAULT_TENANT_ID
+from .sheets_queue import SheetsWriteQueue
+
+# Retry schedule for appointments the reconciler could not push
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+# Google 4xx errors that are worth retrying (timeouts, rate limits); any other 4xx is permanent
+TRANSIENT_CLIENT_ERRORS = (408, 429)
+RATE_LIMIT_REASONS = ("ratelimitexceeded", "userratelimitexceeded", "quotaexceeded")
+
+
+def _is_permanent(error: Exception) -> bool:
+    """A request Google will keep rejecting as sent (bad id, bad body, no access)."""
+    status = getattr(getattr(error, "resp", None), "status", None)
+    try:
+        status = int(status)
+    except (TypeError, ValueError):
+        return False
+    if not 400 <= status < 500 or status in TRANSIENT_CLIENT_ERRORS:
+        return False
+    # Calendar reports rate limits as 403
+    return not any(reason in str(error).lower() for reason in RATE_LIMIT_REASONS)
 
 
 class GoogleService:
-    """Service for Google Sheets and Calendar integration."""
+    """Service for Google Sheets and Calendar integration.
+
+    googleapiclient is blocking, so every request runs on a small
+    dedicated thread pool with a per-call timeout instead of on the
+    event loop. Appointments are recorded in a local SQLite ledger
+    first; Sheets rows (through a durable write-behind queue, in batched
+    appends) and Calendar events are pushed from there and retried by
+    a reconciler. Booked slots are mirrored in a local
+    AvailabilityIndex, so conflicts and free slots are answered without
+    a Calendar query. The ledger's fsynced commits also run in a thread.
+
+    Credentials and API clients are loaded on first use, from the
+    discovery documents bundled with googleapiclient, so importing the
+    app neither pulls in the Google libraries nor touches the network.
+    """
 
     def __init__(self):
         settings = get_settings()
@@ -18,173 +67,437 @@ class GoogleService:
         self.credentials_path = settings.google_credentials_path
         self.calendar_id = "98c7c45883afcff9bce5a3e3ca64f0a64e589ab35657a749df90d826a55cae4f@group.calendar.google.com"
 
-        self.sheets = None
-        self.calendar = None
+        self._sheets = None
+        self._calendar = None
+        self.credentials = None
+        self._clients_loaded = False
+        self._clients_lock = threading.Lock()
+
+        self.request_timeout = settings.google_request_timeout_ms / 1000
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.google_max_workers,
+            thread_name_prefix="google-api"
+        )
+        self._thread_local = threading.local()
+
+        self.sheets_queue = SheetsWriteQueue(
+            settings.sheets_queue_path,
+            self._append_rows,
+            batch_size=settings.sheets_batch_size,
+            interval=settings.sheets_flush_interval_ms / 1000
+        )
+
+        self.availability = AvailabilityIndex(
+            business_start=time.fromisoformat(settings.business_hours_start),
+            business_end=time.fromisoformat(settings.business_hours_end),
+            business_days=[int(d) for d in settings.business_days.split(",") if d.strip()]
+        )
+        self.availability_sync_days = settings.availability_sync_days
+        # Held from the free-slot check to availability.add, and while a sync swaps the index
+        self._booking_lock = asyncio.Lock()
 
-        self._initialize_services()
+        self.ledger = AppointmentLedger(settings.appointments_db_path)
+        self.max_sync_attempts = max(1, settings.appointments_max_sync_attempts)
+
+    # ============= Client Initialization =============
 
     def _initialize_services(self) -> None:
-        """Initialize Google API services."""
-        try:
-            if not os.path.exists(self.credentials_path):
-                print(f"WARNING: Google credentials not found at {self.credentials_path}")
+        """Load credentials and build the API clients (runs once, on first use)."""
+        with self._clients_lock:
+            if self._clients_loaded:
                 return
+            try:
+                if not os.path.exists(self.credentials_path):
+                    print(f"WARNING: Google credentials not found at {self.credentials_path}")
+                    self._clients_loaded = True
+                    return
 
-            credentials = service_account.Credentials.from_service_account_file(
-                self.credentials_path,
-                scopes=[
-                    'https://www.googleapis.com/auth/spreadsheets',
-                    'https://www.googleapis.com/auth/calendar'
-                ]
+                from google.oauth2 import service_account
+                from googleapiclient.discovery import build
+
+                credentials = service_account.Credentials.from_service_account_file(
+                    self.credentials_path,
+                    scopes=[
+                        'https://www.googleapis.com/auth/spreadsheets',
+                        'https://www.googleapis.com/auth/calendar'
+                    ]
+                )
+
+                # static_discovery: use the bundled discovery documents, never fetch them
+                self._sheets = build('sheets', 'v4', credentials=credentials, static_discovery=True)
+                self._calendar = build('calendar', 'v3', credentials=credentials, static_discovery=True)
+                self.credentials = credentials
+                self._clients_loaded = True
+                print("Google services initialized successfully")
+
+            except Exception as e:
+                # Not marked loaded: the next use tries again
+                print(f"Error initializing Google services: {str(e)}")
+
+    @property
+    def sheets(self) -> Any:
+        """Sheets v4 client, built on first access (None without credentials)."""
+        if not self._clients_loaded:
+            self._initialize_services()
+        return self._sheets
+
+    @property
+    def calendar(self) -> Any:
+        """Calendar v3 client, built on first access (None without credentials)."""
+        if not self._clients_loaded:
+            self._initialize_services()
+        return self._calendar
+
+    async def _clients_ready(self) -> bool:
+        """Build the clients on the Google thread pool if needed; True when usable."""
+        if not self._clients_loaded:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._initialize_services)
+        return self._sheets is not None and self._calendar is not None
+
+    # ============= Request Execution =============
+
+    def _thread_http(self) -> Any:
+        """Authorized connection for the current pool thread (httplib2 is not thread-safe)."""
+        http = getattr(self._thread_local, "http", None)
+        if http is None:
+            import google_auth_httplib2
+            import httplib2
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials,
+                http=httplib2.Http(timeout=self.request_timeout)
             )
+            self._thread_local.http = http
+        return http
+
+    async def _execute(self, request: Any, timeout: Optional[float] = None) -> Any:
+        """Run a googleapiclient request on the Google thread pool.
+
+        Raises asyncio.TimeoutError after timeout seconds; the socket
+        timeout also frees the pool thread.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._executor,
+            lambda: request.execute(http=self._thread_http())
+        )
+        with track_request("google", getattr(request, "methodId", None) or "unknown"):
+            return await asyncio.wait_for(future, timeout or self.request_timeout)
+
+    async def _append_rows(self, rows: List[List[Any]]) -> None:
+        """Append rows to the appointments sheet in one request (used by the queue)."""
+        if not await self._clients_ready():
+            raise RuntimeError("Google Sheets not initialized")
+
+        await self._execute(self.sheets.spreadsheets().values().append(
+            spreadsheetId=self.sheet_id,
+            range='Citas!A:H',
+            valueInputOption='USER_ENTERED',
+            insertDataOption='INSERT_ROWS',
+            body={'values': rows}
+        ))
+
+    def close(self) -> None:
+        """Stop the Google thread pool and close the local databases."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.sheets_queue.close()
+        self.ledger.close()
+
+    # ============= Availability =============
+
+    def _event_bounds(self, event: Dict[str, Any]) -> Optional[Tuple[datetime, datetime]]:
+        """Local naive start/end of a Calendar event; all-day events block whole days."""
+        start, end = event.get("start", {}), event.get("end", {})
+        if "dateTime" in start and "dateTime" in end:
+            return (
+                datetime.fromisoformat(start["dateTime"]).astimezone(TIMEZONE).replace(tzinfo=None),
+                datetime.fromisoformat(end["dateTime"]).astimezone(TIMEZONE).replace(tzinfo=None)
+            )
+        if "date" in start and "date" in end:
+            return (
+                datetime.fromisoformat(start["date"]),
+                datetime.fromisoformat(end["date"])
+            )
+        return None
+
+    async def sync_availability(self) -> int:
+        """Reload booked slots for the next availability_sync_days from Calendar."""
+        if not await self._clients_ready():
+            return 0
+
+        now = local_now()
+        time_min = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        time_max = time_min + timedelta(days=self.availability_sync_days)
+
+        events = []
+        page_token = None
+        while True:
+            response = await self._execute(self.calendar.events().list(
+                calendarId=self.calendar_id,
+                timeMin=time_min.isoformat(),
+                timeMax=time_max.isoformat(),
+                singleEvents=True,
+                showDeleted=False,
+                maxResults=2500,
+                pageToken=page_token
+            ))
+            for event in response.get("items", []):
+                if event.get("status") == "cancelled" or event.get("transparency") == "transparent":
+                    continue
+                bounds = self._event_bounds(event)
+                if bounds:
+                    events.append((event["id"], *bounds))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+
+        async with self._booking_lock:
+            self.availability.replace_all(events)
+            # Bookings not on the Calendar yet (or made while listing) still hold their slot
+            await self._apply_ledger_bookings()
+
+        print(f"Availability synced: {len(self.availability)} booked slot(s)")
+        return len(events)
+
+    async def _apply_ledger_bookings(self) -> None:
+        """Mark every active appointment in the sync window as busy."""
+        today = local_now().date()
+        last_day = today + timedelta(days=self.availability_sync_days)
+        appointments = await asyncio.to_thread(self.ledger.active_between, today.isoformat(), last_day.isoformat())
+        for appointment in appointments:
+            start = datetime.fromisoformat(f"{appointment['date']}T{appointment['time']}")
+            # Calendar events created by the bot share the booking id
+            self.availability.add(appointment["id"], start, start + APPOINTMENT_DURATION)
 
-            self.sheets = build('sheets', 'v4', credentials=credentials)
-            self.calendar = build('calendar', 'v3', credentials=credentials)
-            print("Google services initialized successfully")
+    async def watch_availability(self, interval: float) -> None:
+        """Resync booked slots periodically to pick up events made outside the bot."""
+        await self._apply_ledger_bookings()
+        while True:
+            try:
+                await self.sync_availability()
+            except Exception as e:
+                print(f"Error syncing availability: {str(e) or type(e).__name__}")
+            await asyncio.sleep(interval)
 
-        except Exception as e:
-            print(f"Error initializing Google services: {str(e)}")
+    def is_slot_free(self, fecha: str, hora: str) -> bool:
+        """Check whether a 1-hour appointment at fecha (YYYY-MM-DD) hora (HH:MM) is free."""
+        start = datetime.fromisoformat(f"{fecha}T{hora}")
+        return self.availability.is_free(start, start + APPOINTMENT_DURATION)
 
-    async def registrar_cita(self, datos: Dict[str, str]) -> Dict[str, Any]:
-        """Register an appointment in Google Sheets and Calendar."""
-        name = datos.get("name", "")
-        company = datos.get("company", "")
-        service = datos.get("service", "")
-        email = datos.get("email", "")
-        phone = datos.get("phone", "")
+    def get_free_slots(self, count: int = 5, after: Optional[datetime] = None) -> List[Tuple[datetime, datetime]]:
+        """Next free appointment slots in business hours (after defaults to now)."""
+        after = after or local_now()
+        if after.tzinfo is not None:
+            after = after.astimezone(TIMEZONE).replace(tzinfo=None)
+        return self.availability.next_free_slots(
+            after,
+            count,
+            APPOINTMENT_DURATION,
+            max_days=self.availability_sync_days
+        )
+
+    # ============= Appointments =============
+
+    async def registrar_cita(
+        self,
+        datos: Dict[str, str],
+        booking_id: Optional[str] = None,
+        tenant_id: str = DEFAULT_TENANT_ID
+    ) -> Dict[str, Any]:
+        """Book an appointment.
+
+        The booking is written to the local ledger first; Sheets and
+        Calendar are updated right away when possible and otherwise
+        retried by the reconciler. Booking the same slot again for the
+        same phone (or with the same booking_id) returns the existing
+        appointment. Reminders are sent from the tenant's WhatsApp number.
+        """
         fecha = datos.get("date", "")
         hora = datos.get("time", "")
 
         try:
-            print("Registering in Google Sheets...")
-
-            if not self.sheets or not self.calendar:
-                return {"success": False, "error": "Google services not initialized"}
-
-            # 1. Register in Google Sheets
-            now = datetime.now().strftime("%d/%m/%Y %H:%M")
-
-            self.sheets.spreadsheets().values().append(
-                spreadsheetId=self.sheet_id,
-                range='Citas!A:H',
-                valueInputOption='USER_ENTERED',
-                body={
-                    'values': [[
-                        now,
-                        name,
-                        company,
-                        email,
-                        phone,
-                        service,
-                        fecha,
-                        hora
-                    ]]
-                }
-            ).execute()
-
-            print("Registered in Sheets")
-            print("Creating Calendar event...")
-
-            # 2. Create calendar event
             year, month, day = map(int, fecha.split('-'))
             hours, minutes = map(int, hora.split(':'))
 
             start_datetime = datetime(year, month, day, hours, minutes)
-            end_datetime = start_datetime + timedelta(hours=1)
+            end_datetime = start_datetime + APPOINTMENT_DURATION
 
-            event = self.calendar.events().insert(
-                calendarId=self.calendar_id,
-                body={
-                    'summary': f'Consulta Karuna: {service}',
-                    'description': '\n'.join([
-                        f'Cliente: {name}',
-                        f'Empresa: {company}',
-                        f'Email: {email}',
-                        f'Telefono: {phone}',
-                        f'Servicio: {service}',
-                        '',
-                        f'Link de videollamada: {self.meet_link}',
-                        '',
-                        'Cita agendada via WhatsApp Bot'
-                    ]),
-                    'location': self.meet_link,
-                    'start': {
-                        'dateTime': start_datetime.isoformat(),
-                        'timeZone': 'America/Mexico_City'
-                    },
-                    'end': {
-                        'dateTime': end_datetime.isoformat(),
-                        'timeZone': 'America/Mexico_City'
-                    },
-                    'reminders': {
-                        'useDefault': False,
-                        'overrides': [
-                            {'method': 'popup', 'minutes': 30}
-                        ]
-                    }
-                }
-            ).execute()
-
-            print("Calendar event created")
-            print(f"Meet link: {self.meet_link}")
+            booking_id = booking_id or booking_id_for(datos.get("phone", ""), fecha, hora)
+            async with self._booking_lock:
+                appointment = await asyncio.to_thread(self.ledger.get, booking_id)
+                created = False
+                if appointment is not None:
+                    print(f"Appointment {booking_id} already booked, returning it")
+                else:
+                    # Reject double bookings before recording anything
+                    if not self.availability.is_free(start_datetime, end_datetime):
+                        print(f"Slot {fecha} {hora} is already booked")
+                        return {"success": False, "error": "Slot already booked", "slot_taken": True}
+
+                    appointment, created = await asyncio.to_thread(self.ledger.create, datos, booking_id)
+                    if created:
+                        print(f"Appointment {booking_id} recorded for {fecha} {hora}")
+                        self.availability.add(booking_id, start_datetime, end_datetime)
+
+            if created:
+                await reminder_scheduler.schedule(appointment, tenant_id)
+                appointment = await self._sync_appointment(appointment)
 
             # Format date for response
             formatted_date = start_datetime.strftime("%A, %d de %B de %Y a las %H:%M")
 
             return {
                 "success": True,
-                "event_id": event.get("id"),
+                "booking_id": appointment["id"],
+                "status": appointment["status"],
+                "event_id": appointment["event_id"],
                 "meet_link": self.meet_link,
-                "html_link": event.get("htmlLink"),
+                "html_link": appointment["html_link"],
                 "start_datetime": formatted_date
             }
 
         except Exception as error:
-            print(f"Error registering appointment: {str(error)}")
+            error_message = str(error) or type(error).__name__
+            print(f"Error registering appointment: {error_message}")
             return {
                 "success": False,
-                "error": str(error)
+                "error": error_message
+            }
+
+    # ============= Reconciliation =============
+
+    def _sheet_row(self, appointment: Dict[str, Any]) -> List[Any]:
+        created = datetime.fromisoformat(appointment["created_at"]).strftime("%d/%m/%Y %H:%M")
+        return [
+            created,
+            appointment["name"],
+            appointment["company"],
+            appointment["email"],
+            appointment["phone"],
+            appointment["service"],
+            appointment["date"],
+            appointment["time"]
+        ]
+
+    def _event_body(self, appointment: Dict[str, Any]) -> Dict[str, Any]:
+        start_datetime = datetime.fromisoformat(f"{appointment['date']}T{appointment['time']}")
+        end_datetime = start_datetime + APPOINTMENT_DURATION
+        service = appointment["service"]
+        return {
+            # Client-supplied id: a retried insert cannot create a second event
+            'id': calendar_event_id(appointment["id"]),
+            'summary': f'Consulta Karuna: {service}',
+            'description': '\n'.join([
+                f'Cliente: {appointment["name"]}',
+                f'Empresa: {appointment["company"]}',
+                f'Email: {appointment["email"]}',
+                f'Telefono: {appointment["phone"]}',
+                f'Servicio: {service}',
+                '',
+                f'Link de videollamada: {self.meet_link}',
+                '',
+                'Cita agendada via WhatsApp Bot'
+            ]),
+            'location': self.meet_link,
+            'start': {
+                'dateTime': start_datetime.isoformat(),
+                'timeZone': 'America/Mexico_City'
+            },
+            'end': {
+                'dateTime': end_datetime.isoformat(),
+                'timeZone': 'America/Mexico_City'
+            },
+            'reminders': {
+                'useDefault': False,
+                'overrides': [
+                    {'method': 'popup', 'minutes': 30}
+                ]
             }
+        }
+
+    async def _insert_event(self, appointment: Dict[str, Any]) -> Dict[str, Any]:
+        """Create the Calendar event, or fetch it if an earlier attempt already did."""
+        try:
+            return await self._execute(self.calendar.events().insert(
+                calendarId=self.calendar_id,
+                body=self._event_body(appointment)
+            ))
+        except Exception as error:
+            if getattr(getattr(error, "resp", None), "status", None) != 409:
+                raise
+            return await self._execute(self.calendar.events().get(
+                calendarId=self.calendar_id,
+                eventId=calendar_event_id(appointment["id"])
+            ))
+
+    async def _sync_appointment(self, appointment: Dict[str, Any]) -> Dict[str, Any]:
+        """Push one appointment to Sheets and Calendar; failures are scheduled for retry."""
+        booking_id = appointment["id"]
+        try:
+            if appointment["sheets_status"] == SYNC_PENDING:
+                # Appended to the sheet in the background by the write-behind queue
+                await self.sheets_queue.enqueue(self._sheet_row(appointment))
+                await asyncio.to_thread(self.ledger.mark_sheets_done, booking_id)
+                print("Queued for Google Sheets")
+
+            if appointment["calendar_status"] == SYNC_PENDING:
+                if not await self._clients_ready():
+                    raise RuntimeError("Google services not initialized")
+                print("Creating Calendar event...")
+                event = await self._insert_event(appointment)
+                await asyncio.to_thread(
+                    self.ledger.mark_calendar_done, booking_id, event.get("id"), event.get("htmlLink")
+                )
+                print("Calendar event created")
+                print(f"Meet link: {self.meet_link}")
+
+        except Exception as error:
+            error_message = str(error) or type(error).__name__
+            if _is_permanent(error) or appointment["attempts"] + 1 >= self.max_sync_attempts:
+                await asyncio.to_thread(self.ledger.mark_abandoned, booking_id, error_message)
+                print(f"Giving up syncing appointment {booking_id} after "
+                      f"{appointment['attempts'] + 1} attempt(s): {error_message}")
+            else:
+                retry_in = min(RETRY_BASE_SECONDS * 2 ** appointment["attempts"], RETRY_MAX_SECONDS)
+                await asyncio.to_thread(self.ledger.mark_failed, booking_id, error_message, retry_in)
+                print(f"Error syncing appointment {booking_id}, retrying in {retry_in}s: {error_message}")
+
+        return await asyncio.to_thread(self.ledger.get, booking_id)
+
+    async def reconcile(self) -> int:
+        """Retry every appointment whose Sheets row or Calendar event is still missing."""
+        due = await asyncio.to_thread(self.ledger.due_for_sync)
+        for appointment in due:
+            await self._sync_appointment(appointment)
+        return len(due)
+
+    async def run_reconciler(self, interval: float) -> None:
+        """Reconcile the ledger with Sheets and Calendar until cancelled."""
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                print(f"Error reconciling appointments: {e}")
+            await asyncio.sleep(interval)
 
     def generar_ics(self, datos: Dict[str, str]) -> str:
-        """Generate ICS calendar file content."""
-        name = datos.get("name", "")
-        company = datos.get("company", "")
-        service = datos.get("service", "")
-        email = datos.get("email", "")
-        fecha = datos.get("date", "")
-        hora = datos.get("time", "")
+        """Generate ICS calendar file content (an invitation for one appointment).
 
-        year, month, day = map(int, fecha.split('-'))
-        hours, minutes = map(int, hora.split(':'))
-
-        start_datetime = datetime(year, month, day, hours, minutes)
-        end_datetime = start_datetime + timedelta(hours=1)
-
-        def format_date(dt: datetime) -> str:
-            return dt.strftime("%Y%m%dT%H%M%SZ")
-
-        now = datetime.utcnow()
-
-        return f"""BEGIN:VCALENDAR
-VERSION:2.0
-PRODID:-//Karuna//WhatsApp Bot//ES
-CALSCALE:GREGORIAN
-METHOD:REQUEST
-BEGIN:VEVENT
-UID:karuna-{int(now.timestamp())}@karuna.es.com
-DTSTAMP:{format_date(now)}
-DTSTART:{format_date(start_datetime)}
-DTEND:{format_date(end_datetime)}
-SUMMARY:Consulta Karuna: {service}
-DESCRIPTION:Cliente: {name}\\nEmpresa: {company}\\nServicio: {service}\\nEmail: {email}\\n\\nLink de videollamada: {self.meet_link}
-LOCATION:{self.meet_link}
-STATUS:CONFIRMED
-SEQUENCE:0
-ORGANIZER;CN=Karuna:mailto:{self.karuna_email}
-ATTENDEE;CN={name};RSVP=TRUE:mailto:{email}
-END:VEVENT
-END:VCALENDAR"""
+        The UID is the booking id, so re-sending an invitation updates
+        the same event instead of adding another.
+        """
+        appointment = {
+            **datos,
+            "id": datos.get("booking_id") or booking_id_for(
+                datos.get("phone", ""),
+                datos.get("date", ""),
+                datos.get("time", "")
+            )
+        }
+        return (
+            calendar_header("REQUEST")
+            + render_event(appointment, self.meet_link, self.karuna_email, datetime.now(timezone.utc))
+            + CALENDAR_FOOTER
+        )
 
 
 # Singleton instance
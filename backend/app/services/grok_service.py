@@ -1,14 +1,23 @@
 """Grok AI service for generating responses."""
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from openai import AsyncOpenAI
 from ..config import get_settings
 from .config_service import config_service
+from .conversation_state import ConversationState, ConversationStore, conversation_store
+from .metrics import track_request
+
+if TYPE_CHECKING:
+    from .tenants import Tenant
 
 
 class GrokService:
-    """Service for interacting with Grok AI API."""
+    """Service for interacting with Grok AI API.
+
+    Conversation history and menu state live in a ConversationStore
+    (process memory, or Redis when several workers share the load).
+    """
 
-    def __init__(self):
+    def __init__(self, state: Optional[ConversationStore] = None):
         settings = get_settings()
         print("Initializing GrokService...")
         print(f"API Key present: {bool(settings.xai_api_key)}")
@@ -19,8 +28,15 @@ class GrokService:
         ) if settings.xai_api_key else None
 
         self.system_prompt = config_service.get_system_prompt()
-        self.conversations: Dict[str, List[Dict[str, str]]] = {}
-        self.user_menu_state: Dict[str, bool] = {}
+        # Composed prompt per (tenant, number) with overrides, and base prompt per tenant,
+        # valid for one (system prompt, config revision)
+        self._user_prompts: Dict[Tuple[str, str], str] = {}
+        self._tenant_prompts: Dict[str, str] = {}
+        self._user_prompts_key: Optional[Tuple[str, int]] = None
+        self.state = state or conversation_store
+        self.max_messages = settings.conversation_max_messages
+
+        config_service.add_listener(self._on_config_change)
 
         if self.client:
             print("GrokService initialized successfully")
@@ -32,13 +48,58 @@ class GrokService:
         self.system_prompt = new_prompt
         print("System prompt updated in GrokService")
 
-    def should_show_menu(self, user_id: str) -> bool:
-        """Check if menu should be shown to user."""
-        current_flow = config_service.get_current_flow()
+    def _on_config_change(self, version: int) -> None:
+        """Pick up a prompt changed by another worker."""
+        self.system_prompt = config_service.get_system_prompt()
+        print(f"System prompt refreshed from config version {version}")
+
+    def _flow_for(self, tenant: Optional["Tenant"]) -> str:
+        """The tenant's own flow, else the globally active one."""
+        if tenant is not None and tenant.flow:
+            return tenant.flow
+        return config_service.get_current_flow()
+
+    def _base_prompt(self, tenant: Optional["Tenant"]) -> str:
+        """Prompt before user overrides: the tenant's prompt or flow, else the global prompt."""
+        if tenant is not None and (tenant.system_prompt or tenant.flow):
+            prompt = self._tenant_prompts.get(tenant.id)
+            if prompt is None:
+                flow_data = config_service.get_flow_data(tenant.flow) if tenant.flow else None
+                prompt = tenant.system_prompt or (flow_data or {}).get("prompt") or self.system_prompt
+                self._tenant_prompts[tenant.id] = prompt
+            return prompt
+        return self.system_prompt or config_service.get_system_prompt()
+
+    def prompt_for(self, user_id: str, tenant: Optional["Tenant"] = None) -> str:
+        """System prompt for one user: the flow prompt plus their custom instructions, if any."""
+        key = (self.system_prompt, config_service.get_config_revision())
+        if key != self._user_prompts_key:
+            self._user_prompts = {}
+            self._tenant_prompts = {}
+            self._user_prompts_key = key
+        base = self._base_prompt(tenant)
+
+        cache_key = (tenant.id if tenant is not None else "", user_id)
+        prompt = self._user_prompts.get(cache_key)
+        if prompt is None:
+            override = config_service.get_user_config(user_id)
+            if not override or not (override.get("custom_prompt") or override.get("name")):
+                return base
+            prompt = base
+            if override.get("name"):
+                prompt += f"\n\nEl usuario se llama {override['name']}."
+            if override.get("custom_prompt"):
+                prompt += f"\n\nINSTRUCCIONES ESPECIFICAS PARA ESTE USUARIO:\n{override['custom_prompt']}"
+            self._user_prompts[cache_key] = prompt
+        return prompt
+
+    def should_show_menu(self, state: ConversationState, flow_id: Optional[str] = None) -> bool:
+        """Check if menu should be shown to user (never shown to them before)."""
+        current_flow = flow_id or config_service.get_current_flow()
         flow_data = config_service.get_flow_data(current_flow)
 
         if flow_data and flow_data.get("has_menu") and flow_data.get("menu_config"):
-            if user_id not in self.user_menu_state:
+            if state.menu_shown is None:
                 return True
         return False
 
@@ -71,8 +132,12 @@ class GrokService:
         except ValueError:
             return None
 
-    async def get_response(self, user_id: str, user_message: str) -> str:
-        """Get AI response for user message."""
+    async def get_response(self, user_id: str, user_message: str, tenant: Optional["Tenant"] = None) -> str:
+        """Get AI response for user message.
+
+        With a tenant, its flow and prompt are used and the conversation
+        is kept separately from the same user's chats with other numbers.
+        """
         print(f"\nNew request to Grok:")
         print(f"  User: {user_id}")
         print(f"  Message: {user_message}")
@@ -80,85 +145,96 @@ class GrokService:
         if not self.client:
             return "Lo siento, el servicio de IA no esta configurado correctamente."
 
+        key = tenant.conversation_key(user_id) if tenant is not None else user_id
+        current_flow = self._flow_for(tenant)
+        pending: List[Dict[str, str]] = []
         try:
+            # History and menu state in one read
+            state = await self.state.load(key)
+
             # Check if we should show menu
-            if self.should_show_menu(user_id):
-                current_flow = config_service.get_current_flow()
+            if self.should_show_menu(state, current_flow):
                 menu_config = config_service.get_menu_for_flow(current_flow)
 
                 if menu_config:
-                    self.user_menu_state[user_id] = True
+                    await self.state.set_menu_shown(key, True)
                     return self.build_menu_message(menu_config)
 
             # Check if this is a menu selection
-            current_flow = config_service.get_current_flow()
             flow_data = config_service.get_flow_data(current_flow)
 
             if flow_data and flow_data.get("has_menu") and flow_data.get("menu_config"):
                 menu_response = self.handle_menu_selection(
-                    user_id, user_message, flow_data["menu_config"]
+                    key, user_message, flow_data["menu_config"]
                 )
                 if menu_response:
                     print("  Menu response selected")
                     return menu_response
 
             # Normal AI response
-            if user_id not in self.conversations:
-                self.conversations[user_id] = []
+            if not state.history:
                 print("  New conversation created")
 
-            self.conversations[user_id].append({
+            pending.append({
                 "role": "user",
                 "content": user_message
             })
 
             # Keep last 20 messages
-            if len(self.conversations[user_id]) > 20:
-                self.conversations[user_id] = self.conversations[user_id][-20:]
-                print("  History trimmed to 20 messages")
+            context = (state.history + pending)[-self.max_messages:]
 
             print("  Sending to Grok API...")
             print("  Model: grok-4-fast-reasoning")
-            print(f"  Messages in context: {len(self.conversations[user_id])}")
-
-            current_prompt = self.system_prompt or config_service.get_system_prompt()
-
-            completion = await self.client.chat.completions.create(
-                model="grok-4-fast-reasoning",
-                messages=[
-                    {"role": "system", "content": current_prompt},
-                    *self.conversations[user_id]
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
+            print(f"  Messages in context: {len(context)}")
+
+            current_prompt = self.prompt_for(user_id, tenant)
+
+            with track_request("xai", "chat_reply"):
+                completion = await self.client.chat.completions.create(
+                    model="grok-4-fast-reasoning",
+                    messages=[
+                        {"role": "system", "content": current_prompt},
+                        *context
+                    ],
+                    temperature=0.7,
+                    max_tokens=1000
+                )
 
             print("  Response received from Grok")
 
             assistant_message = completion.choices[0].message.content
             print(f"  Response: {assistant_message[:100]}...")
 
-            self.conversations[user_id].append({
+            pending.append({
                 "role": "assistant",
                 "content": assistant_message
             })
+            # User message and reply in one write
+            await self.state.append(key, pending)
+            pending = []
 
             return assistant_message
 
         except Exception as error:
             print(f"\nERROR IN GROK API:")
             print(f"  Message: {str(error)}")
+            # Keep the user's message in the history, as before
+            if pending:
+                await self.state.append(key, pending[:1])
             return "Disculpa, hubo un error tecnico. Puedes intentar de nuevo?"
 
-    def clear_conversation(self, user_id: str) -> None:
+    async def clear_conversation(self, user_id: str) -> None:
         """Clear conversation history for a user."""
-        self.conversations[user_id] = []
-        self.user_menu_state[user_id] = False
+        await self.state.clear(user_id)
         print(f"Conversation reset for: {user_id}")
 
-    def get_conversation_history(self, user_id: str) -> List[Dict[str, str]]:
+    async def get_conversation_history(self, user_id: str) -> List[Dict[str, str]]:
         """Get conversation history for a user."""
-        return self.conversations.get(user_id, [])
+        return (await self.state.load(user_id)).history
+
+    def conversation_count(self) -> int:
+        """Conversations held in this worker's memory."""
+        return self.state.local_count()
 
 
 # Singleton instance
@@ -0,0 +1,143 @@
+"""iCalendar (RFC 5545) rendering for appointments."""
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from .appointment_ledger import APPOINTMENT_DURATION
+from .local_date_parser import TIMEZONE
+
+PRODID = "-//Karuna//WhatsApp Bot//ES"
+UID_DOMAIN = "karuna.es.com"
+
+# One address, nothing that could end the line or the property (CR/LF, ';', ':', ',', quotes)
+_EMAIL = re.compile(r'[^\s\x00-\x1f\x7f;:,"<>@]+@[^\s\x00-\x1f\x7f;:,"<>@]+')
+
+# Ledger status -> iCalendar STATUS
+EVENT_STATUS = {
+    "pending": "TENTATIVE",
+    "confirmed": "CONFIRMED",
+    "cancelled": "CANCELLED"
+}
+
+
+def escape_text(value: Any) -> str:
+    """Escape a TEXT value: backslash, semicolon, comma and newlines."""
+    text = str(value or "")
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+        .replace("\r", "\\n")
+    )
+
+
+def escape_param(value: Any) -> str:
+    """Parameter values (e.g. CN=) cannot be escaped; quote them and drop quotes."""
+    text = str(value or "").replace('"', "").replace("\r", " ").replace("\n", " ")
+    return f'"{text}"' if any(c in text for c in ";:,") else text
+
+
+def mailto(email: Any) -> Optional[str]:
+    """CAL-ADDRESS for an email, or None if it is not a plain address."""
+    email = str(email or "").strip()
+    return f"mailto:{email}" if _EMAIL.fullmatch(email) else None
+
+
+def fold(line: str) -> str:
+    """Fold a content line at 75 octets, without splitting UTF-8 sequences."""
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+
+    parts, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        # Continuation lines start with a space, which counts toward the limit
+        if size + width > (75 if not parts else 74):
+            parts.append(current)
+            current, size = "", 0
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def format_utc(dt: datetime) -> str:
+    """UTC timestamp; naive values are taken as America/Mexico_City local time."""
+    if dt.tzinfo is None:
+        dt = TIMEZONE.localize(dt)
+    return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def event_uid(booking_id: str) -> str:
+    """Stable UID: one per booking, unchanged across exports."""
+    return f"{booking_id}@{UID_DOMAIN}"
+
+
+def calendar_header(method: str = "PUBLISH", name: Optional[str] = None) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        f"METHOD:{method}"
+    ]
+    if name:
+        lines.append(f"X-WR-CALNAME:{escape_text(name)}")
+        lines.append("X-WR-TIMEZONE:America/Mexico_City")
+    return "".join(fold(line) for line in lines)
+
+
+CALENDAR_FOOTER = "END:VCALENDAR\r\n"
+
+
+def render_event(
+    appointment: Dict[str, Any],
+    meet_link: str,
+    organizer_email: str,
+    dtstamp: Optional[datetime] = None
+) -> str:
+    """One VEVENT for a ledger appointment (or booking data with an ``id``)."""
+    start = datetime.fromisoformat(f"{appointment['date']}T{appointment['time']}")
+    end = start + APPOINTMENT_DURATION
+    updated = appointment.get("updated_at")
+    modified = datetime.fromisoformat(updated).astimezone(timezone.utc) if updated else None
+    # DTSTAMP follows the record, so unchanged appointments render identically
+    stamp = dtstamp or modified or datetime.now(timezone.utc)
+
+    name = appointment.get("name", "")
+    email = appointment.get("email", "")
+    service = appointment.get("service", "")
+    description = "\n".join([
+        f"Cliente: {name}",
+        f"Empresa: {appointment.get('company', '')}",
+        f"Servicio: {service}",
+        f"Email: {email}",
+        "",
+        f"Link de videollamada: {meet_link}"
+    ])
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{escape_text(event_uid(appointment['id']))}",
+        f"DTSTAMP:{format_utc(stamp)}",
+        f"DTSTART:{format_utc(start)}",
+        f"DTEND:{format_utc(end)}",
+        f"SUMMARY:{escape_text(f'Consulta Karuna: {service}')}",
+        f"DESCRIPTION:{escape_text(description)}",
+        f"LOCATION:{escape_text(meet_link)}",
+        f"STATUS:{EVENT_STATUS.get(appointment.get('status', 'confirmed'), 'CONFIRMED')}",
+        "SEQUENCE:0"
+    ]
+    if modified:
+        lines.append(f"LAST-MODIFIED:{format_utc(modified)}")
+    # Emails are user input: one that is not a plain address is left out
+    organizer = mailto(organizer_email)
+    if organizer:
+        lines.append(f"ORGANIZER;CN=Karuna:{organizer}")
+    attendee = mailto(email)
+    if attendee:
+        lines.append(f"ATTENDEE;CN={escape_param(name)};RSVP=TRUE:{attendee}")
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
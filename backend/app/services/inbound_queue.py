@@ -0,0 +1,204 @@
+"""Durable queue of inbound webhook payloads between the web process and workers."""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from ..config import get_settings
+
+
+class QueuedMessage(NamedTuple):
+    id: int
+    body: Dict[str, Any]
+    received_at: float
+    attempts: int
+
+
+def payload_message_id(body: Dict[str, Any]) -> Optional[str]:
+    """First wamid in a webhook payload, used to drop Meta's redeliveries."""
+    try:
+        return body["entry"][0]["changes"][0]["value"]["messages"][0]["id"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+class InboundQueue:
+    """Webhook payloads stored in SQLite until a worker has processed them.
+
+    enqueue() commits the raw payload and returns; the webhook can
+    answer Meta at once. claim() leases the oldest visible rows to one
+    consumer for visibility_timeout seconds and ack() deletes them
+    when done. A consumer that dies mid-message simply lets its lease
+    expire and the row is claimed again, so delivery is at-least-once.
+    After max_attempts claims a row is left in place as dead instead of
+    being retried forever. Several processes can share one file:
+    claims run in an IMMEDIATE transaction. Every commit is fsynced, so
+    callers on the event loop run these methods in a thread
+    (asyncio.to_thread); the connection is shared under a lock.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT UNIQUE,
+            body TEXT NOT NULL,
+            received_at REAL NOT NULL,
+            visible_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_owner TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_visible ON messages (visible_at, id);
+    """
+
+    def __init__(self, db_path: str, visibility_timeout: float = 120.0, max_attempts: int = 5):
+        self.db_path = db_path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.consumer_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # The 200 already went to Meta: a queued payload is the only copy
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self.SCHEMA)
+        self.stats = {"enqueued": 0, "duplicates": 0, "claimed": 0, "acked": 0, "expired_leases": 0}
+
+    def enqueue(self, body: Dict[str, Any], received_at: Optional[float] = None,
+                lease: bool = False) -> Optional[int]:
+        """Store a payload; None if the same message is already queued.
+
+        With lease the message is stored already claimed by this
+        consumer, for a caller that processes it right away.
+        """
+        received_at = received_at or time.time()
+        if lease:
+            visible_at, attempts, owner = received_at + self.visibility_timeout, 1, self.consumer_id
+        else:
+            visible_at, attempts, owner = received_at, 0, None
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO messages (message_id, body, received_at, visible_at, attempts, lease_owner) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (payload_message_id(body), json.dumps(body, ensure_ascii=False), received_at, visible_at, attempts,
+                 owner)
+            )
+        if not cursor.rowcount:
+            self.stats["duplicates"] += 1
+            return None
+        self.stats["enqueued"] += 1
+        return cursor.lastrowid
+
+    def claim(self, limit: int) -> List[QueuedMessage]:
+        """Lease up to limit visible messages to this consumer, oldest first."""
+        now = time.time()
+        with self._lock:
+            # Idle polls stay read-only; the write lock is taken only when there is work
+            if self._conn.execute(
+                "SELECT 1 FROM messages WHERE visible_at <= ? AND attempts < ? LIMIT 1",
+                (now, self.max_attempts)
+            ).fetchone() is None:
+                return []
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, body, received_at, attempts, lease_owner FROM messages "
+                    "WHERE visible_at <= ? AND attempts < ? ORDER BY id LIMIT ?",
+                    (now, self.max_attempts, limit)
+                ).fetchall()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE messages SET visible_at = ?, attempts = attempts + 1, lease_owner = ? WHERE id = ?",
+                        [(now + self.visibility_timeout, self.consumer_id, row[0]) for row in rows]
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        self.stats["claimed"] += len(rows)
+        self.stats["expired_leases"] += sum(1 for row in rows if row[4] is not None)
+        return [QueuedMessage(row[0], json.loads(row[1]), row[2], row[3] + 1) for row in rows]
+
+    def ack(self, queue_id: int) -> None:
+        """Processing finished: remove the message."""
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE id = ?", (queue_id,))
+        self.stats["acked"] += 1
+
+    def extend(self, queue_ids: List[int]) -> None:
+        """Renew this consumer's leases on messages still being processed."""
+        if not queue_ids:
+            return
+        visible_at = time.time() + self.visibility_timeout
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE messages SET visible_at = ? WHERE id = ? AND lease_owner = ?",
+                [(visible_at, queue_id, self.consumer_id) for queue_id in queue_ids]
+            )
+
+    def release(self, queue_ids: List[int]) -> None:
+        """Give leases back so another consumer can claim the messages now."""
+        if not queue_ids:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE messages SET visible_at = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL "
+                "WHERE id = ? AND lease_owner = ?",
+                [(time.time(), queue_id, self.consumer_id) for queue_id in queue_ids]
+            )
+
+    def pending(self) -> int:
+        """Messages waiting for or in processing (dead ones excluded)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE attempts < ? OR visible_at > ?",
+                (self.max_attempts, time.time())
+            ).fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters since startup plus the current backlog."""
+        now = time.time()
+        with self._lock:
+            waiting, in_flight, dead, oldest = self._conn.execute(
+                "SELECT "
+                "SUM(visible_at <= ? AND attempts < ?), "
+                "SUM(visible_at > ?), "
+                "SUM(visible_at <= ? AND attempts >= ?), "
+                "MIN(CASE WHEN attempts < ? OR visible_at > ? THEN received_at END) "
+                "FROM messages",
+                (now, self.max_attempts, now, now, self.max_attempts, self.max_attempts, now)
+            ).fetchone()
+        return {
+            **self.stats,
+            "waiting": waiting or 0,
+            "in_flight": in_flight or 0,
+            "dead": dead or 0,
+            "oldest_age": now - oldest if oldest else 0.0
+        }
+
+    def close(self) -> None:
+        """Close the database connection; queued messages stay on disk."""
+        with self._lock:
+            self._conn.close()
+
+
+def _create_queue() -> InboundQueue:
+    settings = get_settings()
+    return InboundQueue(
+        settings.inbound_queue_path,
+        settings.inbound_visibility_timeout_ms / 1000,
+        settings.inbound_max_attempts
+    )
+
+
+# Singleton instance
+inbound_queue = _create_queue()
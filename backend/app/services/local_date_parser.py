@@ -0,0 +1,300 @@
+"""Deterministic parser for common Spanish date/time expressions.
+
+Handles the phrasing users actually type when booking ("manana a las 3",
+"el proximo viernes a las 10 am", "dentro de 3 dias a las 2",
+"15/11 a las 16:30") without an LLM round trip. Anything it is not sure
+about gets a low confidence so the caller can fall back to Grok.
+"""
+import re
+import unicodedata
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+import pytz
+
+TIMEZONE = pytz.timezone("America/Mexico_City")
+
+# Results below this confidence should be resolved by the LLM instead
+CONFIDENCE_THRESHOLD = 0.8
+
+WEEKDAY_NAMES = ["lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo"]
+WEEKDAYS = {name: i for i, name in enumerate(WEEKDAY_NAMES)}
+
+MONTH_NAMES = [
+    "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+    "agosto", "septiembre", "octubre", "noviembre", "diciembre"
+]
+MONTHS = {name: i + 1 for i, name in enumerate(MONTH_NAMES)}
+MONTHS["setiembre"] = 9
+# Abbreviations as typed in chats ("7 nov", "15 dic")
+MONTHS.update({
+    "ene": 1, "feb": 2, "mar": 3, "abr": 4, "may": 5, "jun": 6, "jul": 7,
+    "ago": 8, "sep": 9, "sept": 9, "set": 9, "oct": 10, "nov": 11, "dic": 12
+})
+# Longest first so "septiembre" is not cut short at "sep"
+_MONTH = "(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + ")"
+
+NUMBER_WORDS = {
+    "un": 1, "una": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10, "once": 11,
+    "doce": 12, "quince": 15, "veinte": 20, "treinta": 30
+}
+_NUMBER = r"(\d{1,2}|" + "|".join(NUMBER_WORDS) + r")"
+
+# Phrasing that a rule parser should not guess at (ranges, alternatives, negations...)
+_AMBIGUOUS = re.compile(
+    r"\b(no|o|ni|excepto|antes|despues|entre|semana|mes|fin de|cualquier|"
+    r"temprano|tarde tarde|luego|ahorita|cuando)\b"
+)
+
+_PERIOD = re.compile(r"\b(?:de|en|por) la (manana|tarde|noche|madrugada)\b")
+_NOON = re.compile(r"\b(?:al |a )?(mediodia|medio dia)\b")
+
+_REL_DAYS = re.compile(r"\b(pasado manana|manana|hoy)\b")
+_IN_DAYS = re.compile(r"\b(?:dentro de|en) " + _NUMBER + r" dias?\b")
+_WEEKDAY = re.compile(
+    r"\b(?:(proximo|siguiente|este)\s+)?(" + "|".join(WEEKDAY_NAMES) + r")"
+    r"(?:\s+(proximo|que viene|siguiente))?\b"
+)
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_NUM_DATE = re.compile(r"\b(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?\b")
+_NAMED_DATE = re.compile(
+    r"\b(\d{1,2})(?: de)? " + _MONTH + r"(?: (?:de|del) (\d{4}))?\b"
+)
+# Hour ranges ("a las 3-4", "3-4 pm") are not day/month dates
+_HOUR_RANGE = re.compile(
+    r"\b(?:a las|a la|las|la|de|entre)\s+\d{1,2}(?::\d{2})?\s*-\s*\d{1,2}(?::\d{2})?\b"
+    r"|\b\d{1,2}(?::\d{2})?\s*-\s*\d{1,2}(?::\d{2})?\s*(?:am|pm|hrs|hr|h)\b"
+)
+_RANGE_END = re.compile(r"\s*-\s*\d{1,2}(?::\d{2})?")
+_DAY_ONLY = re.compile(r"\bel (?:dia )?(\d{1,2})\b(?! de)")
+
+_CLOCK = re.compile(r"\b(\d{1,2})[:.](\d{2})\s*(am|pm|hrs|hr|h)?\b")
+_AT_HOUR = re.compile(
+    r"\b(?:a las|a la|las|la)\s+" + _NUMBER +
+    r"(?:\s+y\s+(media|cuarto|\d{1,2}))?(?:\s+(menos cuarto))?(?:\s*(am|pm|hrs|hr|h)\b)?"
+)
+_HOUR_AMPM = re.compile(r"\b(\d{1,2})\s*(am|pm)\b")
+
+
+def local_now() -> datetime:
+    """Current time in the business timezone."""
+    return datetime.now(TIMEZONE)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop accents and punctuation noise, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"\b([ap])\.?\s?m\.?(?=\s|$|[,;!?])", r"\1m", text)
+    text = re.sub(r"[^\w:/\-. ]", " ", text)
+    text = re.sub(r"\.(?!\d)", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _to_int(token: str) -> int:
+    return int(token) if token.isdigit() else NUMBER_WORDS[token]
+
+
+def _next_date(today: date, month: int, day: int, year: Optional[int]) -> date:
+    """Build a date; without a year, pick the next occurrence."""
+    if year is not None:
+        if year < 100:
+            year += 2000
+        return date(year, month, day)
+    candidate = date(today.year, month, day)
+    if candidate < today:
+        candidate = date(today.year + 1, month, day)
+    return candidate
+
+
+def _explicit_date(text: str, today: date) -> Optional[Tuple[date, float]]:
+    """A calendar date written out: ISO, "7 de noviembre"/"7 nov", or day/month."""
+    match = _ISO_DATE.search(text)
+    if match:
+        year, month, day = (int(g) for g in match.groups())
+        return date(year, month, day), 1.0
+
+    match = _NAMED_DATE.search(text)
+    if match:
+        day, month_name, year = match.groups()
+        return _next_date(today, MONTHS[month_name], int(day), int(year) if year else None), 1.0
+
+    match = _NUM_DATE.search(text)
+    if match:
+        day, month, year = match.groups()
+        # Mexican order: day/month[/year]
+        return _next_date(today, int(month), int(day), int(year) if year else None), 0.9
+
+    return None
+
+
+def _parse_date(text: str, today: date) -> Optional[Tuple[date, str, float]]:
+    """Return (date, relative label, confidence) for the date in the text.
+
+    The most explicit expression wins. If another one points to a
+    different day ("viernes 7 nov" when the 7th is a Saturday), the
+    confidence drops below the threshold so the LLM or the user settles it.
+    """
+    explicit = _explicit_date(text, today)
+
+    in_days = None
+    match = _IN_DAYS.search(text)
+    if match:
+        in_days = today + timedelta(days=_to_int(match.group(1)))
+
+    relative, label = None, ""
+    match = _REL_DAYS.search(text)
+    if match:
+        word = match.group(1)
+        relative = today + timedelta(days={"hoy": 0, "manana": 1, "pasado manana": 2}[word])
+        label = {"hoy": "Hoy", "manana": "Manana", "pasado manana": "Pasado manana"}[word]
+
+    weekday = None
+    match = _WEEKDAY.search(text)
+    if match:
+        before, name, after = match.groups()
+        days_ahead = (WEEKDAYS[name] - today.weekday()) % 7
+        if days_ahead == 0 and before != "este":
+            days_ahead = 7
+        weekday = today + timedelta(days=days_ahead)
+
+    if explicit is not None:
+        result, label, confidence = explicit[0], "", explicit[1]
+    elif in_days is not None:
+        result, label, confidence = in_days, "", 1.0
+    elif relative is not None:
+        result, confidence = relative, 1.0
+    elif weekday is not None:
+        result, confidence = weekday, 1.0
+    else:
+        match = _DAY_ONLY.search(text)
+        if not match:
+            return None
+        day = int(match.group(1))
+        month, year = today.month, today.year
+        if day < today.day:
+            month, year = (1, year + 1) if month == 12 else (month + 1, year)
+        # "el 15" alone is often a quantity or a time; let the LLM confirm
+        return date(year, month, day), "", 0.7
+
+    conflict = any(other is not None and other != result for other in (in_days, relative))
+    if weekday is not None and weekday.weekday() != result.weekday():
+        conflict = True
+    if relative is not None and relative != result:
+        label = ""
+    if conflict:
+        confidence = min(confidence, 0.5)
+    return result, label, confidence
+
+
+def _apply_period(hour: int, period: Optional[str]) -> Tuple[int, float]:
+    """Resolve an hour against am/pm or a "de la tarde" style period."""
+    if period == "noche" and hour == 12:
+        # Midnight: whether "mañana a las 12 de la noche" starts or ends
+        # that day is the client's call, so leave it to the LLM
+        return 0, 0.5
+    if period in ("pm", "tarde", "noche"):
+        return (hour + 12 if hour < 12 else hour), 1.0
+    if period in ("am", "manana", "madrugada"):
+        return (0 if hour == 12 else hour), 1.0
+    if period in ("hrs", "hr", "h") or hour > 12 or hour == 0:
+        return hour, 1.0
+    # Bare "a las 3": appointments are in business hours, so 1-7 means PM
+    if 1 <= hour <= 7:
+        return hour + 12, 0.85
+    return hour, 0.85
+
+
+def _parse_time(text: str, period: Optional[str]) -> Optional[Tuple[int, int, float]]:
+    """Return (hour, minute, confidence) for the first time expression."""
+    if _NOON.search(text):
+        return 12, 0, 1.0
+
+    match = _CLOCK.search(text)
+    if match:
+        hour, minute, suffix = int(match.group(1)), int(match.group(2)), match.group(3)
+        hour, confidence = _apply_period(hour, suffix or period)
+        return hour, minute, confidence
+
+    match = _AT_HOUR.search(text)
+    if match:
+        hour_token, extra, to_quarter, suffix = match.groups()
+        hour = _to_int(hour_token)
+        minute = 0
+        if extra == "media":
+            minute = 30
+        elif extra == "cuarto":
+            minute = 15
+        elif extra:
+            minute = int(extra)
+        if to_quarter:
+            hour, minute = (hour - 1) % 24, 45
+        hour, confidence = _apply_period(hour, suffix or period)
+        return hour, minute, confidence
+
+    match = _HOUR_AMPM.search(text)
+    if match:
+        hour, confidence = _apply_period(int(match.group(1)), match.group(2))
+        return hour, 0, confidence
+
+    return None
+
+
+def describe(when: datetime, label: str, today: date) -> str:
+    """Spanish description like 'Manana martes 28 de octubre a las 3 PM'."""
+    hour12 = when.hour % 12 or 12
+    suffix = "AM" if when.hour < 12 else "PM"
+    clock = f"{hour12}:{when.minute:02d}" if when.minute else str(hour12)
+    text = f"{WEEKDAY_NAMES[when.weekday()]} {when.day} de {MONTH_NAMES[when.month - 1]}"
+    if when.year != today.year:
+        text += f" de {when.year}"
+    text = f"{label} {text}" if label else text
+    return f"{text[0].upper()}{text[1:]} a las {clock} {suffix}"
+
+
+def parse_spanish_datetime(text: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Parse a Spanish date/time expression.
+
+    Returns {date, time, interpretation, confidence} or None when no date
+    and time could both be found. ``now`` defaults to the current time in
+    America/Mexico_City.
+    """
+    now = now or local_now()
+    today = now.date()
+    normalized = normalize_text(text)
+    if not normalized:
+        return None
+
+    period_match = _PERIOD.search(normalized)
+    period = period_match.group(1) if period_match else None
+    # "en la manana" is a time of day, not "tomorrow"
+    date_text = _PERIOD.sub(" ", normalized)
+    # Keep only the start of an hour range; the range itself is for the LLM to read
+    hour_range = _HOUR_RANGE.search(date_text)
+    if hour_range:
+        date_text = _HOUR_RANGE.sub(lambda m: _RANGE_END.sub("", m.group(0), count=1), date_text)
+
+    try:
+        parsed_date = _parse_date(date_text, today)
+        parsed_time = _parse_time(date_text, period)
+        if not parsed_date or not parsed_time:
+            return None
+
+        day, label, date_confidence = parsed_date
+        hour, minute, time_confidence = parsed_time
+        when = datetime(day.year, day.month, day.day, hour, minute)
+    except (ValueError, KeyError):
+        return None
+
+    confidence = min(date_confidence, time_confidence)
+    if _AMBIGUOUS.search(date_text) or hour_range:
+        confidence = min(confidence, 0.5)
+    if when.date() < today:
+        confidence = min(confidence, 0.5)
+
+    return {
+        "date": when.strftime("%Y-%m-%d"),
+        "time": when.strftime("%H:%M"),
+        "interpretation": describe(when, label, today),
+        "confidence": confidence
+    }
@@ -0,0 +1,146 @@
+"""In-flight message processing: journaled in the inbound queue, drained on shutdown, replayed on boot."""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .inbound_queue import InboundQueue, inbound_queue
+
+# process_message(body, received_at)
+Handler = Callable[[Dict[str, Any], float], Awaitable[None]]
+
+
+class MessageDispatcher:
+    """Runs the message handler for payloads held in the inbound queue.
+
+    Every message is committed to the queue, leased to this process,
+    before it is processed and acked after, whether it came straight
+    from the webhook (submit) or was claimed from the queue (consume).
+    drain() stops taking work, waits up to a deadline for the messages
+    in hand and gives the leases of unfinished ones back, so the next
+    process to start replays them at once. A process killed without
+    draining leaves leases that expire after the visibility timeout
+    and are replayed then.
+    """
+
+    def __init__(self, queue: InboundQueue):
+        self.queue = queue
+        self.handler: Optional[Handler] = None
+        self.draining = False
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._slot_freed: Optional[asyncio.Event] = None
+        self._renew_task: Optional[asyncio.Task] = None
+        self.stats = {"processed": 0, "failed": 0, "claimed": 0, "released": 0}
+
+    def start(self, handler: Handler) -> None:
+        """Set the handler and keep this process's leases renewed."""
+        self.handler = handler
+        self.draining = False
+        self._renew_task = asyncio.create_task(self._renew_leases())
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def submit(self, body: Dict[str, Any], received_at: float) -> bool:
+        """Journal a webhook payload and process it in the background.
+
+        False if it is not processed here: a redelivery of a message
+        already queued, or one arriving while draining (left for replay).
+        Raises if the payload could not be journaled.
+        """
+        queue_id = await asyncio.to_thread(self.queue.enqueue, body, None, True)
+        if queue_id is None:
+            return False
+        if self.draining or self.handler is None:
+            await asyncio.to_thread(self.queue.release, [queue_id])
+            return False
+        self._spawn(queue_id, body, received_at)
+        return True
+
+    async def consume(self, concurrency: int, poll_interval: float) -> None:
+        """Claim queued messages (new, released or with expired leases) until drain()."""
+        self._slot_freed = asyncio.Event()
+        while not self.draining:
+            free = concurrency - len(self._tasks)
+            batch = await asyncio.to_thread(self.queue.claim, free) if free > 0 else []
+            for message in batch:
+                # Back-date to the webhook's arrival so queue wait shows in reply latency and the trace
+                waited = max(0.0, time.time() - message.received_at)
+                self._spawn(message.id, message.body, time.perf_counter() - waited)
+            self.stats["claimed"] += len(batch)
+            if not batch or len(batch) == free:
+                # Queue empty or every slot busy: wait for a slot or the next poll
+                self._slot_freed.clear()
+                try:
+                    await asyncio.wait_for(self._slot_freed.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain(self, timeout: float) -> int:
+        """Stop taking work and wait up to timeout for the messages in hand.
+
+        Returns how many were unfinished; their leases are released so
+        they are replayed by the next process to start.
+        """
+        self.draining = True
+        if self._slot_freed is not None:
+            self._slot_freed.set()
+
+        tasks = list(self._tasks.values())
+        if tasks:
+            print(f"Draining {len(tasks)} in-flight message(s), up to {timeout:.0f}s")
+            await asyncio.wait(tasks, timeout=timeout)
+
+        unfinished: List[int] = list(self._tasks)
+        remaining = list(self._tasks.values())
+        for task in remaining:
+            task.cancel()
+        if remaining:
+            await asyncio.gather(*remaining, return_exceptions=True)
+        await asyncio.to_thread(self.queue.release, unfinished)
+        self.stats["released"] += len(unfinished)
+        if unfinished:
+            print(f"{len(unfinished)} message(s) left unfinished, saved for replay on next start")
+
+        if self._renew_task is not None:
+            self._renew_task.cancel()
+            self._renew_task = None
+        return len(unfinished)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "in_flight": len(self._tasks), "draining": self.draining}
+
+    def _spawn(self, queue_id: int, body: Dict[str, Any], received_at: float) -> None:
+        task = asyncio.create_task(self._run(queue_id, body, received_at))
+        self._tasks[queue_id] = task
+        task.add_done_callback(lambda t: self._finished(queue_id, t))
+
+    async def _run(self, queue_id: int, body: Dict[str, Any], received_at: float) -> None:
+        await self.handler(body, received_at)
+        await asyncio.to_thread(self.queue.ack, queue_id)
+
+    def _finished(self, queue_id: int, task: asyncio.Task) -> None:
+        self._tasks.pop(queue_id, None)
+        if task.cancelled():
+            pass
+        elif task.exception() is not None:
+            # Lease left to expire: the message is retried up to the attempt limit
+            self.stats["failed"] += 1
+            print(f"Queued message {queue_id} failed, it will be retried: {task.exception()}")
+        else:
+            self.stats["processed"] += 1
+        if self._slot_freed is not None:
+            self._slot_freed.set()
+
+    async def _renew_leases(self) -> None:
+        """Keep leases on slow messages from expiring while they are still being handled."""
+        interval = max(self.queue.visibility_timeout / 3, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.queue.extend, list(self._tasks))
+            except Exception as e:
+                print(f"Error renewing queue leases: {e}")
+
+
+# Singleton instance
+message_dispatcher = MessageDispatcher(inbound_queue)
@@ -0,0 +1,124 @@
+"""Recent inbound/outbound messages: a fixed-size ring buffer with live subscribers."""
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..config import get_settings
+
+INBOUND = "in"
+OUTBOUND = "out"
+
+
+class Subscriber:
+    """One live feed client: a bounded queue of new messages.
+
+    A client that falls behind by more than the queue size is dropped
+    instead of slowing down the others; it can reconnect and resume
+    from the ring buffer with its last seen id.
+    """
+
+    def __init__(self, max_pending: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.dropped = False
+
+
+class MessageLog:
+    """The last ``capacity`` messages, newest overwriting oldest.
+
+    Slots are preallocated and addressed by sequence number, so
+    recording a message is O(1) with no allocation beyond the entry
+    itself, and pages are read by walking back from the newest.
+    """
+
+    def __init__(self, capacity: int = 1000, subscriber_queue_size: int = 256):
+        self.capacity = max(1, capacity)
+        self.subscriber_queue_size = max(1, subscriber_queue_size)
+        self._slots: List[Optional[Dict[str, Any]]] = [None] * self.capacity
+        # Sequence number of the newest message (0 = none yet)
+        self._seq = 0
+        self._subscribers: Set[Subscriber] = set()
+        self.dropped_subscribers = 0
+
+    def __len__(self) -> int:
+        return min(self._seq, self.capacity)
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def record(
+        self,
+        direction: str,
+        number: str,
+        text: str,
+        name: Optional[str] = None,
+        message_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Store one message and push it to live subscribers."""
+        self._seq += 1
+        entry = {
+            "seq": self._seq,
+            "id": message_id or f"local-{self._seq}",
+            "direction": direction,
+            "from": number,
+            "name": name or "",
+            "text": text,
+            "timestamp": datetime.now().isoformat()
+        }
+        self._slots[self._seq % self.capacity] = entry
+
+        for subscriber in tuple(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+        return entry
+
+    def page(self, limit: int = 50, before: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Newest-first messages with seq < before. Returns (messages, cursor for the next page)."""
+        oldest = max(self._seq - self.capacity + 1, 1)
+        seq = self._seq if before is None else min(before - 1, self._seq)
+        messages = []
+        while seq >= oldest and len(messages) < limit:
+            messages.append(self._slots[seq % self.capacity])
+            seq -= 1
+        next_before = messages[-1]["seq"] if messages and seq >= oldest else None
+        return messages, next_before
+
+    def since(self, after: int) -> List[Dict[str, Any]]:
+        """Messages newer than seq ``after`` still in the buffer, oldest first."""
+        start = max(after + 1, self._seq - self.capacity + 1, 1)
+        return [self._slots[seq % self.capacity] for seq in range(start, self._seq + 1)]
+
+    # ============= Live feed =============
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.subscriber_queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        subscriber.dropped = True
+        self._subscribers.discard(subscriber)
+        self.dropped_subscribers += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self),
+            "capacity": self.capacity,
+            "last_seq": self._seq,
+            "subscribers": len(self._subscribers),
+            "dropped_subscribers": self.dropped_subscribers
+        }
+
+
+def _create_log() -> MessageLog:
+    settings = get_settings()
+    return MessageLog(settings.recent_messages_capacity, settings.recent_messages_subscriber_queue)
+
+
+# Singleton instance
+message_log = _create_log()
@@ -0,0 +1,290 @@
+"""In-process metrics (counters, gauges, histograms) in Prometheus text format."""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .tracing import KIND_CLIENT, tracer
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; spans a cache hit up to a slow LLM completion
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """A named metric with one child per label-value combination.
+
+    The lock is only taken to create a child; updates are plain
+    in-place additions on objects that already exist.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> object:
+        # Fast path: label values are normally already strings
+        child = self._children.get(values)
+        if child is None:
+            key = tuple(str(v) for v in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.get(key)
+            if child is None:
+                with self._lock:
+                    child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: LabelValues, child: object) -> List[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.labels(*labels).value += amount
+
+    def _render_child(self, values: LabelValues, child: _Value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self.labels(*labels).value = value
+
+
+class CallbackGauge(_Metric):
+    """Value read at scrape time, for numbers another component already tracks.
+
+    ``read`` returns {label values: value}; kind may be "counter" for
+    monotonic totals such as cache hits.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], Dict[LabelValues, float]],
+                 labelnames: Sequence[str] = (), kind: str = "gauge"):
+        super().__init__(name, help_text, labelnames)
+        self.read = read
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            values = self.read()
+        except Exception as e:
+            print(f"Error reading metric {self.name}: {e}")
+            return lines
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(float(value))}")
+        return lines
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """Fixed buckets: one bisect and three additions per observation."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        self.labels(*labels).observe(value)
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observe the duration of the block, even if it raises."""
+        child = self.labels(*labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            child.observe(time.perf_counter() - start)
+
+    def _render_child(self, values: LabelValues, child: _HistogramChild) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*child.bounds, math.inf), child.counts):
+            cumulative += count
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """All metrics of this process, rendered together for /metrics."""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self.prefix + name, help_text, labelnames))
+
+    def gauge_callback(self, name: str, help_text: str, read: Callable[[], Dict[LabelValues, float]],
+                       labelnames: Sequence[str] = ()) -> CallbackGauge:
+        return self._register(CallbackGauge(self.prefix + name, help_text, read, labelnames))
+
+    def counter_callback(self, name: str, help_text: str, read: Callable[[], Dict[LabelValues, float]],
+                         labelnames: Sequence[str] = ()) -> CallbackGauge:
+        return self._register(CallbackGauge(self.prefix + name, help_text, read, labelnames, kind="counter"))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, help_text, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(self.prefix + name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+metrics = MetricsRegistry(prefix="karuna_")
+
+# ============= Shared metrics =============
+
+# Message pipeline (routers/webhook.py)
+pipeline_stage_seconds = metrics.histogram(
+    "pipeline_stage_seconds", "Time spent in each process_message stage", ("stage",)
+)
+reply_seconds = metrics.histogram(
+    "reply_seconds", "Time from webhook receipt to the reply being sent"
+)
+messages_total = metrics.counter(
+    "messages_total", "Webhook payloads processed, by outcome", ("outcome",)
+)
+
+# Outbound API calls: Graph (WhatsApp), x.ai (Grok), Google
+external_request_seconds = metrics.histogram(
+    "external_request_seconds", "Latency of outbound API calls", ("service", "operation")
+)
+external_requests_total = metrics.counter(
+    "external_requests_total", "Outbound API calls by result status", ("service", "operation", "status")
+)
+
+
+@contextmanager
+def track_request(service: str, operation: str) -> Iterator[Dict[str, str]]:
+    """Time an outbound call; set result["status"] inside the block (defaults to ok/error).
+
+    Inside a message trace the call is also recorded as a client span.
+    """
+    result: Dict[str, str] = {}
+    start = time.perf_counter()
+    with tracer.span(f"{service} {operation}", KIND_CLIENT, service=service, operation=operation) as span:
+        try:
+            yield result
+        except BaseException as e:
+            # HTTP status from openai (status_code) or googleapiclient (resp.status) errors
+            code = getattr(e, "status_code", None) or getattr(getattr(e, "resp", None), "status", None)
+            if code:
+                result.setdefault("status", str(code))
+            result.setdefault("status", "timeout" if "Timeout" in type(e).__name__ else "error")
+            raise
+        finally:
+            status = result.get("status", "ok")
+            external_request_seconds.observe(time.perf_counter() - start, service, operation)
+            external_requests_total.inc(service, operation, status)
+            if span is not None:
+                span.set_attribute("status", status)
+                if status != "ok" and not status.startswith("2"):
+                    span.set_error(f"status {status}")
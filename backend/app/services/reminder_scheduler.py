@@ -0,0 +1,401 @@
+"""Persistent scheduler for WhatsApp appointment reminders."""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no inter-process lock
+    fcntl = None
+
+from ..config import get_settings
+from .local_date_parser import TIMEZONE, describe, local_now
+from .tenants import DEFAULT_TENANT_ID, tenant_registry
+
+# Reminder status
+PENDING = "pending"
+SENDING = "sending"  # Claimed by the dispatcher; only seen after a crash mid-send
+SENT = "sent"
+FAILED = "failed"
+SKIPPED = "skipped"  # Came due after the appointment had already started
+
+# Retries after a failed send, as long as the appointment has not started
+MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 60.0
+# Longest sleep between checks, so reminders scheduled by other workers are picked up
+MAX_SLEEP_SECONDS = 60.0
+
+
+class ReminderScheduler:
+    """Reminders due at fixed offsets before each appointment, stored in SQLite.
+
+    The pending rows, indexed by due time, act as a persistent
+    min-heap: scheduling is one indexed insert and the next due time
+    is one index lookup, whatever the backlog. run() sleeps until the
+    earliest reminder is due (or an earlier one is scheduled), then
+    sends everything due in one batch.
+
+    Every reminder is claimed before it is sent and marked sent right
+    after, so a restart never sends it twice. A crash between the
+    two leaves it claimed; it is then marked failed rather than risk
+    a duplicate. Only one worker process dispatches at a time (flock
+    on <db>.lock). Each reminder is sent from the WhatsApp number of the
+    tenant the appointment was booked for. Commits are fsynced and run
+    in a thread; the connection is shared under a lock.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS reminders (
+            id TEXT PRIMARY KEY,
+            booking_id TEXT NOT NULL,
+            tenant_id TEXT NOT NULL DEFAULT 'default',
+            phone TEXT NOT NULL,
+            name TEXT NOT NULL DEFAULT '',
+            service TEXT NOT NULL DEFAULT '',
+            starts_at REAL NOT NULL,
+            offset_minutes INTEGER NOT NULL,
+            due_at REAL NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            message_id TEXT,
+            sent_at REAL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS reminders_due ON reminders (due_at) WHERE status = 'pending';
+        CREATE INDEX IF NOT EXISTS reminders_booking ON reminders (booking_id);
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        template_name: str,
+        language_code: str = "es",
+        offsets_minutes: Sequence[int] = (1440, 60),
+        batch_size: int = 50
+    ):
+        self.db_path = db_path
+        self.lock_path = f"{db_path}.lock"
+        self.template_name = template_name
+        self.language_code = language_code
+        self.offsets_minutes = sorted({m for m in offsets_minutes if m > 0}, reverse=True)
+        self.batch_size = max(1, batch_size)
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Opened on first use, so importing the module touches no database
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self._wakeup: Optional[asyncio.Event] = None
+        # False while another worker process holds the dispatcher lock
+        self.is_dispatcher = True
+        self._sleep_until: Optional[float] = None
+        # Set on shutdown: the batch being sent is finished, no new one is claimed
+        self._stopping = False
+        self.stats = {
+            "scheduled": 0,
+            "sent": 0,
+            "failed": 0,
+            "skipped": 0,
+            "batches": 0
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        """The reminders database, opened (and migrated) on first use. Call with self._lock held."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # A lost "sent" mark would mean a duplicate message: fsync every commit
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(self.SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(reminders)")}
+            if "tenant_id" not in columns:
+                # Databases created before reminders were per tenant
+                conn.execute("ALTER TABLE reminders ADD COLUMN tenant_id TEXT NOT NULL DEFAULT 'default'")
+            self._conn = conn
+        return self._conn
+
+    # ============= Scheduling =============
+
+    async def schedule(self, appointment: Dict[str, Any], tenant_id: str = DEFAULT_TENANT_ID) -> int:
+        """Schedule the reminders for a booked appointment. Returns how many were added.
+
+        Offsets already in the past are left out; scheduling the same
+        appointment again adds nothing.
+        """
+        if not self.template_name or not appointment.get("phone"):
+            return 0
+        start = TIMEZONE.localize(datetime.fromisoformat(f"{appointment['date']}T{appointment['time']}"))
+        starts_at = start.timestamp()
+        now = time.time()
+
+        rows = [
+            (
+                f"{appointment['id']}:{offset}", appointment["id"], tenant_id, appointment["phone"],
+                appointment.get("name", "") or "", appointment.get("service", "") or "",
+                starts_at, offset, starts_at - offset * 60, PENDING
+            )
+            for offset in self.offsets_minutes
+            if starts_at - offset * 60 > now
+        ]
+        if not rows:
+            return 0
+
+        added = await asyncio.to_thread(self._insert, rows)
+        self.stats["scheduled"] += added
+
+        # Wake the dispatcher if this is now the earliest reminder
+        earliest = min(row[8] for row in rows)
+        if self._wakeup is not None and (self._sleep_until is None or earliest < self._sleep_until):
+            self._wakeup.set()
+        return added
+
+    def _insert(self, rows: List[tuple]) -> int:
+        with self._lock:
+            conn = self._connection()
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO reminders (id, booking_id, tenant_id, phone, name, service, starts_at, "
+                "offset_minutes, due_at, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return conn.total_changes - before
+
+    def _update(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            return self._connection().execute(sql, params).rowcount
+
+    # ============= Queries =============
+
+    def pending(self) -> int:
+        """Number of reminders waiting to be sent."""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT COUNT(*) FROM reminders WHERE status = ?", (PENDING,)
+            ).fetchone()[0]
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest pending reminder (epoch seconds)."""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT MIN(due_at) FROM reminders WHERE status = ?", (PENDING,)
+            ).fetchone()[0]
+
+    def for_booking(self, booking_id: str) -> List[Dict[str, Any]]:
+        """All reminders of one appointment, earliest first."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM reminders WHERE booking_id = ? ORDER BY due_at", (booking_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters since startup, reminders per status and the next due time."""
+        counts = {status: 0 for status in (PENDING, SENT, FAILED, SKIPPED)}
+        with self._lock:
+            rows = self._connection().execute("SELECT status, COUNT(*) FROM reminders GROUP BY status").fetchall()
+        for status, count in rows:
+            counts[status] = count
+        next_due = self.next_due()
+        return {
+            **self.stats,
+            "counts": counts,
+            "next_due": datetime.fromtimestamp(next_due, TIMEZONE).isoformat() if next_due else None
+        }
+
+    # ============= Dispatching =============
+
+    def _try_lock(self) -> Optional[Any]:
+        """Take the dispatcher lock without blocking; None if another worker holds it."""
+        lock_file = open(self.lock_path, 'a')
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_file
+        except BlockingIOError:
+            lock_file.close()
+            return None
+
+    def _components(self, reminder: Dict[str, Any]) -> list:
+        """Template body parameters: client name, then the appointment date and time."""
+        start = datetime.fromtimestamp(reminder["starts_at"], TIMEZONE).replace(tzinfo=None)
+        when = describe(start, "", local_now().date()).strip()
+        return [{
+            "type": "body",
+            "parameters": [
+                {"type": "text", "text": reminder["name"] or "cliente"},
+                {"type": "text", "text": when}
+            ]
+        }]
+
+    async def _send(self, reminder: Dict[str, Any]) -> None:
+        now = time.time()
+        if now >= reminder["starts_at"]:
+            await asyncio.to_thread(
+                self._update, "UPDATE reminders SET status = ? WHERE id = ?", (SKIPPED, reminder["id"])
+            )
+            self.stats["skipped"] += 1
+            return
+
+        tenant = tenant_registry.get(reminder["tenant_id"])
+        if tenant is None:
+            # Tenant removed from tenants.json since booking: no number to send from
+            await asyncio.to_thread(
+                self._update,
+                "UPDATE reminders SET status = ?, last_error = ? WHERE id = ?",
+                (FAILED, f"Unknown tenant {reminder['tenant_id']}", reminder["id"])
+            )
+            self.stats["failed"] += 1
+            return
+
+        result = await tenant.whatsapp.send_template(
+            reminder["phone"], self.template_name, self.language_code, self._components(reminder)
+        )
+        if result.get("success"):
+            await asyncio.to_thread(
+                self._update,
+                "UPDATE reminders SET status = ?, message_id = ?, sent_at = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (SENT, result.get("message_id"), time.time(), reminder["id"])
+            )
+            self.stats["sent"] += 1
+            return
+
+        error = str(result.get("error") or "send failed")[:500]
+        attempts = reminder["attempts"] + 1
+        retry_at = time.time() + RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+        if attempts < MAX_ATTEMPTS and retry_at < reminder["starts_at"]:
+            await asyncio.to_thread(
+                self._update,
+                "UPDATE reminders SET status = ?, attempts = ?, last_error = ?, due_at = ? WHERE id = ?",
+                (PENDING, attempts, error, retry_at, reminder["id"])
+            )
+        else:
+            await asyncio.to_thread(
+                self._update,
+                "UPDATE reminders SET status = ?, attempts = ?, last_error = ? WHERE id = ?",
+                (FAILED, attempts, error, reminder["id"])
+            )
+            self.stats["failed"] += 1
+        print(f"Reminder {reminder['id']} failed (attempt {attempts}): {error}")
+
+    def _claim_batch(self) -> List[Dict[str, Any]]:
+        """Mark the next due reminders as sending, in one transaction, before any is sent."""
+        with self._lock:
+            conn = self._connection()
+            batch = [dict(row) for row in conn.execute(
+                "SELECT * FROM reminders WHERE status = ? AND due_at <= ? ORDER BY due_at LIMIT ?",
+                (PENDING, time.time(), self.batch_size)
+            ).fetchall()]
+            if not batch:
+                return batch
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "UPDATE reminders SET status = ? WHERE id = ? AND status = ?",
+                    [(SENDING, reminder["id"], PENDING) for reminder in batch]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return batch
+
+    async def dispatch_due(self) -> int:
+        """Send every reminder that is due, in batches. Returns how many were attempted."""
+        lock_file = self._try_lock()
+        self.is_dispatcher = lock_file is not None
+        if lock_file is None:
+            return 0
+        try:
+            # Claimed but never marked: a previous dispatcher died mid-send
+            stale = await asyncio.to_thread(
+                self._update,
+                "UPDATE reminders SET status = ?, last_error = ? WHERE status = ?",
+                (FAILED, "Interrupted while sending; not resent to avoid a duplicate", SENDING)
+            )
+            if stale:
+                print(f"Marked {stale} interrupted reminder(s) as failed")
+
+            attempted = 0
+            while not self._stopping:
+                batch = await asyncio.to_thread(self._claim_batch)
+                if not batch:
+                    return attempted
+
+                await asyncio.gather(*(self._send(reminder) for reminder in batch))
+                self.stats["batches"] += 1
+                attempted += len(batch)
+            return attempted
+        finally:
+            lock_file.close()
+
+    async def run(self) -> None:
+        """Send reminders as they come due until stop() (or cancellation)."""
+        self._wakeup = asyncio.Event()
+        try:
+            while not self._stopping:
+                next_due = await asyncio.to_thread(self.next_due)
+                now = time.time()
+                if next_due is None or not self.is_dispatcher:
+                    delay = MAX_SLEEP_SECONDS
+                else:
+                    delay = min(max(next_due - now, 0), MAX_SLEEP_SECONDS)
+                self._sleep_until = now + delay
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                self._sleep_until = None
+                if self._stopping:
+                    break
+                try:
+                    sent = await self.dispatch_due()
+                    if sent:
+                        print(f"Dispatched {sent} reminder(s)")
+                except Exception as e:
+                    print(f"Error dispatching reminders: {e}")
+        finally:
+            self._wakeup = None
+
+    def stop(self) -> None:
+        """Stop claiming batches; run() returns once the batch being sent is finished."""
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def close(self) -> None:
+        """Close the database connection; pending reminders stay on disk."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _offsets(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def _create_scheduler() -> ReminderScheduler:
+    settings = get_settings()
+    return ReminderScheduler(
+        settings.reminders_db_path,
+        settings.reminder_template_name,
+        settings.reminder_template_language,
+        _offsets(settings.reminder_offsets_minutes),
+        settings.reminder_batch_size
+    )
+
+
+# Singleton instance
+reminder_scheduler = _create_scheduler()
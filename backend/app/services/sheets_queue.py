@@ -0,0 +1,216 @@
+"""Durable write-behind queue for Google Sheets appends."""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no inter-process lock
+    fcntl = None
+
+
+Row = List[Any]
+AppendRows = Callable[[List[Row]], Awaitable[Any]]
+
+# Retry delays after a failed append (quota errors, timeouts, outages)
+RETRY_BASE_SECONDS = 2.0
+RETRY_MAX_SECONDS = 300.0
+
+
+class SheetsWriteQueue:
+    """Rows waiting to be appended to a sheet, stored in SQLite.
+
+    enqueue() commits the row locally and returns immediately; run()
+    flushes the oldest rows in one append whenever batch_size rows are
+    waiting or interval seconds have passed. Rows leave the queue only
+    after the append succeeded, strictly in enqueue order: a failed
+    batch is retried with exponential backoff before anything newer is
+    sent. Only one worker process flushes at a time (flock on
+    <db>.lock). Delivery is at-least-once: a crash between the append
+    and the delete re-sends that batch. Commits are fsynced and run in
+    a thread; the connection is shared under a lock.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rows (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, db_path: str, append_rows: AppendRows, batch_size: int = 50, interval: float = 2.0):
+        self.db_path = db_path
+        self.lock_path = f"{db_path}.lock"
+        self.append_rows = append_rows
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Opened on first use, so importing the module touches no database
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self.stats = {
+            "enqueued": 0,
+            "flushed": 0,
+            "batches": 0,
+            "errors": 0
+        }
+        self.last_error: Optional[str] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """The queue database, opened on first use. Call with self._lock held."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Queued rows are the only copy until flushed: fsync every commit
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def enqueue(self, row: Row) -> int:
+        """Store a row for a later batched append. Returns its queue id."""
+        queue_id, pending = await asyncio.to_thread(self._insert, row)
+        self.stats["enqueued"] += 1
+        if self._wakeup is not None and pending >= self.batch_size:
+            self._wakeup.set()
+        return queue_id
+
+    def _insert(self, row: Row) -> Tuple[int, int]:
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "INSERT INTO rows (data, created_at) VALUES (?, ?)",
+                (json.dumps(row, ensure_ascii=False), time.time())
+            )
+            return cursor.lastrowid, conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def pending(self) -> int:
+        """Number of rows not yet appended."""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue counters since startup plus the current backlog."""
+        with self._lock:
+            oldest = self._connection().execute("SELECT MIN(created_at) FROM rows").fetchone()[0]
+        return {
+            **self.stats,
+            "pending": self.pending(),
+            "oldest_age": time.time() - oldest if oldest else 0.0,
+            "last_error": self.last_error
+        }
+
+    # ============= Flushing =============
+
+    def _try_lock(self) -> Optional[Any]:
+        """Take the flusher lock without blocking; None if another worker holds it."""
+        lock_file = open(self.lock_path, 'a')
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_file
+        except BlockingIOError:
+            lock_file.close()
+            return None
+
+    async def flush(self, force: bool = False) -> int:
+        """Append queued rows in batches until empty or an append fails.
+
+        Returns the number of rows appended. While backing off after a
+        failure, does nothing unless force is set.
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        if not force and time.monotonic() < self._retry_at:
+            return 0
+
+        async with self._flush_lock:
+            lock_file = self._try_lock()
+            if lock_file is None:
+                return 0
+            try:
+                return await self._flush_batches()
+            finally:
+                lock_file.close()
+
+    def _next_batch(self) -> List[Tuple[int, str]]:
+        with self._lock:
+            return self._connection().execute(
+                "SELECT id, data FROM rows ORDER BY id LIMIT ?",
+                (self.batch_size,)
+            ).fetchall()
+
+    def _delete_through(self, queue_id: int) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM rows WHERE id <= ?", (queue_id,))
+
+    def _record_failure(self, what: str, error: Exception) -> None:
+        """Count a failed flush and back off before the next one."""
+        self._failures += 1
+        delay = min(RETRY_BASE_SECONDS * 2 ** (self._failures - 1), RETRY_MAX_SECONDS)
+        self._retry_at = time.monotonic() + delay
+        self.stats["errors"] += 1
+        self.last_error = str(error) or type(error).__name__
+        print(f"{what} failed ({self._failures} in a row), retrying in {delay:.0f}s: {self.last_error}")
+
+    async def _flush_batches(self) -> int:
+        flushed = 0
+        while True:
+            batch = await asyncio.to_thread(self._next_batch)
+            if not batch:
+                return flushed
+
+            try:
+                await self.append_rows([json.loads(data) for _, data in batch])
+            except Exception as e:
+                self._record_failure(f"Sheets append of {len(batch)} row(s)", e)
+                return flushed
+
+            await asyncio.to_thread(self._delete_through, batch[-1][0])
+            self._failures = 0
+            self._retry_at = 0.0
+            self.stats["flushed"] += len(batch)
+            self.stats["batches"] += 1
+            flushed += len(batch)
+            print(f"Appended {len(batch)} row(s) to Sheets")
+
+    async def run(self) -> None:
+        """Flush by size or interval until cancelled."""
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                try:
+                    await self.flush()
+                except Exception as e:
+                    # Queue database or lock file unusable: counted and backed off like a failed append
+                    self._record_failure("Sheets queue flush", e)
+        finally:
+            self._wakeup = None
+
+    def close(self) -> None:
+        """Close the database connection; queued rows stay on disk."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,180 @@
+"""Tenant registry: the WhatsApp phone numbers (brands) served by this process."""
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..config import Settings, get_settings
+from .blacklist_index import BlacklistIndex
+from .whatsapp_service import WhatsAppService, whatsapp_service
+
+DEFAULT_TENANT_ID = "default"
+
+
+class Tenant:
+    """One phone number: its Graph client and its own flow, prompt and blacklist.
+
+    flow and system_prompt are None to follow the global config (the
+    active flow chosen in the dashboard). The tenant blacklist applies
+    on top of the global one.
+    """
+
+    def __init__(
+        self,
+        tenant_id: str,
+        whatsapp: WhatsAppService,
+        name: str = "",
+        flow: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        blacklist: Iterable[str] = (),
+        blacklist_prefixes: Iterable[str] = (),
+        is_default: bool = False
+    ):
+        self.id = tenant_id
+        self.whatsapp = whatsapp
+        self.name = name or tenant_id
+        self.flow = flow or None
+        self.system_prompt = system_prompt or None
+        self.blacklist = BlacklistIndex(blacklist, blacklist_prefixes)
+        self.is_default = is_default
+
+    @property
+    def phone_number_id(self) -> str:
+        return self.whatsapp.number_id
+
+    def is_blacklisted(self, number: str) -> bool:
+        return self.blacklist.is_blocked(number)
+
+    def conversation_key(self, number: str) -> str:
+        """Key for per-user state; the default tenant keeps the bare number."""
+        return number if self.is_default else f"{self.id}:{number}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public description (no credentials)."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "phone_number_id": self.phone_number_id,
+            "is_default": self.is_default,
+            "flow": self.flow,
+            "custom_prompt": self.system_prompt is not None,
+            "blacklist_count": len(self.blacklist),
+            "blacklist_prefixes": len(self.blacklist.prefixes),
+            "rate_limit_per_second": self.whatsapp.rate_limiter.rate,
+            "rate_limited_sends": self.whatsapp.rate_limiter.waits
+        }
+
+
+class TenantRegistry:
+    """Tenants indexed by Meta phone_number_id for O(1) routing of inbound messages."""
+
+    def __init__(self, default: Tenant, tenants: Iterable[Tenant] = ()):
+        self.default = default
+        self._by_number_id: Dict[str, Tenant] = {}
+        self._by_id: Dict[str, Tenant] = {default.id: default}
+        if default.phone_number_id:
+            self._by_number_id[default.phone_number_id] = default
+        for tenant in tenants:
+            self._by_number_id[tenant.phone_number_id] = tenant
+            self._by_id[tenant.id] = tenant
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def resolve(self, phone_number_id: Optional[str]) -> Optional[Tenant]:
+        """Tenant for an inbound message's metadata.phone_number_id.
+
+        With no tenants configured every message goes to the default
+        tenant, as before. Otherwise an unknown number id is None: a
+        reply from another brand's number would not reach the user.
+        """
+        tenant = self._by_number_id.get(phone_number_id) if phone_number_id else None
+        if tenant is not None:
+            return tenant
+        if len(self._by_id) == 1 or not phone_number_id:
+            return self.default
+        return None
+
+    def get(self, tenant_id: str) -> Optional[Tenant]:
+        return self._by_id.get(tenant_id)
+
+    def all(self) -> List[Tenant]:
+        return list(self._by_id.values())
+
+    async def close(self) -> None:
+        """Close every tenant's pooled HTTP client."""
+        for tenant in self._by_id.values():
+            await tenant.whatsapp.close()
+
+
+def _tenant_from_entry(entry: Dict[str, Any], default_number_id: str) -> Optional[Tenant]:
+    """Build a tenant from one tenants.json entry, or None if it is unusable."""
+    tenant_id = str(entry.get("id") or "").strip()
+    number_id = str(entry.get("phone_number_id") or "").strip()
+    token = entry.get("token") or os.environ.get(entry.get("token_env") or "", "")
+    is_default = bool(number_id) and number_id == default_number_id
+
+    if not tenant_id or not number_id:
+        print(f"Skipping tenant without id or phone_number_id: {entry.get('id')!r}")
+        return None
+    if is_default:
+        # Same number as META_NUMBER_ID: reuse the default client unless a token is given here
+        client = whatsapp_service if not token else WhatsAppService(
+            number_id, token, entry.get("version"), entry.get("rate_limit_per_second")
+        )
+    elif not token:
+        print(f"Skipping tenant {tenant_id}: no token (set 'token' or 'token_env')")
+        return None
+    else:
+        client = WhatsAppService(number_id, token, entry.get("version"), entry.get("rate_limit_per_second"))
+
+    return Tenant(
+        DEFAULT_TENANT_ID if is_default else tenant_id,
+        client,
+        name=entry.get("name", tenant_id),
+        flow=entry.get("flow"),
+        system_prompt=entry.get("system_prompt"),
+        blacklist=entry.get("blacklist", []),
+        blacklist_prefixes=entry.get("blacklist_prefixes", []),
+        is_default=is_default
+    )
+
+
+def load_tenants(path: str, settings: Settings) -> TenantRegistry:
+    """Registry from a tenants.json file ({"tenants": [...]}); only the default tenant if it is missing."""
+    default = Tenant(DEFAULT_TENANT_ID, whatsapp_service, is_default=True)
+    if not path or not os.path.exists(path):
+        return TenantRegistry(default)
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f).get("tenants", [])
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"Error loading tenants from {path}: {e}")
+        return TenantRegistry(default)
+
+    tenants = []
+    seen = set()
+    for entry in entries:
+        tenant = _tenant_from_entry(entry, settings.meta_number_id)
+        if tenant is None:
+            continue
+        if tenant.id in seen or tenant.phone_number_id in seen:
+            print(f"Skipping duplicate tenant {tenant.id} ({tenant.phone_number_id})")
+            continue
+        seen.update((tenant.id, tenant.phone_number_id))
+        if tenant.is_default:
+            default = tenant
+        else:
+            tenants.append(tenant)
+
+    print(f"Tenants loaded: {len(tenants) + 1} phone number(s)")
+    return TenantRegistry(default, tenants)
+
+
+def _create_registry() -> TenantRegistry:
+    settings = get_settings()
+    return load_tenants(settings.tenants_file_path, settings)
+
+
+# Singleton instance
+tenant_registry = _create_registry()
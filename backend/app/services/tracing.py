@@ -0,0 +1,246 @@
+"""Lightweight per-message tracing: spans carried in contextvars, kept in a bounded store."""
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..config import get_settings
+
+# Spans kept per trace; later spans are counted but not stored
+MAX_SPANS_PER_TRACE = 200
+
+# Trace/span ids only need to be unique, not secret (same generator as the OpenTelemetry SDK)
+_ids = random.Random()
+
+
+def _new_id(bits: int) -> str:
+    return format(_ids.getrandbits(bits), f"0{bits // 4}x")
+
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """One timed operation inside a trace."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes",
+                 "status", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], kind: int,
+                 attributes: Dict[str, Any], start_ns: Optional[int] = None):
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = STATUS_OK
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: str) -> None:
+        self.status = STATUS_ERROR
+        self.error = error[:500]
+
+    def to_dict(self) -> Dict[str, Any]:
+        end_ns = self.end_ns or time.time_ns()
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round((end_ns - self.start_ns) / 1e6, 3),
+            "offset_ms": round((self.start_ns - self.trace.root.start_ns) / 1e6, 3),
+            "status": "error" if self.status == STATUS_ERROR else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+            "finished": self.end_ns is not None
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status, **({"message": self.error} if self.error else {})}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Trace:
+    """All spans of one inbound message."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any], start_ns: Optional[int] = None):
+        self.trace_id = _new_id(128)
+        self.message_id: Optional[str] = None
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self.root = self._add(Span(self, name, None, KIND_SERVER, attributes, start_ns))
+
+    def _add(self, span: Span) -> Span:
+        if len(self.spans) < MAX_SPANS_PER_TRACE:
+            self.spans.append(span)
+        else:
+            self.dropped_spans += 1
+        return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "message_id": self.message_id,
+            "name": self.root.name,
+            "duration_ms": self.root.to_dict()["duration_ms"],
+            "finished": self.root.end_ns is not None,
+            "dropped_spans": self.dropped_spans,
+            "spans": [span.to_dict() for span in self.spans]
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Creates traces and spans and keeps the most recent traces by message id.
+
+    The current span lives in a contextvar, so spans opened anywhere
+    below a trace (service calls, outbound requests, tasks created
+    from it) attach to it without passing anything around. Outside a
+    trace, span() does nothing.
+    """
+
+    def __init__(self, capacity: int = 1000, export_path: str = ""):
+        self.capacity = max(1, capacity)
+        self.export_path = export_path
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        self._export_lock = threading.Lock()
+
+        if export_path:
+            export_dir = os.path.dirname(export_path)
+            if export_dir:
+                os.makedirs(export_dir, exist_ok=True)
+
+    # ============= Recording =============
+
+    @contextmanager
+    def start_trace(self, name: str, start_ns: Optional[int] = None, **attributes: Any) -> Iterator[Trace]:
+        """Open a trace and make its root span current for the block.
+
+        The trace is only stored once bind() gives it a message id.
+        """
+        trace = Trace(name, attributes, start_ns)
+        token = _current_span.set(trace.root)
+        try:
+            yield trace
+        except BaseException as e:
+            trace.root.set_error(str(e) or type(e).__name__)
+            raise
+        finally:
+            trace.root.end_ns = time.time_ns()
+            _current_span.reset(token)
+            if trace.message_id is not None:
+                self._export(trace)
+
+    def bind(self, trace: Trace, message_id: str) -> None:
+        """Store the trace under its inbound message id."""
+        trace.message_id = message_id
+        trace.root.set_attribute("message_id", message_id)
+        self._traces[message_id] = trace
+        self._traces.move_to_end(message_id)
+        while len(self._traces) > self.capacity:
+            self._traces.popitem(last=False)
+
+    @contextmanager
+    def span(self, name: str, kind: int = KIND_INTERNAL, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Child span of the current span for the block; a no-op outside a trace."""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+
+        span = parent.trace._add(Span(parent.trace, name, parent.span_id, kind, attributes))
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(str(e) or type(e).__name__)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    # ============= Queries =============
+
+    def get(self, message_id: str) -> Optional[Trace]:
+        return self._traces.get(message_id)
+
+    def recent(self, limit: int = 50) -> List[Trace]:
+        """Most recent traces first."""
+        traces = []
+        for message_id in reversed(self._traces):
+            traces.append(self._traces[message_id])
+            if len(traces) >= limit:
+                break
+        return traces
+
+    # ============= Export =============
+
+    def _export(self, trace: Trace) -> None:
+        """Append the finished trace as one OTLP/JSON line (ExportTraceServiceRequest)."""
+        if not self.export_path:
+            return
+        line = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", "karuna-bot")]},
+                "scopeSpans": [{
+                    "scope": {"name": "karuna.tracing"},
+                    "spans": [span.to_otlp() for span in trace.spans]
+                }]
+            }]
+        }, ensure_ascii=False)
+        try:
+            with self._export_lock, open(self.export_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"Error exporting trace {trace.trace_id}: {e}")
+
+
+def _create_tracer() -> Tracer:
+    settings = get_settings()
+    return Tracer(settings.trace_store_size, settings.trace_export_path)
+
+
+# Singleton instance
+tracer = _create_tracer()
@@ -1,18 +1,64 @@
 """WhatsApp service for Meta Business API."""
+import asyncio
+import time
 import httpx
 from typing import Optional, Dict, Any
 from ..config import get_settings
+from .metrics import track_request
+
+
+class RateLimiter:
+    """Token bucket: ``rate`` requests per second with bursts up to ``burst``.
+
+    A caller over the limit reserves the next slot and sleeps until
+    it, so waiting callers go out in arrival order without a lock.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self.waits = 0
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            self.waits += 1
+            await asyncio.sleep(-self._tokens / self.rate)
 
 
 class WhatsAppService:
-    """Service for interacting with Meta WhatsApp Business API."""
+    """Service for interacting with Meta WhatsApp Business API.
 
-    def __init__(self):
+    One instance per phone number: the default one uses META_NUMBER_ID
+    and META_JWT_TOKEN, tenants (services/tenants.py) get their own.
+    Each keeps a pooled HTTP client and paces its sends with a rate
+    limiter, so one busy number cannot use up another's Graph quota.
+    """
+
+    def __init__(
+        self,
+        number_id: Optional[str] = None,
+        jwt_token: Optional[str] = None,
+        version: Optional[str] = None,
+        rate_per_second: Optional[float] = None
+    ):
         settings = get_settings()
-        self.jwt_token = settings.meta_jwt_token
-        self.number_id = settings.meta_number_id
-        self.version = settings.meta_version
+        self.jwt_token = settings.meta_jwt_token if jwt_token is None else jwt_token
+        self.number_id = settings.meta_number_id if number_id is None else number_id
+        self.version = version or settings.meta_version
         self.base_url = f"https://graph.facebook.com/{self.version}/{self.number_id}"
+        self.max_connections = settings.meta_http_max_connections
+        self.rate_limiter = RateLimiter(
+            settings.meta_rate_limit_per_second if rate_per_second is None else rate_per_second
+        )
+        self._client: Optional[httpx.AsyncClient] = None
 
         self.headers = {
             "Authorization": f"Bearer {self.jwt_token}",
@@ -23,6 +69,24 @@ class WhatsAppService:
         print(f"  Number ID: ...{self.number_id[-4:] if self.number_id else 'NOT SET'}")
         print(f"  API Version: {self.version}")
 
+    def _http(self) -> httpx.AsyncClient:
+        """Pooled client, created on first use; connections are kept alive between sends."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close the pooled HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     @staticmethod
     def normalize_phone_number(phone: str) -> str:
         """Clean phone number, keeping original format.
@@ -35,10 +99,21 @@ class WhatsAppService:
         phone = ''.join(c for c in phone if c.isdigit())
         return phone
 
+    async def _post(self, operation: str, payload: Dict[str, Any]) -> httpx.Response:
+        """POST to the Graph API messages endpoint, recording latency and status."""
+        await self.rate_limiter.acquire()
+        with track_request("graph", operation) as result:
+            response = await self._http().post(
+                f"{self.base_url}/messages",
+                json=payload,
+                headers=self.headers
+            )
+            result["status"] = str(response.status_code)
+            return response
+
     async def send_message(self, to: str, message: str) -> Dict[str, Any]:
         """Send a text message to a WhatsApp number."""
         to = self.normalize_phone_number(to)
-        url = f"{self.base_url}/messages"
 
         payload = {
             "messaging_product": "whatsapp",
@@ -52,28 +127,22 @@ class WhatsAppService:
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=self.headers,
-                    timeout=30.0
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    print(f"Message sent to {to}")
-                    return {
-                        "success": True,
-                        "message_id": data.get("messages", [{}])[0].get("id")
-                    }
-                else:
-                    print(f"Error sending message: {response.status_code}")
-                    print(f"Response: {response.text}")
-                    return {
-                        "success": False,
-                        "error": response.text
-                    }
+            response = await self._post("send_message", payload)
+
+            if response.status_code == 200:
+                data = response.json()
+                print(f"Message sent to {to}")
+                return {
+                    "success": True,
+                    "message_id": data.get("messages", [{}])[0].get("id")
+                }
+            else:
+                print(f"Error sending message: {response.status_code}")
+                print(f"Response: {response.text}")
+                return {
+                    "success": False,
+                    "error": response.text
+                }
 
         except Exception as e:
             print(f"Exception sending message: {str(e)}")
@@ -91,7 +160,6 @@ class WhatsAppService:
     ) -> Dict[str, Any]:
         """Send a template message."""
         to = self.normalize_phone_number(to)
-        url = f"{self.base_url}/messages"
 
         payload = {
             "messaging_product": "whatsapp",
@@ -110,25 +178,19 @@ class WhatsAppService:
             payload["template"]["components"] = components
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=self.headers,
-                    timeout=30.0
-                )
+            response = await self._post("send_template", payload)
 
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "message_id": data.get("messages", [{}])[0].get("id")
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": response.text
-                    }
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    "success": True,
+                    "message_id": data.get("messages", [{}])[0].get("id")
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": response.text
+                }
 
         except Exception as e:
             return {
@@ -138,7 +200,6 @@ class WhatsAppService:
 
     async def mark_as_read(self, message_id: str) -> bool:
         """Mark a message as read."""
-        url = f"{self.base_url}/messages"
 
         payload = {
             "messaging_product": "whatsapp",
@@ -147,14 +208,8 @@ class WhatsAppService:
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                return response.status_code == 200
+            response = await self._post("mark_as_read", payload)
+            return response.status_code == 200
 
         except Exception as e:
             print(f"Error marking as read: {str(e)}")
@@ -0,0 +1,185 @@
+"""Frontend build served from an in-memory manifest with precompressed variants."""
+import gzip
+import hashlib
+import mimetypes
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
+# Vite output names like assets/index-4f2a9c1b.js or assets/index-BdX3kJ9a.css never change content
+HASHED_NAME = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Everything else is revalidated against its ETag on each use
+REVALIDATE = "no-cache"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml",
+                      "image/svg+xml", "application/manifest+json", "application/wasm")
+# Smaller bodies gain nothing from compression
+MIN_COMPRESS_BYTES = 256
+# Larger files stay on disk and are streamed
+MAX_MEMORY_BYTES = 8 * 1024 * 1024
+
+mimetypes.add_type("text/javascript", ".js")
+mimetypes.add_type("text/javascript", ".mjs")
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+mimetypes.add_type("image/svg+xml", ".svg")
+
+
+class StaticAsset:
+    """One file: body, precompressed variants, strong ETag and cache policy."""
+
+    __slots__ = ("path", "content_type", "body", "variants", "etag", "cache_control", "file_path")
+
+    def __init__(self, path: str, body: bytes, content_type: str, cache_control: str = REVALIDATE,
+                 precompressed: Optional[Dict[str, bytes]] = None):
+        self.path = path
+        self.content_type = content_type
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+        self.cache_control = cache_control
+        self.file_path: Optional[Path] = None
+        self.variants: Dict[str, bytes] = {}
+
+        if len(body) >= MIN_COMPRESS_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+            precompressed = precompressed or {}
+            if brotli is not None and "br" not in precompressed:
+                precompressed["br"] = brotli.compress(body, quality=11)
+            if "gzip" not in precompressed:
+                precompressed["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            self.variants = {
+                encoding: data for encoding, data in precompressed.items() if len(data) < len(body)
+            }
+
+    @classmethod
+    def on_disk(cls, path: str, file_path: Path, content_type: str, cache_control: str) -> "StaticAsset":
+        """A file too large to hold in memory; its ETag comes from size and mtime."""
+        asset = cls.__new__(cls)
+        stat = file_path.stat()
+        asset.path = path
+        asset.content_type = content_type
+        asset.body = b""
+        asset.variants = {}
+        asset.etag = hashlib.sha256(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:20]
+        asset.cache_control = cache_control
+        asset.file_path = file_path
+        return asset
+
+    def _etag(self, encoding: Optional[str]) -> str:
+        # Each representation gets its own strong ETag
+        return f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+
+    def respond(self, request: Request) -> Response:
+        """200 with the best encoding the client accepts, or 304 if its copy is current."""
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = next((e for e in ("br", "gzip") if e in self.variants and e in accepted), None)
+        headers = {"ETag": self._etag(encoding), "Cache-Control": self.cache_control}
+        if self.variants:
+            headers["Vary"] = "Accept-Encoding"
+
+        if _etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+
+        if self.file_path is not None:
+            return FileResponse(self.file_path, media_type=self.content_type, headers=headers)
+        # Set explicitly so GZipMiddleware leaves already-encoded bodies alone
+        headers["Content-Encoding"] = encoding or "identity"
+        body = self.variants[encoding] if encoding else self.body
+        return Response(content=body, media_type=self.content_type, headers=headers)
+
+
+@lru_cache(maxsize=64)
+def _accepted_encodings(header: str) -> FrozenSet[str]:
+    """Encodings named in Accept-Encoding with a non-zero q (headers repeat, so cached)."""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            accepted.add(name.strip().lower())
+    if "*" in accepted:
+        accepted.update(("br", "gzip"))
+    return frozenset(accepted)
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match against any representation of the asset."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').split("-", 1)[0] == etag:
+            return True
+    return False
+
+
+def _content_type(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def html_asset(name: str, html: str, cache_control: str = REVALIDATE) -> StaticAsset:
+    """An inline HTML page as a precompressed asset."""
+    return StaticAsset(name, html.encode("utf-8"), "text/html", cache_control)
+
+
+class StaticManifest:
+    """The frontend build directory, read once into memory.
+
+    Requests are dict lookups: no filesystem calls on the event loop,
+    and no per-request compression. Build-time .br/.gz siblings are
+    used as variants when present instead of compressing again.
+    """
+
+    def __init__(self, root: Optional[Path]):
+        self.root = root
+        self.assets: Dict[str, StaticAsset] = {}
+        self.index: Optional[StaticAsset] = None
+        self.total_bytes = 0
+        if root is not None and root.is_dir():
+            self._scan(root)
+
+    def _scan(self, root: Path) -> None:
+        for file_path in sorted(root.rglob("*")):
+            if not file_path.is_file() or file_path.suffix in (".br", ".gz"):
+                continue
+            path = file_path.relative_to(root).as_posix()
+            content_type = _content_type(path)
+            cache_control = IMMUTABLE if HASHED_NAME.match(path) else REVALIDATE
+
+            if file_path.stat().st_size > MAX_MEMORY_BYTES:
+                self.assets[path] = StaticAsset.on_disk(path, file_path, content_type, cache_control)
+                continue
+
+            precompressed = {}
+            for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+                sibling = file_path.with_name(file_path.name + suffix)
+                if sibling.is_file():
+                    precompressed[encoding] = sibling.read_bytes()
+            asset = StaticAsset(path, file_path.read_bytes(), content_type, cache_control, precompressed)
+            self.assets[path] = asset
+            self.total_bytes += len(asset.body) + sum(len(v) for v in asset.variants.values())
+
+        self.index = self.assets.get("index.html")
+        print(f"Frontend manifest: {len(self.assets)} files, {self.total_bytes / 1024:.0f} KiB in memory"
+              f"{'' if brotli is not None else ' (brotli not installed: gzip only)'}")
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self.assets.get(path)
@@ -0,0 +1,61 @@
+"""Queue worker: answers the messages the web process stored with WEBHOOK_MODE=queue.
+
+Run it next to the web process, on the same disk as INBOUND_QUEUE_PATH:
+
+    python -m backend.app.worker
+
+Slow Grok calls then only hold up this process; the webhook keeps
+answering Meta in milliseconds. Several workers may share one queue.
+"""
+import asyncio
+import signal
+
+from .config import get_settings
+from .routers.webhook import process_message
+from .services.config_service import config_service
+from .services.conversation_state import conversation_store
+from .services.inbound_queue import inbound_queue
+from .services.message_dispatcher import message_dispatcher
+from .services.tenants import tenant_registry
+
+
+async def run_worker(concurrency: int, poll_interval: float) -> None:
+    """Claim and process messages until SIGTERM/SIGINT, then drain the ones in hand."""
+    settings = get_settings()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:  # Windows dev machines
+            pass
+
+    config_watch_task = asyncio.create_task(
+        config_service.watch_changes(settings.config_watch_interval_ms / 1000)
+    )
+    message_dispatcher.start(process_message)
+    consume_task = asyncio.create_task(message_dispatcher.consume(concurrency, poll_interval))
+    print(f"Worker {inbound_queue.consumer_id} consuming {inbound_queue.db_path} "
+          f"(concurrency {concurrency})")
+
+    try:
+        await stopping.wait()
+    finally:
+        # Unfinished messages go back to the queue for another worker or the next start
+        await message_dispatcher.drain(settings.shutdown_drain_timeout_ms / 1000)
+        await consume_task
+        config_watch_task.cancel()
+        config_service.flush()
+        await tenant_registry.close()
+        await conversation_store.close()
+        inbound_queue.close()
+        print("Worker stopped")
+
+
+def main() -> None:
+    settings = get_settings()
+    asyncio.run(run_worker(max(1, settings.worker_concurrency), settings.worker_poll_interval_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""Point every on-disk store at a temporary directory before the app is imported."""
+import os
+import tempfile
+
+_STATE_DIR = tempfile.mkdtemp(prefix="karuna-tests-")
+
+for _name, _file in {
+    "CONFIG_FILE_PATH": "bot-config.json",
+    "CONFIG_DB_PATH": "bot-config.db",
+    "APPOINTMENTS_DB_PATH": "appointments.db",
+    "SHEETS_QUEUE_PATH": "sheets-queue.db",
+    "REMINDERS_DB_PATH": "reminders.db",
+    "INBOUND_QUEUE_PATH": "inbound-queue.db",
+    "TENANTS_FILE_PATH": "tenants.json",
+}.items():
+    os.environ.setdefault(_name, os.path.join(_STATE_DIR, _file))
+os.environ.setdefault("GOOGLE_CREDENTIALS_PATH", os.path.join(_STATE_DIR, "missing-credentials.json"))
@@ -0,0 +1,126 @@
+"""Appointment reconciler: Calendar event ids and when it gives up."""
+import asyncio
+import threading
+from datetime import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app.services.appointment_ledger import (
+    SYNC_FAILED,
+    SYNC_PENDING,
+    AppointmentLedger,
+    booking_id_for,
+    calendar_event_id
+)
+from backend.app.services.availability_index import AvailabilityIndex
+from backend.app.services.google_service import google_service
+
+DATOS = {
+    "name": "Ana", "company": "ACME", "email": "ana@example.com", "phone": "5215512345678",
+    "service": "Consultoria", "date": "2030-01-07", "time": "10:00"
+}
+
+
+class FakeHttpError(Exception):
+    def __init__(self, status, message=""):
+        super().__init__(message or f"HTTP {status}")
+        self.resp = SimpleNamespace(status=status)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(google_service, "ledger", AppointmentLedger(str(tmp_path / "appointments.db")))
+    monkeypatch.setattr(google_service, "max_sync_attempts", 3)
+    async def enqueue(row):
+        return 1
+
+    monkeypatch.setattr(google_service.sheets_queue, "enqueue", enqueue)
+
+    async def ready():
+        return True
+
+    monkeypatch.setattr(google_service, "_clients_ready", ready)
+    monkeypatch.setattr(google_service, "availability", AvailabilityIndex(time(9), time(18), [0, 1, 2, 3, 4]))
+    monkeypatch.setattr(google_service, "_booking_lock", asyncio.Lock())
+    return google_service
+
+
+def _fail_calendar(monkeypatch, service, error):
+    async def insert(appointment):
+        raise error
+
+    monkeypatch.setattr(service, "_insert_event", insert)
+
+
+def test_event_id_is_base32hex():
+    assert calendar_event_id(booking_id_for("521", "2030-01-07", "10:00")) == booking_id_for("521", "2030-01-07", "10:00")
+    for booking_id in ("CRM-Order#42", "xyz", "ABCDEF123456"):
+        event_id = calendar_event_id(booking_id)
+        assert event_id != booking_id
+        assert set(event_id) <= set("0123456789abcdef") and len(event_id) == 32
+    assert calendar_event_id("CRM-Order#42") == calendar_event_id("CRM-Order#42")
+
+
+def test_event_body_uses_a_valid_id(service):
+    body = service._event_body({**DATOS, "id": "CRM-Order#42"})
+    assert body["id"] == calendar_event_id("CRM-Order#42")
+
+
+def test_client_error_is_permanent(service, monkeypatch):
+    service.ledger.create(DATOS, "crm-1")
+    _fail_calendar(monkeypatch, service, FakeHttpError(400, "Invalid resource id value."))
+
+    appointment = asyncio.run(service._sync_appointment(service.ledger.get("crm-1")))
+
+    assert appointment["calendar_status"] == SYNC_FAILED
+    assert service.ledger.due_for_sync() == []
+    assert service.ledger.counts()["sync_failed"] == 1
+
+
+def test_rate_limit_is_retried(service, monkeypatch):
+    service.ledger.create(DATOS, "crm-2")
+    _fail_calendar(monkeypatch, service, FakeHttpError(403, "Rate Limit Exceeded: rateLimitExceeded"))
+
+    appointment = asyncio.run(service._sync_appointment(service.ledger.get("crm-2")))
+
+    assert appointment["calendar_status"] == SYNC_PENDING
+    assert appointment["attempts"] == 1
+
+
+def test_gives_up_after_max_attempts(service, monkeypatch):
+    service.ledger.create(DATOS, "crm-3")
+    _fail_calendar(monkeypatch, service, asyncio.TimeoutError())
+
+    for _ in range(3):
+        appointment = asyncio.run(service._sync_appointment(service.ledger.get("crm-3")))
+
+    assert appointment["calendar_status"] == SYNC_FAILED
+    assert appointment["attempts"] == 3
+
+
+def test_concurrent_bookings_of_one_slot(service, monkeypatch):
+    writer_threads = set()
+    create = service.ledger.create
+
+    def record_thread(*args):
+        writer_threads.add(threading.current_thread())
+        return create(*args)
+
+    async def insert(appointment):
+        return {"id": "evt", "htmlLink": None}
+
+    monkeypatch.setattr(service.ledger, "create", record_thread)
+    monkeypatch.setattr(service, "_insert_event", insert)
+
+    async def scenario():
+        return await asyncio.gather(
+            service.registrar_cita(DATOS),
+            service.registrar_cita({**DATOS, "phone": "5215599999999"})
+        )
+
+    first, second = asyncio.run(scenario())
+
+    assert first["success"] and first["status"] == "confirmed"
+    assert second.get("slot_taken")
+    assert threading.main_thread() not in writer_threads
@@ -0,0 +1,21 @@
+"""Config-versioned ETags on the admin APIs."""
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.routers.blacklist import router
+
+
+def test_query_values_stay_out_of_the_etag():
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    response = client.get("/api/blacklist", params={"prefix": '52" €'})
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert re.fullmatch(r'"cfg-[^"]+-[0-9a-f]{16}"', etag)
+
+    again = client.get("/api/blacklist", params={"prefix": '52" €'}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
@@ -0,0 +1,72 @@
+"""Config store backends: blacklist writes stay consistent with the file/database."""
+import json
+
+import pytest
+
+from backend.app.services.config_store import ConfigStore, JsonConfigStore, SqliteConfigStore
+
+DEFAULT_CONFIG = {"blacklist": [], "blacklistPrefixes": [], "customFlows": {}}
+
+
+def _json_store(tmp_path, config):
+    path = tmp_path / "bot-config.json"
+    path.write_text(json.dumps(config))
+    return JsonConfigStore(str(path), 0, DEFAULT_CONFIG), path
+
+
+def test_remove_legacy_formatted_number_from_file(tmp_path):
+    store, path = _json_store(tmp_path, {**DEFAULT_CONFIG, "blacklist": ["+52 155 1234 5678", "5215500000000"]})
+
+    assert store.blacklist_remove(["5215512345678"]) == 1
+    store.flush()
+
+    assert json.loads(path.read_text())["blacklist"] == ["5215500000000"]
+    assert not JsonConfigStore(str(path), 0, DEFAULT_CONFIG).is_blacklisted("5215512345678")
+
+
+def test_add_keeps_only_the_normalized_form(tmp_path):
+    store, path = _json_store(tmp_path, {**DEFAULT_CONFIG, "blacklist": ["+52 155 1234 5678"]})
+
+    assert store.blacklist_add(["+52 155 9999 0000", "52 155 1234 5678"]) == 1
+    store.flush()
+
+    assert json.loads(path.read_text())["blacklist"] == ["5215512345678", "5215599990000"]
+
+
+def test_prefix_rules_are_normalized_in_the_file(tmp_path):
+    store, path = _json_store(tmp_path, {**DEFAULT_CONFIG, "blacklistPrefixes": ["+1 555"]})
+
+    assert store.remove_prefix("1555")
+    store.flush()
+
+    assert json.loads(path.read_text())["blacklistPrefixes"] == []
+
+
+def test_sqlite_noop_writes_keep_the_version(tmp_path):
+    store = SqliteConfigStore(str(tmp_path / "config.db"), DEFAULT_CONFIG)
+    assert store.insert_flow("ventas", {"name": "Ventas"})
+    store.blacklist_add(["5215512345678"])
+    store.add_prefix("521")
+    version = store.version()
+
+    assert not store.insert_flow("ventas", {"name": "Otra"})
+    assert not store.update_flow("no-existe", {"name": "x"})
+    assert store.blacklist_add([]) == 0
+    assert store.blacklist_add(["5215512345678"]) == 0
+    assert not store.remove_prefix("999")
+    assert store.version() == version
+
+    assert store.blacklist_remove(["5215512345678"]) == 1
+    assert store.version() == version + 1
+
+
+def test_backend_missing_a_method_fails_when_created():
+    assert not JsonConfigStore.__abstractmethods__
+    assert not SqliteConfigStore.__abstractmethods__
+
+    class SettingsOnly(ConfigStore):
+        def get_setting(self, key, default=None):
+            return default
+
+    with pytest.raises(TypeError):
+        SettingsOnly()
@@ -0,0 +1,72 @@
+"""Redis conversation store: two workers sharing one Redis keep their near-caches consistent."""
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from backend.app.services.conversation_state import RedisConversationStore  # noqa: E402
+
+KEY = "5215512345678"
+
+
+def _store(server):
+    store = RedisConversationStore("redis://localhost:6379/0", max_messages=4)
+    store.client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    return store
+
+
+def _texts(state):
+    return [message["content"] for message in state.history]
+
+
+def test_near_cache_sees_writes_from_another_worker():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        a, b = _store(server), _store(server)
+
+        await a.append(KEY, [{"role": "user", "content": "hola"}])
+        assert _texts(await a.load(KEY)) == ["hola"]
+        assert _texts(await a.load(KEY)) == ["hola"]
+        assert a.stats["near_hits"] == 1
+
+        # The next turn lands on the other worker
+        await b.append(KEY, [{"role": "assistant", "content": "buenas"}])
+        assert _texts(await a.load(KEY)) == ["hola", "buenas"]
+        assert a.stats["near_misses"] == 2
+
+        # A's own write extends its cached copy without a reload
+        await a.append(KEY, [{"role": "user", "content": "cita"}])
+        state = await a.load(KEY)
+        assert _texts(state) == ["hola", "buenas", "cita"]
+        assert a.stats["near_hits"] == 2
+
+        await b.clear(KEY)
+        state = await a.load(KEY)
+        assert state.history == [] and state.menu_shown is False
+        assert _texts(await b.load(KEY)) == []
+
+    asyncio.run(scenario())
+
+
+def test_history_is_trimmed_for_every_worker():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        a, b = _store(server), _store(server)
+        for i in range(3):
+            await a.append(KEY, [{"role": "user", "content": f"a{i}"}])
+            await b.append(KEY, [{"role": "assistant", "content": f"b{i}"}])
+        return _texts(await a.load(KEY)), _texts(await b.load(KEY))
+
+    assert asyncio.run(scenario()) == (["a1", "b1", "a2", "b2"], ["a1", "b1", "a2", "b2"])
+
+
+def test_falls_back_to_memory_when_redis_is_down():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        server.connected = False
+        store = _store(server)
+        await store.append(KEY, [{"role": "user", "content": "hola"}])
+        return _texts(await store.load(KEY)), store.stats["errors"]
+
+    assert asyncio.run(scenario()) == (["hola"], 2)
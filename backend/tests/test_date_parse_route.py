@@ -0,0 +1,38 @@
+"""/api/parse-date when Grok's answer is incomplete."""
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.routers.dates import router
+from backend.app.services.date_parser_service import date_parser_service
+
+# Nothing the local parser resolves on its own, so it goes to Grok
+TEXT = "cuando salga de la junta del consejo"
+
+
+def _client(monkeypatch, answer):
+    async def fake_complete(prompt):
+        return json.dumps(answer)
+
+    monkeypatch.setattr(date_parser_service, "client", object())
+    monkeypatch.setattr(date_parser_service, "_complete", fake_complete)
+    monkeypatch.setattr(date_parser_service, "_cache", type(date_parser_service._cache)())
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_missing_interpretation_is_null(monkeypatch):
+    client = _client(monkeypatch, {"fecha": "2025-10-28", "hora": "18:00", "interpretacion": None})
+
+    response = client.post("/api/parse-date", json={"text": TEXT})
+    assert response.status_code == 200
+    assert response.json() == {"date": "2025-10-28", "time": "18:00", "interpretation": None}
+
+
+def test_missing_date_is_422(monkeypatch):
+    client = _client(monkeypatch, {"fecha": None, "hora": None, "interpretacion": "Sin fecha"})
+
+    response = client.post("/api/parse-date", json={"text": TEXT})
+    assert response.status_code == 422
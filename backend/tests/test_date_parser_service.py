@@ -0,0 +1,90 @@
+"""DateParserService: Grok calls never block the event loop; results are cached."""
+import asyncio
+import json
+import time
+
+import httpx
+from openai import AsyncOpenAI
+
+from backend.app.services.date_parser_service import DateParserService
+
+GROK_DELAY = 0.3
+# None of these resolve locally
+TEXTS = [
+    "cuando salga de la junta",
+    "despues de la comida del consejo",
+    "al terminar el cierre contable",
+    "en cuanto regrese de viaje"
+]
+
+
+def _service():
+    calls = []
+
+    async def grok(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(GROK_DELAY)
+        content = json.dumps({"fecha": "2025-10-28", "hora": "18:00", "interpretacion": "Martes a las 6 PM"})
+        return httpx.Response(200, json={
+            "id": "test", "object": "chat.completion", "created": 0, "model": "grok",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}]
+        })
+
+    service = DateParserService()
+    service.client = AsyncOpenAI(
+        api_key="test",
+        base_url="http://grok.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(grok))
+    )
+    return service, calls
+
+
+def test_event_loop_stays_responsive_during_parses():
+    service, calls = _service()
+
+    async def scenario():
+        gaps = []
+        done = asyncio.Event()
+
+        async def ticker():
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        tick = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        results = await asyncio.gather(*(service.parsear_fecha_hora(text) for text in TEXTS))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await tick
+        return results, elapsed, max(gaps)
+
+    results, elapsed, longest_gap = asyncio.run(scenario())
+
+    assert all(result and result["time"] == "18:00" for result in results)
+    assert len(calls) == len(TEXTS)
+    # Parses overlap instead of queueing, and the loop keeps ticking meanwhile
+    assert elapsed < GROK_DELAY * 2
+    assert longest_gap < 0.1
+
+
+def test_cache_stats():
+    service, calls = _service()
+
+    async def scenario():
+        await service.parsear_fecha_hora("mañana a las 10")
+        await service.parsear_fecha_hora("Mañana a las 10")
+        await asyncio.gather(service.parsear_fecha_hora(TEXTS[0]), service.parsear_fecha_hora(TEXTS[0]))
+        await service.parsear_fecha_hora(TEXTS[0])
+
+    asyncio.run(scenario())
+
+    stats = service.get_stats()
+    assert (stats["local"], stats["llm"]) == (1, 1)
+    assert len(calls) == 1
+    assert (stats["hits"], stats["misses"]) == (2, 3)
+    assert stats["size"] == 2
+    assert stats["hit_rate"] == 0.4
@@ -0,0 +1,58 @@
+"""GoogleService._execute: blocking googleapiclient calls run off the event loop, with a timeout."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.app.services.google_service import google_service
+
+
+class SlowRequest:
+    """Stand-in for a googleapiclient HttpRequest that blocks like a Google round trip."""
+    methodId = "calendar.events.insert"
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.thread = None
+
+    def execute(self, http=None):
+        self.thread = threading.current_thread().name
+        time.sleep(self.seconds)
+        return {"id": "evt"}
+
+
+@pytest.fixture(autouse=True)
+def no_credentials(monkeypatch):
+    monkeypatch.setattr(google_service, "_thread_http", lambda: None)
+
+
+def test_execute_times_out():
+    async def scenario():
+        start = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            await google_service._execute(SlowRequest(0.5), timeout=0.05)
+        return time.perf_counter() - start
+
+    assert asyncio.run(scenario()) < 0.3
+
+
+def test_execute_runs_on_the_google_pool():
+    request = SlowRequest(0.2)
+
+    async def scenario():
+        gaps = []
+        call = asyncio.create_task(google_service._execute(request))
+        last = time.perf_counter()
+        while not call.done():
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+        return await call, max(gaps)
+
+    result, longest_gap = asyncio.run(scenario())
+
+    assert result == {"id": "evt"}
+    assert request.thread.startswith("google-api")
+    assert longest_gap < 0.1
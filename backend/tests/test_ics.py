@@ -0,0 +1,39 @@
+"""iCalendar rendering: user input never adds lines to the feed."""
+from backend.app.services.ics import mailto, render_event
+
+APPOINTMENT = {
+    "id": "abc123", "name": "Ana", "company": "ACME", "service": "Consultoria",
+    "date": "2030-01-07", "time": "10:00", "status": "confirmed"
+}
+
+
+def _lines(event):
+    return event.split("\r\n")
+
+
+def test_email_with_line_break_is_left_out():
+    event = render_event({**APPOINTMENT, "email": "x@y.com\r\nBEGIN:VALARM"}, "https://meet.test", "citas@karuna.test")
+
+    assert "BEGIN:VALARM" not in _lines(event)
+    assert not any(line.startswith("ATTENDEE") for line in _lines(event))
+    assert "ORGANIZER;CN=Karuna:mailto:citas@karuna.test" in _lines(event)
+
+
+def test_booking_id_with_line_break_stays_in_the_uid():
+    event = render_event({**APPOINTMENT, "id": "crm-1\r\nBEGIN:VALARM", "email": ""}, "https://meet.test", "")
+
+    assert "BEGIN:VALARM" not in _lines(event)
+    assert "UID:crm-1\\nBEGIN:VALARM@karuna.es.com" in _lines(event)
+
+
+def test_plain_email_is_an_attendee():
+    event = render_event({**APPOINTMENT, "email": " ana@example.com "}, "https://meet.test", "")
+
+    assert "ATTENDEE;CN=Ana;RSVP=TRUE:mailto:ana@example.com" in _lines(event)
+    assert not any(line.startswith("ORGANIZER") for line in _lines(event))
+
+
+def test_mailto_rejects_control_characters_and_delimiters():
+    for email in ("a@b.com\nX", "a@b.com\x00", "a;x=1@b.com", "a@b.com:x", "a b@c.com", "nobody", ""):
+        assert mailto(email) is None
+    assert mailto("ana.perez+citas@example.com.mx") == "mailto:ana.perez+citas@example.com.mx"
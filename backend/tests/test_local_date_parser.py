@@ -0,0 +1,91 @@
+"""Corpus test for the rule-based Spanish date/time parser."""
+from datetime import datetime
+
+import pytest
+
+from backend.app.services.local_date_parser import (
+    CONFIDENCE_THRESHOLD,
+    TIMEZONE,
+    parse_spanish_datetime
+)
+
+# Monday 27 October 2025, 10:00 in Mexico City
+NOW = TIMEZONE.localize(datetime(2025, 10, 27, 10, 0))
+
+# (text, expected "YYYY-MM-DD HH:MM", or None when the LLM should decide)
+CORPUS = [
+    ("mañana a las 3", "2025-10-28 15:00"),
+    ("manana a las 10 am", "2025-10-28 10:00"),
+    ("hoy a las 5 de la tarde", "2025-10-27 17:00"),
+    ("pasado mañana a las 11", "2025-10-29 11:00"),
+    ("el próximo viernes a las 10 am", "2025-10-31 10:00"),
+    ("el viernes a las 4 pm", "2025-10-31 16:00"),
+    ("este lunes a las 6 pm", "2025-10-27 18:00"),
+    ("el lunes a las 9", "2025-11-03 09:00"),
+    ("miércoles a las 12:30", "2025-10-29 12:30"),
+    ("dentro de 3 dias a las 2", "2025-10-30 14:00"),
+    ("en dos días a las 11 am", "2025-10-29 11:00"),
+    ("15/11 a las 16:30", "2025-11-15 16:30"),
+    ("3/11/2025 a las 10:00", "2025-11-03 10:00"),
+    ("2025-11-04 a las 13:00", "2025-11-04 13:00"),
+    ("el 7 de noviembre a las 10 am", "2025-11-07 10:00"),
+    ("7 nov a las 5 pm", "2025-11-07 17:00"),
+    ("viernes 7 nov a las 3", "2025-11-07 15:00"),
+    ("12 dic a las 11 am", "2025-12-12 11:00"),
+    ("el 2 de enero a las 9 am", "2026-01-02 09:00"),
+    ("mañana al mediodía", "2025-10-28 12:00"),
+    ("mañana a las 3 y media", "2025-10-28 15:30"),
+    ("el jueves a las 10 de la mañana", "2025-10-30 10:00"),
+    ("mañana en la mañana a las 9", "2025-10-28 09:00"),
+    ("martes 4 de noviembre 5:15 pm", "2025-11-04 17:15"),
+    # Ranges, alternatives and contradictions go to the LLM
+    ("mañana a las 3-4 pm", None),
+    ("mañana a las 12 de la noche", None),
+    ("el lunes de 3-4", None),
+    ("jueves 7 nov a las 3", None),
+    ("mañana viernes a las 10", None),
+    ("mañana o el jueves a las 10", None),
+    ("el lunes no puedo, el martes a las 4", None),
+    ("entre 3 y 5 el miércoles", None),
+    ("el 15 a las 3", None),
+    ("cuando puedas", None),
+    ("gracias", None),
+]
+
+
+def _resolve(text):
+    result = parse_spanish_datetime(text, NOW)
+    if not result or result["confidence"] < CONFIDENCE_THRESHOLD:
+        return None
+    return f"{result['date']} {result['time']}"
+
+
+@pytest.mark.parametrize("text,expected", CORPUS)
+def test_corpus(text, expected):
+    assert _resolve(text) == expected
+
+
+def test_hour_range_is_not_a_date():
+    result = parse_spanish_datetime("mañana a las 3-4 pm", NOW)
+    assert result["date"] == "2025-10-28"
+    assert result["time"] == "15:00"
+
+
+def test_weekday_that_disagrees_with_the_date():
+    # 7 November 2026 is a Saturday
+    now = TIMEZONE.localize(datetime(2026, 4, 2, 10, 0))
+    result = parse_spanish_datetime("viernes 7 nov a las 3", now)
+    assert result["date"] == "2026-11-07"
+    assert result["confidence"] < CONFIDENCE_THRESHOLD
+
+
+def test_month_abbreviations_do_not_shadow_full_names():
+    assert _resolve("7 septiembre a las 5 pm") == "2026-09-07 17:00"
+    assert _resolve("7 sept a las 5 pm") == "2026-09-07 17:00"
+
+
+def test_twelve_at_night_is_midnight():
+    result = parse_spanish_datetime("mañana a las 12 de la noche", NOW)
+    assert result["time"] == "00:00"
+    assert result["confidence"] < CONFIDENCE_THRESHOLD
+    assert _resolve("mañana a las 12 de la madrugada") == "2025-10-28 00:00"
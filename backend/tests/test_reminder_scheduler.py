@@ -0,0 +1,146 @@
+"""Reminder dispatch: shutdown finishes the batch in flight, each tenant sends from its own number."""
+import asyncio
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+from backend.app.services.reminder_scheduler import FAILED, PENDING, SENT, ReminderScheduler
+
+scheduler_module = sys.modules["backend.app.services.reminder_scheduler"]
+
+
+def _scheduler(tmp_path, count):
+    scheduler = ReminderScheduler(str(tmp_path / "reminders.db"), "recordatorio", batch_size=2)
+    now = time.time()
+    scheduler._connection().executemany(
+        "INSERT INTO reminders (id, booking_id, phone, starts_at, offset_minutes, due_at, status) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(f"b{i}:60", f"b{i}", "5215512345678", now + 3600, 60, now - 10 + i, PENDING) for i in range(count)]
+    )
+    return scheduler
+
+
+def _statuses(scheduler):
+    return [row[0] for row in scheduler._connection().execute("SELECT status FROM reminders ORDER BY due_at")]
+
+
+def test_stop_finishes_the_batch_in_flight(tmp_path, monkeypatch):
+    scheduler = _scheduler(tmp_path, 4)
+    started = asyncio.Event()
+
+    async def slow_send(phone, template, language, components):
+        started.set()
+        await asyncio.sleep(0.05)
+        return {"success": True, "message_id": "wamid.test"}
+
+    monkeypatch.setattr(scheduler_module.tenant_registry.get("default").whatsapp, "send_template", slow_send)
+
+    async def scenario():
+        task = asyncio.create_task(scheduler.dispatch_due())
+        await started.wait()
+        scheduler.stop()
+        return await task
+
+    try:
+        assert asyncio.run(scenario()) == 2
+        assert _statuses(scheduler) == [SENT, SENT, PENDING, PENDING]
+    finally:
+        scheduler.close()
+
+
+def test_run_returns_after_stop(tmp_path):
+    scheduler = _scheduler(tmp_path, 0)
+
+    async def scenario():
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.01)
+        scheduler.stop()
+        await asyncio.wait_for(task, 1)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        scheduler.close()
+
+
+def _appointment(booking_id):
+    return {
+        "id": booking_id, "phone": "5215512345678", "name": "Ana", "service": "Consultoria",
+        "date": time.strftime("%Y-%m-%d", time.localtime(time.time() + 86400)), "time": "23:00"
+    }
+
+
+def test_reminder_is_sent_from_the_tenants_number(tmp_path, monkeypatch):
+    scheduler = ReminderScheduler(str(tmp_path / "reminders.db"), "recordatorio", batch_size=2)
+    sent_by = []
+    writer_threads = set()
+    update = scheduler._update
+
+    def record_thread(*args):
+        writer_threads.add(threading.current_thread())
+        return update(*args)
+
+    def sender(tenant_id):
+        async def send_template(phone, template, language, components):
+            sent_by.append(tenant_id)
+            return {"success": True, "message_id": "wamid.test"}
+        return SimpleNamespace(whatsapp=SimpleNamespace(send_template=send_template))
+
+    monkeypatch.setitem(scheduler_module.tenant_registry._by_id, "acme", sender("acme"))
+    monkeypatch.setattr(scheduler_module.tenant_registry.get("default").whatsapp, "send_template",
+                        sender("default").whatsapp.send_template)
+    monkeypatch.setattr(scheduler, "_update", record_thread)
+
+    async def scenario():
+        assert await scheduler.schedule(_appointment("b-acme"), "acme") > 0
+        assert await scheduler.schedule(_appointment("b-gone"), "gone") > 0
+        scheduler._connection().execute("UPDATE reminders SET due_at = ?", (time.time() - 1,))
+        return await scheduler.dispatch_due()
+
+    try:
+        asyncio.run(scenario())
+        acme = scheduler.for_booking("b-acme")
+        assert {r["tenant_id"] for r in acme} == {"acme"}
+        assert {r["status"] for r in acme} == {SENT}
+        assert sent_by and set(sent_by) == {"acme"}
+        assert {r["status"] for r in scheduler.for_booking("b-gone")} == {FAILED}
+        assert threading.main_thread() not in writer_threads
+    finally:
+        scheduler.close()
+
+
+def test_old_database_gets_the_tenant_column(tmp_path):
+    import sqlite3
+
+    db_path = str(tmp_path / "reminders.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE reminders (id TEXT PRIMARY KEY, booking_id TEXT NOT NULL, phone TEXT NOT NULL, "
+        "name TEXT, service TEXT, starts_at REAL NOT NULL, offset_minutes INTEGER NOT NULL, "
+        "due_at REAL NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+        "last_error TEXT, message_id TEXT, sent_at REAL)"
+    )
+    conn.execute(
+        "INSERT INTO reminders (id, booking_id, phone, starts_at, offset_minutes, due_at, status) "
+        "VALUES ('b:60', 'b', '5215512345678', 0, 60, 0, 'pending')"
+    )
+    conn.commit()
+    conn.close()
+
+    scheduler = ReminderScheduler(db_path, "recordatorio")
+    try:
+        assert scheduler.for_booking("b")[0]["tenant_id"] == "default"
+    finally:
+        scheduler.close()
+
+
+def test_database_is_opened_on_first_use(tmp_path):
+    db_path = tmp_path / "reminders.db"
+    scheduler = ReminderScheduler(str(db_path), "recordatorio")
+    try:
+        assert not db_path.exists()
+        assert scheduler.pending() == 0
+        assert db_path.exists()
+    finally:
+        scheduler.close()
@@ -0,0 +1,60 @@
+"""Sheets write-behind queue: failed flushes are counted and backed off."""
+import asyncio
+
+from backend.app.services.sheets_queue import SheetsWriteQueue
+
+
+def _queue(tmp_path, append_rows, interval=2.0):
+    return SheetsWriteQueue(str(tmp_path / "sheets-queue.db"), append_rows, batch_size=10, interval=interval)
+
+
+def test_failed_append_backs_off_and_keeps_rows(tmp_path):
+    calls = []
+
+    async def append_rows(rows):
+        calls.append(rows)
+        if len(calls) == 1:
+            raise TimeoutError("quota")
+
+    queue = _queue(tmp_path, append_rows)
+
+    async def scenario():
+        await queue.enqueue(["a", 1])
+        await queue.enqueue(["b", 2])
+        failed = await queue.flush()
+        skipped = await queue.flush()
+        forced = await queue.flush(force=True)
+        return failed, skipped, forced
+
+    try:
+        assert asyncio.run(scenario()) == (0, 0, 2)
+        assert calls == [[["a", 1], ["b", 2]], [["a", 1], ["b", 2]]]
+        assert queue.stats["errors"] == 1 and queue.pending() == 0
+    finally:
+        queue.close()
+
+
+def test_flush_errors_are_backed_off(tmp_path):
+    async def append_rows(rows):
+        pass
+
+    queue = _queue(tmp_path, append_rows, interval=0.01)
+
+    def broken_batch():
+        raise OSError("disk I/O error")
+
+    queue._next_batch = broken_batch
+
+    async def scenario():
+        task = asyncio.create_task(queue.run())
+        await asyncio.sleep(0.2)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    try:
+        asyncio.run(scenario())
+        # About 20 intervals passed; only the first one tried
+        assert queue.stats["errors"] == 1
+        assert queue.get_stats()["last_error"] == "disk I/O error"
+    finally:
+        queue.close()
@@ -0,0 +1,50 @@
+"""Webhook behaviour when the inbound queue cannot store a payload."""
+import sqlite3
+import sys
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.routers.webhook import router
+from backend.app.services.inbound_queue import inbound_queue
+
+webhook_module = sys.modules["backend.app.routers.webhook"]
+
+PAYLOAD = {
+    "object": "whatsapp_business_account",
+    "entry": [{"changes": [{"value": {"messages": [{"id": "wamid.journal-test", "from": "5215512345678"}]}}]}]
+}
+
+
+def _client():
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def _broken_enqueue(*args, **kwargs):
+    raise sqlite3.OperationalError("database is locked")
+
+
+def test_inline_mode_processes_without_journal(monkeypatch):
+    processed = []
+
+    async def fake_process(body, received_at):
+        processed.append(body)
+
+    monkeypatch.setattr(webhook_module, "process_message", fake_process)
+    monkeypatch.setattr(inbound_queue, "enqueue", _broken_enqueue)
+
+    response = _client().post("/webhook", json=PAYLOAD)
+    assert response.status_code == 200
+    assert response.json() == {"status": "received"}
+    assert processed == [PAYLOAD]
+
+
+def test_queue_mode_asks_meta_to_redeliver(monkeypatch):
+    monkeypatch.setattr(webhook_module, "get_settings", lambda: SimpleNamespace(webhook_mode="queue"))
+    monkeypatch.setattr(inbound_queue, "enqueue", _broken_enqueue)
+
+    response = _client().post("/webhook", json=PAYLOAD)
+    assert response.status_code == 503
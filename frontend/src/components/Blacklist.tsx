@@ -7,6 +7,7 @@ interface Props {
 
 export default function Blacklist({ onAlert }: Props) {
   const [numbers, setNumbers] = useState<string[]>([]);
+  const [count, setCount] = useState(0);
   const [newNumber, setNewNumber] = useState('');
   const [loading, setLoading] = useState(true);
 
@@ -18,6 +19,7 @@ export default function Blacklist({ onAlert }: Props) {
     try {
       const data = await getBlacklist();
       setNumbers(data.blacklist);
+      setCount(data.count);
     } catch (error) {
       console.error('Error loading blacklist:', error);
       onAlert('Error al cargar la lista negra', 'error');
@@ -35,6 +37,7 @@ export default function Blacklist({ onAlert }: Props) {
     try {
       const data = await addToBlacklist(newNumber.trim());
       setNumbers(data.blacklist);
+      setCount(data.count);
       setNewNumber('');
       onAlert(`Numero ${newNumber} agregado a la lista negra`, 'success');
     } catch (error) {
@@ -47,6 +50,7 @@ export default function Blacklist({ onAlert }: Props) {
     try {
       const data = await removeFromBlacklist(number);
       setNumbers(data.blacklist);
+      setCount(data.count);
       onAlert(`Numero ${number} removido de la lista negra`, 'success');
     } catch (error) {
       console.error('Error removing from blacklist:', error);
@@ -60,7 +64,7 @@ export default function Blacklist({ onAlert }: Props) {
         <div className="card-icon bg-red-500">B</div>
         <div>
           <h2 className="text-xl font-semibold">Lista Negra</h2>
-          <p className="text-sm text-gray-500">{numbers.length} numeros bloqueados</p>
+          <p className="text-sm text-gray-500">{count} numeros bloqueados</p>
         </div>
       </div>
 
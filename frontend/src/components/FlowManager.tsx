@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
-import type { Flow, MenuOption } from '../types';
-import { getFlows, getFlow, activateFlow, createFlow, updateFlow, deleteFlow } from '../services/api';
+import type { FlowSummary, MenuOption } from '../types';
+import { getFlowSummaries, getFlow, activateFlow, createFlow, updateFlow, deleteFlow } from '../services/api';
 
 interface Props {
   onAlert: (message: string, type: 'success' | 'error') => void;
@@ -30,7 +30,7 @@ const emptyForm: FlowForm = {
 };
 
 export default function FlowManager({ onAlert, onFlowChange }: Props) {
-  const [flows, setFlows] = useState<Flow[]>([]);
+  const [flows, setFlows] = useState<FlowSummary[]>([]);
   const [currentFlow, setCurrentFlow] = useState<string>('');
   const [loading, setLoading] = useState(true);
   const [showModal, setShowModal] = useState(false);
@@ -43,7 +43,7 @@ export default function FlowManager({ onAlert, onFlowChange }: Props) {
 
   const loadFlows = async () => {
     try {
-      const data = await getFlows();
+      const data = await getFlowSummaries();
       setFlows(data.flows);
       setCurrentFlow(data.current_flow);
     } catch (error) {
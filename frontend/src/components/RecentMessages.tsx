@@ -1,6 +1,8 @@
 import { useState, useEffect, useRef } from 'react';
 import type { RecentMessage } from '../types';
-import { getRecentMessages, addToBlacklist } from '../services/api';
+import { getRecentMessages, streamRecentMessages, addToBlacklist } from '../services/api';
+
+const MAX_MESSAGES = 50;
 
 interface Props {
   onAlert: (message: string, type: 'success' | 'error') => void;
@@ -11,20 +13,27 @@ interface Props {
 export default function RecentMessages({ onAlert, onBlacklistChange, onConfigUser }: Props) {
   const [messages, setMessages] = useState<RecentMessage[]>([]);
   const [loading, setLoading] = useState(true);
-  const intervalRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  const [live, setLive] = useState(false);
+  const streamRef = useRef<EventSource | null>(null);
 
   useEffect(() => {
     loadMessages();
-    intervalRef.current = setInterval(loadMessages, 10000);
-    return () => {
-      if (intervalRef.current) clearInterval(intervalRef.current);
-    };
+    return () => streamRef.current?.close();
   }, []);
 
+  const addMessage = (msg: RecentMessage) => {
+    setMessages((current) =>
+      current.some((m) => m.seq === msg.seq) ? current : [msg, ...current].slice(0, MAX_MESSAGES)
+    );
+  };
+
+  // Load the latest page, then follow new messages over SSE (no polling)
   const loadMessages = async () => {
+    streamRef.current?.close();
     try {
-      const data = await getRecentMessages(50);
+      const data = await getRecentMessages(MAX_MESSAGES);
       setMessages(data.messages || []);
+      connect(data.last_seq);
     } catch (error) {
       console.error('Error loading messages:', error);
     } finally {
@@ -32,6 +41,20 @@ export default function RecentMessages({ onAlert, onBlacklistChange, onConfigUse
     }
   };
 
+  const connect = (after: number) => {
+    const stream = streamRecentMessages(after);
+    streamRef.current = stream;
+    stream.onopen = () => setLive(true);
+    stream.onerror = () => setLive(false); // EventSource reconnects with Last-Event-ID
+    stream.addEventListener('message', (event) => {
+      addMessage(JSON.parse((event as MessageEvent).data));
+    });
+    // Fell too far behind: reload the page and resubscribe
+    stream.addEventListener('dropped', () => {
+      loadMessages();
+    });
+  };
+
   const handleBlock = async (number: string) => {
     if (!confirm(`Bloquear el numero ${number}?`)) return;
     try {
@@ -63,7 +86,7 @@ export default function RecentMessages({ onAlert, onBlacklistChange, onConfigUse
         <div className="card-icon bg-blue-500">R</div>
         <div className="flex-1">
           <h2 className="text-xl font-semibold">Mensajes Recientes</h2>
-          <p className="text-sm text-gray-500">{messages.length} mensajes - Auto-refresh: 10s</p>
+          <p className="text-sm text-gray-500">{messages.length} mensajes - {live ? 'En vivo' : 'Reconectando...'}</p>
         </div>
         <button className="btn btn-secondary text-sm" onClick={loadMessages}>
           Actualizar
@@ -88,7 +111,9 @@ export default function RecentMessages({ onAlert, onBlacklistChange, onConfigUse
               </div>
               <div className="flex-1 min-w-0">
                 <div className="flex items-center justify-between gap-2">
-                  <span className="font-semibold text-sm truncate">{msg.name || msg.from}</span>
+                  <span className="font-semibold text-sm truncate">
+                    {msg.direction === 'out' ? `Bot -> ${msg.name || msg.from}` : msg.name || msg.from}
+                  </span>
                   <span className="text-xs text-gray-400 flex-shrink-0">{formatTime(msg.timestamp)}</span>
                 </div>
                 <p className="text-sm text-gray-600 break-words mt-0.5">
@@ -3,6 +3,7 @@ import type {
   QRResponse,
   BlacklistResponse,
   FlowListResponse,
+  FlowSummaryListResponse,
   Flow,
   PromptResponse,
   HealthResponse,
@@ -73,6 +74,11 @@ export async function getFlows(): Promise<FlowListResponse> {
   return fetchApi<FlowListResponse>('/api/flows');
 }
 
+// List without prompt bodies; use getFlow() for the full data
+export async function getFlowSummaries(): Promise<FlowSummaryListResponse> {
+  return fetchApi<FlowSummaryListResponse>('/api/flows?summary=true');
+}
+
 export async function getFlow(flowId: string): Promise<Flow> {
   return fetchApi<Flow>(`/api/flows/${flowId}`);
 }
@@ -133,6 +139,11 @@ export async function getRecentMessages(limit = 50): Promise<RecentMessagesRespo
   return fetchApi<RecentMessagesResponse>(`/api/messages/recent?limit=${limit}`);
 }
 
+// Live feed of new messages (server-sent events); resumes after `after`
+export function streamRecentMessages(after: number): EventSource {
+  return new EventSource(`${API_BASE}/api/messages/stream?after=${after}`);
+}
+
 // User Configs
 export async function getUserConfigs(): Promise<UserConfigsResponse> {
   return fetchApi<UserConfigsResponse>('/api/users/config');
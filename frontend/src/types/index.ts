@@ -19,6 +19,8 @@ export interface QRResponse {
 export interface BlacklistResponse {
   blacklist: string[];
   count: number;
+  offset?: number;
+  limit?: number | null;
 }
 
 // Flow Types
@@ -44,6 +46,13 @@ export interface FlowListResponse {
   current_flow: string;
 }
 
+export type FlowSummary = Pick<Flow, 'id' | 'name' | 'description' | 'is_builtin' | 'flow_type'>;
+
+export interface FlowSummaryListResponse {
+  flows: FlowSummary[];
+  current_flow: string;
+}
+
 // Prompt Types
 export interface PromptResponse {
   prompt: string;
@@ -59,7 +68,9 @@ export interface HealthResponse {
 
 // Recent Messages Types
 export interface RecentMessage {
+  seq: number;
   id: string;
+  direction: 'in' | 'out';
   from: string;
   name: string;
   text: string;
@@ -69,6 +80,8 @@ export interface RecentMessage {
 export interface RecentMessagesResponse {
   messages: RecentMessage[];
   count: number;
+  last_seq: number;
+  next_before: number | null;
 }
 
 // User Config Types
@@ -81,4 +94,5 @@ export interface UserConfig {
 
 export interface UserConfigsResponse {
   configs: Record<string, UserConfig>;
+  count: number;
 }
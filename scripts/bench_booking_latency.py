@@ -0,0 +1,131 @@
+"""Webhook latency while appointments are being booked against a slow Google API.
+
+    python scripts/bench_booking_latency.py                    # Google calls on the thread pool
+    python scripts/bench_booking_latency.py --blocking         # same calls run on the event loop, for comparison
+    python scripts/bench_booking_latency.py --google-ms 1500 --bookings 10
+
+Google is replaced by a stand-in whose requests block for --google-ms,
+like a real round trip; webhook posts go through the ASGI app in-process.
+State is kept in a temporary directory.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_STATE_DIR = tempfile.mkdtemp(prefix="bench-booking-")
+for _name, _file in {
+    "CONFIG_FILE_PATH": "bot-config.json",
+    "CONFIG_DB_PATH": "bot-config.db",
+    "APPOINTMENTS_DB_PATH": "appointments.db",
+    "SHEETS_QUEUE_PATH": "sheets-queue.db",
+    "REMINDERS_DB_PATH": "reminders.db",
+    "INBOUND_QUEUE_PATH": "inbound-queue.db",
+    "TENANTS_FILE_PATH": "tenants.json",
+}.items():
+    os.environ[_name] = os.path.join(_STATE_DIR, _file)
+os.environ["GOOGLE_CREDENTIALS_PATH"] = os.path.join(_STATE_DIR, "missing-credentials.json")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from backend.app.routers.webhook import router as webhook_router  # noqa: E402
+from backend.app.services.google_service import google_service  # noqa: E402
+from backend.app.services.message_dispatcher import message_dispatcher  # noqa: E402
+
+
+class FakeRequest:
+    methodId = "calendar.events.insert"
+
+    def __init__(self, result, seconds):
+        self.result = result
+        self.seconds = seconds
+
+    def execute(self, http=None):
+        time.sleep(self.seconds)
+        return self.result
+
+
+class FakeCalendar:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def events(self):
+        return self
+
+    def insert(self, calendarId, body):
+        return FakeRequest({"id": body["id"], "htmlLink": "https://calendar.test/event"}, self.seconds)
+
+
+def _payload(i: int) -> dict:
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"value": {"messages": [{"id": f"wamid.bench-{i}", "from": "5215500000000"}]}}]}]
+    }
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(bookings: int, google_seconds: float, blocking: bool) -> None:
+    google_service._calendar = FakeCalendar(google_seconds)
+    google_service._sheets = object()
+    google_service._clients_loaded = True
+    if blocking:
+        # The old behaviour: googleapiclient's execute() called straight from the coroutine
+        async def execute_inline(request, timeout=None):
+            return request.execute()
+        google_service._execute = execute_inline
+
+    async def handler(body, received_at):
+        pass
+
+    message_dispatcher.start(handler)
+    app = FastAPI()
+    app.include_router(webhook_router)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.post("/webhook", json=_payload(-1))  # warm up
+
+        latencies = []
+        booking_tasks = [
+            asyncio.create_task(google_service.registrar_cita({
+                "name": f"Cliente {i}", "phone": f"52155{i:08d}", "service": "Consultoria",
+                "date": f"2030-02-{1 + i % 28:02d}", "time": f"{9 + i // 28:02d}:00"
+            }))
+            for i in range(bookings)
+        ]
+        i = 0
+        while not all(task.done() for task in booking_tasks):
+            start = time.perf_counter()
+            await client.post("/webhook", json=_payload(i))
+            latencies.append(time.perf_counter() - start)
+            i += 1
+            await asyncio.sleep(0.02)
+        results = await asyncio.gather(*booking_tasks)
+
+    await message_dispatcher.drain(1)
+    booked = sum(result["success"] for result in results)
+    mode = "blocking (on the event loop)" if blocking else "thread pool"
+    print(f"{mode}: {booked}/{bookings} bookings, Google round trip {google_seconds * 1000:.0f} ms")
+    print(f"webhook latency over {len(latencies)} posts: p50 {_percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p99 {_percentile(latencies, 0.99) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=5)
+    parser.add_argument("--google-ms", type=float, default=1500)
+    parser.add_argument("--blocking", action="store_true", help="run Google calls on the event loop instead")
+    args = parser.parse_args()
+    asyncio.run(run(args.bookings, args.google_ms / 1000, args.blocking))
+
+
+if __name__ == "__main__":
+    main()
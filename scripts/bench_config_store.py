@@ -0,0 +1,85 @@
+"""Per-operation cost of the JSON and SQLite config stores at scale.
+
+    python scripts/bench_config_store.py                            # 10k flows, 1M blacklist entries
+    python scripts/bench_config_store.py --flows 1000 --numbers 100000
+
+Every JSON write is flushed straight away (no coalescing window), so its
+timing includes the full parse + rewrite of the file.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.app.services.config_store import JsonConfigStore, SqliteConfigStore  # noqa: E402
+
+
+def _document(flows: int, numbers: int) -> dict:
+    return {
+        "systemPrompt": "Eres un asistente.",
+        "currentFlow": "flow-0",
+        "customFlows": {
+            f"flow-{i}": {"id": f"flow-{i}", "name": f"Flujo {i}", "prompt": "Eres un asistente de ventas. " * 20}
+            for i in range(flows)
+        },
+        "blacklist": [f"52155{i:08d}" for i in range(numbers)],
+        "blacklistPrefixes": ["5219"],
+        "userConfigs": {}
+    }
+
+
+def _time(label: str, fn, rounds: int) -> None:
+    start = time.perf_counter()
+    for i in range(rounds):
+        fn(i)
+    per_op = (time.perf_counter() - start) / rounds
+    unit, scale = ("ms", 1e3) if per_op >= 1e-3 else ("us", 1e6)
+    print(f"  {label:<28} {per_op * scale:10.1f} {unit}")
+
+
+def bench(store, name: str, flows: int, numbers: int, rounds: int) -> None:
+    print(f"{name}:")
+    _time("get_custom_flow", lambda i: store.get_custom_flow(f"flow-{i % flows}"), rounds * 100)
+    _time("is_blacklisted (hit)", lambda i: store.is_blacklisted(f"52155{i % numbers:08d}"), rounds * 100)
+    _time("is_blacklisted (miss)", lambda i: store.is_blacklisted(f"52166{i:08d}"), rounds * 100)
+    _time("blacklist_page", lambda i: store.blacklist_page(i * 50, 50), rounds)
+    _time("insert_flow", lambda i: store.insert_flow(f"new-{i}", {"name": "Nuevo"}), rounds)
+    _time("update_flow", lambda i: store.update_flow(f"flow-{i % flows}", {"name": "Editado"}), rounds)
+    _time("blacklist_add (1 number)", lambda i: store.blacklist_add([f"52177{i:08d}"]), rounds)
+    _time("blacklist_remove (1 number)", lambda i: store.blacklist_remove([f"52177{i:08d}"]), rounds)
+    _time("add_prefix", lambda i: store.add_prefix(f"5218{i}"), rounds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flows", type=int, default=10_000)
+    parser.add_argument("--numbers", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=3, help="writes per operation (reads run 100x as many)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-config-") as tmp:
+        json_path = os.path.join(tmp, "bot-config.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(_document(args.flows, args.numbers), f, ensure_ascii=False, indent=2)
+        print(f"{args.flows} flows, {args.numbers} blacklisted numbers, "
+              f"{os.path.getsize(json_path) / 1e6:.0f} MB of JSON")
+
+        start = time.perf_counter()
+        json_store = JsonConfigStore(json_path, 0, {})
+        json_store.get_custom_flows()
+        print(f"json: first load {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        sqlite_store = SqliteConfigStore(os.path.join(tmp, "config.db"), {}, json_path)
+        print(f"sqlite: import {time.perf_counter() - start:.2f}s")
+
+        bench(sqlite_store, "sqlite", args.flows, args.numbers, args.rounds)
+        bench(json_store, "json", args.flows, args.numbers, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
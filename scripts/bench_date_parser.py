@@ -0,0 +1,69 @@
+"""Accuracy and latency of the local date parser on the test corpus, optionally against Grok.
+
+    python scripts/bench_date_parser.py           # local parser only
+    python scripts/bench_date_parser.py --llm     # also time Grok on the same texts (needs XAI_API_KEY)
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.app.services.local_date_parser import CONFIDENCE_THRESHOLD, parse_spanish_datetime  # noqa: E402
+from backend.tests.test_local_date_parser import CORPUS, NOW  # noqa: E402
+
+
+def _resolved(result):
+    if not result or result["confidence"] < CONFIDENCE_THRESHOLD:
+        return None
+    return f"{result['date']} {result['time']}"
+
+
+def bench_local(rounds: int) -> None:
+    correct = sum(_resolved(parse_spanish_datetime(text, NOW)) == expected for text, expected in CORPUS)
+    local = sum(expected is not None for _, expected in CORPUS)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text, _ in CORPUS:
+            parse_spanish_datetime(text, NOW)
+    per_call = (time.perf_counter() - start) / (rounds * len(CORPUS))
+
+    print(f"local parser: {correct}/{len(CORPUS)} as expected "
+          f"({local} resolved locally, {len(CORPUS) - local} left to the LLM)")
+    print(f"local parser: {per_call * 1e6:.1f} us per text")
+
+
+async def bench_llm() -> None:
+    from backend.app.services.date_parser_service import date_parser_service
+
+    agree = 0
+    latencies = []
+    for text, expected in CORPUS:
+        start = time.perf_counter()
+        result = await date_parser_service._ask_llm(text, NOW)
+        latencies.append(time.perf_counter() - start)
+        if expected is not None and result and f"{result['date']} {result['time']}" == expected:
+            agree += 1
+    latencies.sort()
+    print(f"grok: agrees with {agree}/{sum(e is not None for _, e in CORPUS)} locally resolved texts")
+    print(f"grok: p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms per text")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--llm", action="store_true", help="also time Grok (needs XAI_API_KEY)")
+    args = parser.parse_args()
+
+    bench_local(args.rounds)
+    if args.llm:
+        if not os.environ.get("XAI_API_KEY"):
+            sys.exit("--llm needs XAI_API_KEY")
+        asyncio.run(bench_llm())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Import time of backend.app.main, with Google clients lazy (current) and built eagerly (as before).
+
+    python scripts/bench_startup.py              # 5 fresh interpreters per mode
+    python scripts/bench_startup.py --runs 10
+
+Each run imports the app in a new interpreter with state in a temporary
+directory. "eager" also builds the Sheets and Calendar clients from the
+bundled discovery documents, which is what importing the app used to do.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import backend.app.main
+lazy = time.perf_counter() - start
+google_imported = "googleapiclient" in sys.modules
+start = time.perf_counter()
+if sys.argv[1] == "eager":
+    from google.auth.credentials import AnonymousCredentials
+    from googleapiclient.discovery import build
+    build("sheets", "v4", credentials=AnonymousCredentials(), static_discovery=True)
+    build("calendar", "v3", credentials=AnonymousCredentials(), static_discovery=True)
+google = time.perf_counter() - start
+print(json.dumps({"app": lazy, "google": google, "google_imported": google_imported}))
+"""
+
+STATE_FILES = {
+    "CONFIG_FILE_PATH": "bot-config.json",
+    "CONFIG_DB_PATH": "bot-config.db",
+    "APPOINTMENTS_DB_PATH": "appointments.db",
+    "SHEETS_QUEUE_PATH": "sheets-queue.db",
+    "REMINDERS_DB_PATH": "reminders.db",
+    "INBOUND_QUEUE_PATH": "inbound-queue.db",
+    "TENANTS_FILE_PATH": "tenants.json",
+}
+
+
+def _run(mode: str, state_dir: str) -> dict:
+    env = {**os.environ, **{name: os.path.join(state_dir, file) for name, file in STATE_FILES.items()}}
+    env["GOOGLE_CREDENTIALS_PATH"] = os.path.join(state_dir, "missing-credentials.json")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, mode], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as state_dir:
+        _run("lazy", state_dir)  # first run creates the databases and warms the bytecode cache
+        # Interleaved so machine noise hits both modes alike
+        results = {"lazy": [], "eager": []}
+        for _ in range(args.runs):
+            for mode, runs in results.items():
+                runs.append(_run(mode, state_dir))
+        for mode, runs in results.items():
+            app = statistics.median(run["app"] for run in runs)
+            google = statistics.median(run["google"] for run in runs)
+            print(f"{mode:>5}: {(app + google) * 1000:.0f} ms to a ready app "
+                  f"(import {app * 1000:.0f} ms + Google clients {google * 1000:.0f} ms), "
+                  f"median of {args.runs} runs; googleapiclient imported by app.main: "
+                  f"{runs[0]['google_imported']}")
+
+
+if __name__ == "__main__":
+    main()